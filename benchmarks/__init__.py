@@ -0,0 +1,3 @@
+"""
+Benchmarks for the Mart Application's database hot paths
+"""
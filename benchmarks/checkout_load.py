@@ -0,0 +1,236 @@
+"""Simulated cashiers checking out concurrently through the real Database API
+
+    python -m benchmarks.checkout_load [--lanes 8] [--seconds 60] [--rate 0.5]
+                                       [--lines 1 20] [--mode thread|process]
+
+Each lane scans a basket barcode by barcode (get_product_by_barcode,
+popular products scanned more often) and checks it out with submit_sale,
+the same calls the sales view makes. Checkouts start at ``--rate`` per
+second per lane with Poisson arrivals (0 runs flat out), so a slow server
+shows up as growing latency rather than a lower offered load.
+
+``--mode thread`` runs the lanes in one process sharing one connection
+pool; ``--mode process`` gives every lane its own process, pool and
+caches, like separate tills against one MySQL server. The report covers
+throughput, scan and checkout latency percentiles, deadlock and lock wait
+retries, sales that still failed on a lock conflict, and pool exhaustion.
+
+It writes real sales and raises the stock of the products it sells;
+point config.ini at a scratch database (MySQL or the sqlite backend).
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+import itertools
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from mysql.connector import Error
+
+from utils.database import Database, InsufficientStockError, is_lock_conflict
+from utils.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+BENCH_STOCK = 10 ** 8
+# Products a lane scans from, most popular first
+CATALOG_SAMPLE = 2000
+# Outcome counters every lane reports
+OUTCOMES = ('committed', 'queued', 'shortfalls', 'lock_conflicts', 'errors', 'scan_misses')
+
+
+def _setup(db: Database, seed: int) -> Dict[str, Any]:
+    """Pick a cashier and the products to sell, and give them enough stock for any run"""
+    db.ensure_admin_exists()
+    user = db.execute_query("SELECT id FROM users ORDER BY id LIMIT 1")[0]
+    products = db.execute_query(
+        "SELECT id, barcode FROM products WHERE is_active = TRUE AND barcode IS NOT NULL ORDER BY id"
+    ) or []
+    if not products:
+        raise RuntimeError("Need active products with barcodes; seed the database first")
+    products = random.Random(seed).sample(products, min(len(products), CATALOG_SAMPLE))
+    placeholders = ", ".join(["%s"] * len(products))
+    db.execute_query(f"UPDATE products SET stock = %s WHERE id IN ({placeholders})",
+                     (BENCH_STOCK, *[product['id'] for product in products]))
+    return {'user_id': user['id'], 'barcodes': [product['barcode'] for product in products]}
+
+
+def run_lane(db: Database, fixture: Dict[str, Any], lane: int, seed: int, rate: float,
+             lines: Tuple[int, int], start: float, deadline: float) -> Dict[str, Any]:
+    """One cashier: scan, check out, wait for the next customer, until ``deadline``"""
+    rng = random.Random(seed * 1000 + lane)
+    barcodes = fixture['barcodes']
+    # Zipf-like popularity: the n-th barcode is scanned in proportion to 1/n
+    cum_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(barcodes) + 1)))
+    counts = dict.fromkeys(OUTCOMES, 0)
+    checkout_s: List[float] = []
+    scan_s: List[float] = []
+    scans = 0
+
+    next_arrival = start + (rng.expovariate(rate) if rate else 0.0)
+    time.sleep(max(start - time.time(), 0))
+    while True:
+        if rate:
+            time.sleep(max(next_arrival - time.time(), 0))
+            next_arrival += rng.expovariate(rate)
+        if time.time() >= deadline:
+            break
+
+        cart: Dict[int, Dict[str, Any]] = {}
+        for barcode in rng.choices(barcodes, cum_weights=cum_weights, k=rng.randint(*lines)):
+            started = time.perf_counter()
+            product = db.get_product_by_barcode(barcode)
+            scan_s.append(time.perf_counter() - started)
+            scans += 1
+            if not product:
+                counts['scan_misses'] += 1
+                continue
+            line = cart.setdefault(product['id'], {
+                'product_id': product['id'], 'quantity': 0, 'price': float(product['price'])
+            })
+            line['quantity'] += 1
+        if not cart:
+            continue
+
+        items = list(cart.values())
+        started = time.perf_counter()
+        try:
+            result = db.submit_sale(fixture['user_id'], items,
+                                    sum(item['price'] * item['quantity'] for item in items))
+            counts[result['status']] += 1
+            checkout_s.append(time.perf_counter() - started)
+        except InsufficientStockError:
+            counts['shortfalls'] += 1
+        except Error as e:
+            if is_lock_conflict(e):
+                counts['lock_conflicts'] += 1
+            else:
+                if not counts['errors']:
+                    logger.error(f"Lane {lane} checkout failed: {e}")
+                counts['errors'] += 1
+    return {'counts': counts, 'scans': scans, 'checkout_s': checkout_s, 'scan_s': scan_s}
+
+
+def _db_counters(db: Database) -> Dict[str, int]:
+    writer = db.get_sale_write_stats()
+    pool = db.get_pool_stats()
+    return {
+        'retries': writer['retries'],
+        'deadlocks': writer['deadlocks'],
+        'pool_exhausted': pool.get('exhausted', 0),
+        'pool_peak_in_use': pool.get('peak_in_use', 0)
+    }
+
+
+def _lane_process(fixture: Dict[str, Any], lane: int, seed: int, rate: float, lines: Tuple[int, int],
+                  start: float, deadline: float, results):
+    """Entry point of a lane in its own process, with its own Database and pool"""
+    logging.basicConfig(level=logging.ERROR)
+    db = Database()
+    try:
+        result = run_lane(db, fixture, lane, seed, rate, lines, start, deadline)
+        result['db'] = _db_counters(db)
+    finally:
+        db.disconnect()
+    results.put(result)
+
+
+def run(db: Database, fixture: Dict[str, Any], lanes: int, seconds: float, rate: float,
+        lines: Tuple[int, int], mode: str = 'thread', seed: int = 42) -> Dict[str, Any]:
+    """Run the lanes and merge what they report"""
+    results: List[Dict[str, Any]] = []
+    if mode == 'process':
+        # spawn, not fork: a forked child would inherit this process's open connections
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        start = time.time() + 5.0
+        workers = [
+            context.Process(target=_lane_process, daemon=True,
+                            args=(fixture, lane, seed, rate, lines, start, start + seconds, queue))
+            for lane in range(lanes)
+        ]
+        for worker in workers:
+            worker.start()
+        # A lane that died reports nothing; don't wait for it forever
+        results = [queue.get(timeout=seconds + 120) for _ in workers]
+        for worker in workers:
+            worker.join()
+        db_counters = {key: sum(result['db'][key] for result in results) for key in results[0]['db']}
+        db_counters['pool_peak_in_use'] = max(result['db']['pool_peak_in_use'] for result in results)
+    else:
+        before = _db_counters(db)
+        start = time.time() + 0.5
+        lock = threading.Lock()
+
+        def lane_thread(lane: int):
+            result = run_lane(db, fixture, lane, seed, rate, lines, start, start + seconds)
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=lane_thread, args=(lane,), daemon=True) for lane in range(lanes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        after = _db_counters(db)
+        db_counters = {key: after[key] - before[key] for key in after}
+        db_counters['pool_peak_in_use'] = after['pool_peak_in_use']
+
+    checkouts = sorted(itertools.chain.from_iterable(result['checkout_s'] for result in results))
+    scan_times = sorted(itertools.chain.from_iterable(result['scan_s'] for result in results))
+    counts = {key: sum(result['counts'][key] for result in results) for key in OUTCOMES}
+    return {
+        'mode': mode,
+        'lanes': lanes,
+        'seconds': seconds,
+        **counts,
+        'checkouts_per_s': (counts['committed'] + counts['queued']) / seconds,
+        'scans_per_s': sum(result['scans'] for result in results) / seconds,
+        'checkout_ms': {f"p{pct}": percentile(checkouts, pct) * 1000 for pct in (50, 95, 99)},
+        'scan_ms': {f"p{pct}": percentile(scan_times, pct) * 1000 for pct in (50, 95, 99)},
+        'deadlock_retries': db_counters['deadlocks'],
+        'lock_wait_retries': db_counters['retries'] - db_counters['deadlocks'],
+        'pool_exhausted': db_counters['pool_exhausted'],
+        'pool_peak_in_use': db_counters['pool_peak_in_use']
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent multi-lane checkout load test")
+    parser.add_argument('--lanes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--rate', type=float, default=0.5, help="checkouts per second per lane, 0 = flat out")
+    parser.add_argument('--lines', type=int, nargs=2, default=[1, 20], metavar=('MIN', 'MAX'),
+                        help="scans per basket")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    db = Database()
+    try:
+        fixture = _setup(db, args.seed)
+        print(f"backend={db.backend} mode={args.mode} lanes={args.lanes} rate={args.rate}/s/lane "
+              f"lines={args.lines[0]}-{args.lines[1]} seconds={args.seconds}")
+        result = run(db, fixture, args.lanes, args.seconds, args.rate, tuple(args.lines), args.mode, args.seed)
+    finally:
+        db.disconnect()
+
+    checkout, scan = result['checkout_ms'], result['scan_ms']
+    print(f"checkouts   {result['committed']} committed, {result['queued']} queued offline, "
+          f"{result['checkouts_per_s']:.1f}/s")
+    print(f"checkout ms p50 {checkout['p50']:.2f}  p95 {checkout['p95']:.2f}  p99 {checkout['p99']:.2f}")
+    print(f"scans       {result['scans_per_s']:.1f}/s, {result['scan_misses']} misses")
+    print(f"scan ms     p50 {scan['p50']:.3f}  p95 {scan['p95']:.3f}  p99 {scan['p99']:.3f}")
+    print(f"retries     {result['deadlock_retries']} deadlock, {result['lock_wait_retries']} lock wait; "
+          f"{result['lock_conflicts']} sales failed on a lock conflict")
+    print(f"pool        {result['pool_exhausted']} exhausted, peak {result['pool_peak_in_use']} in use")
+    print(f"rejected    {result['shortfalls']} short of stock, {result['errors']} other errors")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""Fill the schema with a production-sized synthetic shop
+
+    python -m benchmarks.generate_data [--products 100000] [--categories 500]
+                                       [--sales 5000000] [--details 20000000]
+                                       [--days 365] [--scale 0.01] [--seed 42]
+
+Products get Zipf-distributed popularity (a few best sellers, a long
+tail), sales follow an hourly and weekday traffic curve over the last
+``--days`` days, and baskets average ``--details / --sales`` lines. Rows
+are appended after the existing ids and written with multi-row INSERTs in
+batches, one transaction per batch, so sales get ids in time order like
+real checkouts. The sales rollups are caught up at the end so the
+dashboard and reports see the new history.
+
+This appends to whatever config.ini points at; use a scratch database.
+"""
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+import itertools
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from utils.database import Database
+
+# Share of a day's sales in each hour: morning and after-work peaks
+HOURLY_WEIGHTS = (
+    0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.5, 3.5, 5.0, 5.0, 5.5, 7.0,
+    8.5, 7.5, 6.0, 5.5, 6.5, 8.5, 9.5, 8.0, 5.5, 3.5, 1.5, 0.6
+)
+# Monday..Sunday
+WEEKDAY_WEIGHTS = (0.85, 0.85, 0.9, 0.95, 1.15, 1.3, 1.0)
+# Units per line
+QUANTITIES = (1, 2, 3, 4, 5, 6)
+QUANTITY_WEIGHTS = (70, 15, 7, 4, 2, 2)
+
+DEPARTMENTS = ('Beverages', 'Snacks', 'Dairy', 'Bakery', 'Produce', 'Frozen', 'Pantry',
+               'Household', 'Personal Care', 'Tea', 'Coffee', 'Confectionery')
+BRANDS = ('Acme', 'Golden', 'Riverside', 'Sunny', 'Highland', 'Lotus', 'Everyday', 'Royal')
+NOUNS = ('Green Tea', 'Black Tea', 'Cookies', 'Rice', 'Noodles', 'Milk', 'Juice', 'Soap',
+         'Chips', 'Bread', 'Yogurt', 'Coffee Beans', 'Sauce', 'Water', 'Candy', 'Detergent')
+SIZES = ('100g', '250g', '500g', '1kg', '330ml', '500ml', '1L', '6 pack')
+
+
+def _ean13(number: int) -> str:
+    """EAN-13 in the in-store range (prefix 2) for a product number"""
+    digits = f"2{number:011d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def _next_id(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) AS last_id FROM {table}")
+    return cursor.fetchall()[0]['last_id'] + 1
+
+
+def _insert(cursor, table: str, columns: Tuple[str, ...], rows: List[tuple]):
+    """One executemany, which mysql.connector sends as a single multi-row INSERT"""
+    if rows:
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+class DataGenerator:
+    """Writes categories, products and sales in bulk through one pooled connection"""
+
+    def __init__(self, db: Database, seed: int = 42, batch_size: int = 5000, zipf: float = 1.1):
+        self.db = db
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.zipf = zipf
+
+    def _load(self, connection, cursor, table: str, columns: Tuple[str, ...], rows) -> int:
+        """Insert an iterable of rows in committed batches; returns the row count"""
+        count = 0
+        for batch in iter(lambda: list(itertools.islice(rows, self.batch_size)), []):
+            connection.start_transaction()
+            _insert(cursor, table, columns, batch)
+            connection.commit()
+            count += len(batch)
+        return count
+
+    def categories(self, connection, cursor, count: int) -> List[int]:
+        first = _next_id(cursor, 'categories')
+        ids = list(range(first, first + count))
+        rows = ((category_id, f"{DEPARTMENTS[category_id % len(DEPARTMENTS)]} {category_id}",
+                 "Generated category") for category_id in ids)
+        self._load(connection, cursor, 'categories', ('id', 'name', 'description'), rows)
+        return ids
+
+    def products(self, connection, cursor, count: int, category_ids: List[int]) -> List[Tuple[int, float]]:
+        """Insert products; returns (id, price) pairs"""
+        rng = self.random
+        first = _next_id(cursor, 'products')
+        products = []
+
+        def rows():
+            for product_id in range(first, first + count):
+                price = round(min(max(rng.lognormvariate(1.2, 0.8), 0.25), 500.0), 2)
+                products.append((product_id, price))
+                name = f"{rng.choice(BRANDS)} {rng.choice(NOUNS)} {rng.choice(SIZES)} #{product_id}"
+                yield (product_id, name, None, price, rng.randint(0, 500), _ean13(product_id),
+                       rng.choice(category_ids) if category_ids else None, 10, 1000, 1)
+
+        self._load(connection, cursor, 'products',
+                   ('id', 'name', 'description', 'price', 'stock', 'barcode',
+                    'category_id', 'min_stock', 'max_stock', 'is_active'), rows())
+        return products
+
+    def _day_counts(self, sales: int, start: datetime, days: int) -> List[Tuple[datetime, int]]:
+        """Spread the sales over the days by weekday weight"""
+        day_starts = [start + timedelta(days=offset) for offset in range(days)]
+        weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in day_starts]
+        total = sum(weights)
+        counts = [int(sales * weight / total) for weight in weights]
+        for index in range(sales - sum(counts)):
+            counts[index % days] += 1
+        return list(zip(day_starts, counts))
+
+    def sales(self, connection, cursor, count: int, details: int, days: int,
+              products: List[Tuple[int, float]], user_ids: List[int]) -> Tuple[int, int]:
+        """Insert sales in time order with their lines; returns (sales, lines) written"""
+        rng = self.random
+        ranked = list(products)
+        rng.shuffle(ranked)
+        # Popularity rank r has weight 1 / r^s
+        cum_weights = list(itertools.accumulate(1.0 / (rank ** self.zipf) for rank in range(1, len(ranked) + 1)))
+        mean_lines = max(details / count, 1.0) if count else 1.0
+        # 1 + geometric number of extra lines has mean 1 / p
+        log_keep = math.log(1 - 1 / mean_lines) if mean_lines > 1 else None
+        max_lines = min(len(ranked), 60)
+
+        end = datetime.now().replace(microsecond=0) - timedelta(minutes=1)
+        start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0)
+        sale_id = _next_id(cursor, 'sales')
+        written_sales = written_lines = 0
+        sale_rows: List[tuple] = []
+        line_rows: List[tuple] = []
+
+        def flush():
+            connection.start_transaction()
+            _insert(cursor, 'sales', ('id', 'user_id', 'total_amount', 'payment_method', 'created_at'),
+                    sale_rows)
+            _insert(cursor, 'sales_details', ('sale_id', 'product_id', 'quantity', 'price', 'created_at'),
+                    line_rows)
+            connection.commit()
+            sale_rows.clear()
+            line_rows.clear()
+
+        for day, day_count in self._day_counts(count, start, days):
+            hours = rng.choices(range(24), weights=HOURLY_WEIGHTS, k=day_count)
+            offsets = sorted(hour * 3600 + rng.randrange(3600) for hour in hours)
+            # Today is squeezed into the hours that have passed
+            squeeze = min((end - day).total_seconds() / 86400, 1.0)
+            for offset in offsets:
+                created = day + timedelta(seconds=int(offset * squeeze))
+                created_at = created.strftime('%Y-%m-%d %H:%M:%S')
+
+                lines = 1
+                if log_keep is not None:
+                    lines = min(1 + int(math.log(1.0 - rng.random()) / log_keep), max_lines)
+                basket = dict.fromkeys(rng.choices(ranked, cum_weights=cum_weights, k=lines))
+                for _ in range(3):
+                    if len(basket) >= lines:
+                        break
+                    basket.update(dict.fromkeys(rng.choices(ranked, cum_weights=cum_weights,
+                                                            k=lines - len(basket))))
+
+                total = 0.0
+                for (product_id, price), quantity in zip(
+                        basket, rng.choices(QUANTITIES, weights=QUANTITY_WEIGHTS, k=len(basket))):
+                    line_rows.append((sale_id, product_id, quantity, price, created_at))
+                    total += price * quantity
+                sale_rows.append((sale_id, rng.choice(user_ids), round(total, 2),
+                                  'cash' if rng.random() < 0.45 else 'card', created_at))
+                written_lines += len(basket)
+                sale_id += 1
+
+                if len(sale_rows) >= self.batch_size:
+                    written_sales += len(sale_rows)
+                    flush()
+        if sale_rows:
+            written_sales += len(sale_rows)
+            flush()
+        return written_sales, written_lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a realistic-scale synthetic dataset")
+    parser.add_argument('--categories', type=int, default=500)
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--sales', type=int, default=5_000_000)
+    parser.add_argument('--details', type=int, default=20_000_000,
+                        help="approximate number of sales_details rows")
+    parser.add_argument('--days', type=int, default=365, help="history length ending now")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply every volume, e.g. 0.01")
+    parser.add_argument('--zipf', type=float, default=1.1, help="product popularity skew")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-rollups', action='store_true', help="leave the rollups to catch up later")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    categories, products, sales, details = (
+        max(int(value * args.scale), 0)
+        for value in (args.categories, args.products, args.sales, args.details)
+    )
+    db = Database()
+    generator = DataGenerator(db, seed=args.seed, batch_size=args.batch_size, zipf=args.zipf)
+    db.ensure_admin_exists()
+    user_ids = [row['id'] for row in db.execute_query("SELECT id FROM users WHERE is_active = TRUE") or []]
+
+    print(f"backend={db.backend} categories={categories} products={products} "
+          f"sales={sales} details~{details} days={args.days}")
+    try:
+        with db.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            if db.backend == 'mysql':
+                # Referential integrity holds by construction; skip the per-row checks
+                cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+            try:
+                started = time.perf_counter()
+                category_ids = generator.categories(connection, cursor, categories)
+                if not category_ids:
+                    cursor.execute("SELECT id FROM categories")
+                    category_ids = [row['id'] for row in cursor.fetchall()]
+                catalog = generator.products(connection, cursor, products, category_ids)
+                print(f"{len(category_ids)} categories, {len(catalog)} products "
+                      f"in {time.perf_counter() - started:.1f}s")
+                if not catalog:
+                    cursor.execute("SELECT id, price FROM products WHERE is_active = TRUE")
+                    catalog = [(row['id'], float(row['price'])) for row in cursor.fetchall()]
+
+                if sales and catalog:
+                    started = time.perf_counter()
+                    written, lines = generator.sales(connection, cursor, sales, details, args.days,
+                                                     catalog, user_ids)
+                    elapsed = time.perf_counter() - started
+                    print(f"{written} sales, {lines} lines in {elapsed:.1f}s "
+                          f"({written / elapsed if elapsed else 0:.0f} sales/s)")
+            finally:
+                if db.backend == 'mysql':
+                    cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+                cursor.close()
+
+        if sales and not args.skip_rollups:
+            started = time.perf_counter()
+            rolled = db.get_sales_rollup().catch_up(force=True)
+            print(f"Rolled up {rolled} sales in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
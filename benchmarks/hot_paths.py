@@ -0,0 +1,190 @@
+"""Latency of the Database calls the lanes, dashboard and reports depend on
+
+    python -m benchmarks.hot_paths [--repeat 200] [--warmup 20] [--case add_sale_10 ...]
+                                   [--output hot_paths.json] [--baseline old.json]
+
+Every case runs ``--warmup`` untimed and ``--repeat`` timed iterations
+with inputs drawn from a fixed seed, and the JSON written to ``--output``
+holds count, mean, p50, p95, p99 and max in milliseconds per case plus
+the backend, table sizes and git revision. With ``--baseline`` each
+case is also compared with an earlier result file so a regression
+between versions shows up as a ratio.
+
+The add_sale cases write real sales and raise the stock of the products
+they sell; seed a scratch database first (python -m benchmarks.generate_data).
+"""
+import os
+import sys
+import json
+import time
+import random
+import itertools
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.database import Database
+from utils.dashboard_state import DashboardAggregates
+from utils.metrics import LatencyRecorder
+
+BENCH_STOCK = 10 ** 8
+BASKET_SIZES = (1, 10, 50)
+
+
+def _setup(db: Database, seed: int) -> Dict[str, Any]:
+    """Sample the inputs every case draws from"""
+    rng = random.Random(seed)
+    db.ensure_admin_exists()
+    user = db.execute_query("SELECT id FROM users ORDER BY id LIMIT 1")[0]
+    products = db.execute_query(
+        "SELECT id, name, price, barcode FROM products WHERE is_active = TRUE ORDER BY id"
+    ) or []
+    if len(products) < max(BASKET_SIZES):
+        raise RuntimeError(f"Need at least {max(BASKET_SIZES)} active products; seed the database first")
+
+    sellable = rng.sample(products, min(len(products), 500))
+    placeholders = ", ".join(["%s"] * len(sellable))
+    db.execute_query(f"UPDATE products SET stock = %s WHERE id IN ({placeholders})",
+                     (BENCH_STOCK, *[product['id'] for product in sellable]))
+    barcodes = [product['barcode'] for product in products if product['barcode']]
+    words = sorted({word for product in rng.sample(products, min(len(products), 200))
+                    for word in product['name'].split() if len(word) > 3 and word.isalpha()})
+    return {
+        'user_id': user['id'],
+        'sellable': sellable,
+        'barcodes': rng.sample(barcodes, min(len(barcodes), 1000)),
+        'terms': rng.sample(words, min(len(words), 50)) or ['tea']
+    }
+
+
+def _cases(db: Database, fixture: Dict[str, Any], seed: int) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) for each case, in run order"""
+    rng = random.Random(seed)
+    today = date.today()
+
+    def add_sale(lines: int):
+        def run():
+            basket = rng.sample(fixture['sellable'], lines)
+            items = [{'product_id': p['id'], 'quantity': 1, 'price': float(p['price'])} for p in basket]
+            if db.add_sale(fixture['user_id'], items, sum(item['price'] for item in items)) is None:
+                raise RuntimeError("add_sale failed")
+        return run
+
+    next_barcode = itertools.cycle(fixture['barcodes'] or ['']).__next__
+    next_term = itertools.cycle(fixture['terms']).__next__
+    aggregates = DashboardAggregates(db)
+    return [
+        *[(f"add_sale_{lines}", add_sale(lines)) for lines in BASKET_SIZES],
+        ('get_product_by_barcode', lambda: db.get_product_by_barcode(next_barcode())),
+        ('get_products_with_optional_search_all', lambda: db.get_products_with_optional_search(None)),
+        ('get_products_with_optional_search_term', lambda: db.get_products_with_optional_search(next_term())),
+        ('get_daily_sales', db.get_daily_sales),
+        ('get_low_stock_products', db.get_low_stock_products),
+        ('dashboard_refresh', aggregates.refresh),
+        ('dashboard_rebuild', lambda: DashboardAggregates(db).refresh()),
+        ('get_sales_trend', db.get_sales_trend),
+        ('get_hourly_sales', db.get_hourly_sales),
+        ('get_sales_report_30d', lambda: db.get_sales_report(today - timedelta(days=29), today)),
+        ('get_top_products_30d', lambda: db.get_top_products(today - timedelta(days=29), today)),
+        ('sales_details_export_1d', lambda: sum(len(chunk) for chunk in db.iter_sales_details(today, today)))
+    ]
+
+
+def _table_sizes(db: Database) -> Dict[str, int]:
+    return {
+        table: db.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n']
+        for table in ('categories', 'products', 'sales', 'sales_details')
+    }
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_case(fn: Callable[[], Any], repeat: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    latencies = LatencyRecorder(window=repeat)
+    for _ in range(repeat):
+        with latencies.time():
+            fn()
+    return latencies.snapshot()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Database hot path benchmarks")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--case', nargs='+', help="only run these cases")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='hot_paths.json')
+    parser.add_argument('--baseline', help="earlier result file to compare with")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    db = Database()
+    try:
+        fixture = _setup(db, args.seed)
+        # Roll up earlier sales and build the search index now rather than
+        # inside the first timed calls
+        db.get_sales_rollup().catch_up(force=True)
+        db.get_products_with_optional_search(fixture['terms'][0])
+        deadline = time.monotonic() + 60
+        while not db.get_search_stats()['ready'] and time.monotonic() < deadline:
+            time.sleep(0.1)
+        cases = _cases(db, fixture, args.seed)
+        unknown = set(args.case or ()) - {name for name, _ in cases}
+        if unknown:
+            print(f"Unknown case(s): {', '.join(sorted(unknown))}")
+            return 2
+
+        results: Dict[str, Dict[str, float]] = {}
+        started_at = datetime.now()
+        print(f"{'case':<42}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+              f"{'vs base p95':>13}")
+        for name, fn in cases:
+            if args.case and name not in args.case:
+                continue
+            result = run_case(fn, args.repeat, args.warmup)
+            results[name] = result
+            before = baseline.get(name, {}).get('p95_ms')
+            ratio = f"{result['p95_ms'] / before:>12.2f}x" if before else f"{'-':>13}"
+            print(f"{name:<42}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['p99_ms']:>9.2f}{result['max_ms']:>9.2f}{ratio}")
+
+        report = {
+            'meta': {
+                'started_at': started_at.isoformat(timespec='seconds'),
+                'revision': _revision(),
+                'backend': db.backend,
+                'python': platform.python_version(),
+                'repeat': args.repeat,
+                'warmup': args.warmup,
+                'seed': args.seed,
+                'tables': _table_sizes(db)
+            },
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    finally:
+        db.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Checkout throughput when every lane sells the same promo item
+
+    python -m benchmarks.stock_contention [--lanes 1 4 16] [--seconds 5]
+                                          [--mode conditional locking]
+
+Each lane is a thread that checks out baskets of the promo product plus
+one other product through Database.add_sale for ``--seconds``, once per
+lane count and stock_check mode. This writes real sales and resets stock,
+so point config.ini at a scratch database (e.g. the sqlite backend with
+a throwaway path), never at a shop's.
+"""
+import sys
+import time
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.database import Database
+from utils.metrics import LatencyRecorder
+
+BENCH_STOCK = 10 ** 8
+
+
+def _setup(db: Database) -> Dict[str, Any]:
+    """Pick a user and products, and give the products enough stock for any run"""
+    db.ensure_admin_exists()
+    user = db.execute_query("SELECT id FROM users ORDER BY id LIMIT 1")[0]
+    products = db.execute_query(
+        "SELECT id, price FROM products WHERE is_active = TRUE ORDER BY id LIMIT 20"
+    ) or []
+    if len(products) < 2:
+        raise RuntimeError("Need at least two active products to benchmark")
+    placeholders = ", ".join(["%s"] * len(products))
+    db.execute_query(f"UPDATE products SET stock = %s WHERE id IN ({placeholders})",
+                     (BENCH_STOCK, *[product['id'] for product in products]))
+    return {'user_id': user['id'], 'promo': products[0], 'others': products[1:]}
+
+
+def run(db: Database, fixture: Dict[str, Any], lanes: int, seconds: float) -> Dict[str, Any]:
+    """Run ``lanes`` concurrent cashiers for ``seconds`` and summarise the result"""
+    latencies = LatencyRecorder(window=1_000_000)
+    failed = [0]
+    lock = threading.Lock()
+    writer = db.get_sale_writer()
+    retries_before, shortfalls_before = writer.retries, writer.shortfalls
+    deadline = time.monotonic() + seconds
+
+    def cashier(lane: int):
+        promo, others = fixture['promo'], fixture['others']
+        sale = 0
+        while time.monotonic() < deadline:
+            other = others[(lane + sale) % len(others)]
+            items = [
+                {'product_id': promo['id'], 'quantity': 1, 'price': float(promo['price'])},
+                {'product_id': other['id'], 'quantity': 1, 'price': float(other['price'])}
+            ]
+            started = time.perf_counter()
+            sale_id = db.add_sale(fixture['user_id'], items, sum(item['price'] for item in items))
+            if sale_id is None:
+                with lock:
+                    failed[0] += 1
+            else:
+                latencies.record(time.perf_counter() - started)
+            sale += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=cashier, args=(lane,), daemon=True) for lane in range(lanes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = latencies.snapshot()
+    return {
+        'mode': writer.stock_check,
+        'lanes': lanes,
+        'sales': summary['count'],
+        'sales_per_s': summary['count'] / elapsed if elapsed else 0.0,
+        'p50_ms': summary['p50_ms'],
+        'p95_ms': summary['p95_ms'],
+        'p99_ms': summary['p99_ms'],
+        'failed': failed[0],
+        'retries': writer.retries - retries_before,
+        'shortfalls': writer.shortfalls - shortfalls_before
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stock decrement contention benchmark")
+    parser.add_argument('--lanes', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--mode', nargs='+', choices=['conditional', 'locking'],
+                        default=['conditional', 'locking'])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    db = Database()
+    fixture = _setup(db)
+    writer = db.get_sale_writer()
+    configured = writer.stock_check
+
+    print(f"backend={db.backend} pool={db.get_pool_stats()['pool_size']}"
+          f"+{db.get_pool_stats()['max_overflow']} seconds={args.seconds}")
+    print(f"{'mode':<12}{'lanes':>6}{'sales':>8}{'sales/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'failed':>8}{'retries':>9}")
+    try:
+        for mode in args.mode:
+            writer.stock_check = mode
+            for lanes in args.lanes:
+                result = run(db, fixture, lanes, args.seconds)
+                print(f"{result['mode']:<12}{result['lanes']:>6}{result['sales']:>8}"
+                      f"{result['sales_per_s']:>10.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                      f"{result['p99_ms']:>9.2f}{result['failed']:>8}{result['retries']:>9}")
+    finally:
+        writer.stock_check = configured
+        db.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
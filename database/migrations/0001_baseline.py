@@ -0,0 +1,486 @@
+"""Create the base schema, or bring a database from before schema versioning up to it
+
+This file is the schema: a new database is built by applying it and the
+migrations after it. Every table is created IF NOT EXISTS, so on stores
+created by the old schema.sql or setup.py only what they never received
+is added: the sale idempotency key used by the outbox replay, the
+FULLTEXT product index, the created_at index on sales, the sales_details
+table (setup.py used to create sale_items instead) and the rollup tables.
+The sample catalog is only inserted into a database that had no tables.
+"""
+
+TABLES = {
+    'mysql': [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role ENUM('admin', 'staff') NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            last_login TIMESTAMP NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_username (username),
+            CHECK (LENGTH(username) >= 3)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS login_history (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            user_id INT,
+            ip_address VARCHAR(45),
+            device_info JSON,
+            browser_info VARCHAR(255),
+            location VARCHAR(255),
+            os_info VARCHAR(100),
+            login_type ENUM('password', 'token', 'oauth') DEFAULT 'password',
+            session_id VARCHAR(100),
+            status BOOLEAN DEFAULT TRUE,
+            status_message VARCHAR(255),
+            attempt_count INT DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            INDEX idx_user_id (user_id),
+            INDEX idx_created_at (created_at),
+            INDEX idx_status (status),
+            INDEX idx_ip_address (ip_address),
+            INDEX idx_session (session_id)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(100) UNIQUE NOT NULL,
+            description TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_name (name),
+            CHECK (LENGTH(name) >= 2)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(100) NOT NULL,
+            description TEXT,
+            price DECIMAL(10,2) NOT NULL,
+            stock INT NOT NULL DEFAULT 0,
+            barcode VARCHAR(50) UNIQUE,
+            category_id INT,
+            min_stock INT DEFAULT 10,
+            max_stock INT DEFAULT 1000,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL,
+            INDEX idx_barcode (barcode),
+            INDEX idx_category (category_id),
+            INDEX idx_product_name (name),
+            INDEX idx_product_price (price),
+            INDEX idx_product_stock (stock),
+            CHECK (price >= 0),
+            CHECK (stock >= 0),
+            CHECK (min_stock >= 0),
+            CHECK (max_stock >= min_stock)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS customers (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(100) NOT NULL,
+            phone VARCHAR(20),
+            email VARCHAR(100) UNIQUE,
+            address TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_phone (phone),
+            INDEX idx_email (email),
+            CHECK (LENGTH(name) >= 2)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            customer_id INT,
+            user_id INT NOT NULL,
+            total_amount DECIMAL(10,2) NOT NULL,
+            payment_method ENUM('cash', 'card') NOT NULL,
+            payment_status ENUM('pending', 'completed', 'failed') DEFAULT 'completed',
+            notes TEXT,
+            idempotency_key VARCHAR(64) UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE SET NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            INDEX idx_customer (customer_id),
+            INDEX idx_user (user_id),
+            INDEX idx_sale_amount (total_amount),
+            CHECK (total_amount >= 0)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_details (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            sale_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            INDEX idx_sale (sale_id),
+            INDEX idx_product (product_id),
+            CHECK (quantity > 0),
+            CHECK (price >= 0)
+        ) ENGINE=InnoDB
+        """,
+        # Sales rollups, maintained by utils/sales_rollup.py from the sales
+        # watermark in rollup_state
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_hourly (
+            sale_date DATE NOT NULL,
+            sale_hour TINYINT NOT NULL,
+            num_sales INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_lines INT NOT NULL DEFAULT 0,
+            total_items INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, sale_hour)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_daily (
+            sale_date DATE PRIMARY KEY,
+            num_sales INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_lines INT NOT NULL DEFAULT 0,
+            total_items INT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_rollup_daily (
+            sale_date DATE NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_transactions INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, product_id),
+            INDEX idx_product_rollup_product (product_id)
+        ) ENGINE=InnoDB
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name VARCHAR(50) PRIMARY KEY,
+            last_sale_id INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+        """
+    ],
+    # ENUM columns are TEXT with CHECK constraints, BOOLEAN/JSON are
+    # INTEGER/TEXT, timestamps default to local time as MySQL's
+    # CURRENT_TIMESTAMP does and ON UPDATE is emulated by TRIGGERS below
+    'sqlite': [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role TEXT NOT NULL CHECK (role IN ('admin', 'staff')),
+            is_active INTEGER DEFAULT 1,
+            last_login TIMESTAMP NULL,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (LENGTH(username) >= 3)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS login_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES users(id),
+            ip_address VARCHAR(45),
+            device_info TEXT,
+            browser_info VARCHAR(255),
+            location VARCHAR(255),
+            os_info VARCHAR(100),
+            login_type TEXT DEFAULT 'password' CHECK (login_type IN ('password', 'token', 'oauth')),
+            session_id VARCHAR(100),
+            status INTEGER DEFAULT 1,
+            status_message VARCHAR(255),
+            attempt_count INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_login_user_id ON login_history(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_login_created_at ON login_history(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_login_status ON login_history(status)",
+        "CREATE INDEX IF NOT EXISTS idx_login_ip_address ON login_history(ip_address)",
+        "CREATE INDEX IF NOT EXISTS idx_login_session ON login_history(session_id)",
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) UNIQUE NOT NULL,
+            description TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (LENGTH(name) >= 2)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            description TEXT,
+            price DECIMAL(10,2) NOT NULL,
+            stock INTEGER NOT NULL DEFAULT 0,
+            barcode VARCHAR(50) UNIQUE,
+            category_id INTEGER REFERENCES categories(id) ON DELETE SET NULL,
+            min_stock INTEGER DEFAULT 10,
+            max_stock INTEGER DEFAULT 1000,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (price >= 0),
+            CHECK (stock >= 0),
+            CHECK (min_stock >= 0),
+            CHECK (max_stock >= min_stock)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_product_category ON products(category_id)",
+        "CREATE INDEX IF NOT EXISTS idx_product_name ON products(name)",
+        "CREATE INDEX IF NOT EXISTS idx_product_price ON products(price)",
+        "CREATE INDEX IF NOT EXISTS idx_product_stock ON products(stock)",
+        """
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            phone VARCHAR(20),
+            email VARCHAR(100) UNIQUE,
+            address TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (LENGTH(name) >= 2)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_customer_phone ON customers(phone)",
+        """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER REFERENCES customers(id) ON DELETE SET NULL,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            total_amount DECIMAL(10,2) NOT NULL,
+            payment_method TEXT NOT NULL CHECK (payment_method IN ('cash', 'card')),
+            payment_status TEXT DEFAULT 'completed' CHECK (payment_status IN ('pending', 'completed', 'failed')),
+            notes TEXT,
+            idempotency_key VARCHAR(64) UNIQUE,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (total_amount >= 0)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sale_customer ON sales(customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sale_user ON sales(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sale_amount ON sales(total_amount)",
+        """
+        CREATE TABLE IF NOT EXISTS sales_details (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL REFERENCES sales(id) ON DELETE CASCADE,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            quantity INTEGER NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+            CHECK (quantity > 0),
+            CHECK (price >= 0)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_detail_sale ON sales_details(sale_id)",
+        "CREATE INDEX IF NOT EXISTS idx_detail_product ON sales_details(product_id)",
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_hourly (
+            sale_date DATE NOT NULL,
+            sale_hour INTEGER NOT NULL,
+            num_sales INTEGER NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_lines INTEGER NOT NULL DEFAULT 0,
+            total_items INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, sale_hour)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_daily (
+            sale_date DATE PRIMARY KEY,
+            num_sales INTEGER NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_lines INTEGER NOT NULL DEFAULT 0,
+            total_items INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_rollup_daily (
+            sale_date DATE NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_transactions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, product_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_product_rollup_product ON product_rollup_daily(product_id)",
+        """
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name VARCHAR(50) PRIMARY KEY,
+            last_sale_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+        )
+        """
+    ]
+}
+
+# ON UPDATE CURRENT_TIMESTAMP for SQLite
+TRIGGERS = {
+    f'{table}_updated_at': f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_updated_at AFTER UPDATE ON {table}
+        BEGIN
+            UPDATE {table} SET updated_at = DATETIME('now', 'localtime') WHERE id = NEW.id;
+        END
+    """
+    for table in ('users', 'categories', 'products', 'customers')
+}
+
+VIEWS = {
+    'low_stock_products': """
+        SELECT p.*, c.name as category_name
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        WHERE p.stock <= p.min_stock AND p.is_active = TRUE
+    """,
+    'daily_sales_summary': """
+        SELECT
+            DATE(created_at) as sale_date,
+            COUNT(*) as total_sales,
+            SUM(total_amount) as total_revenue,
+            payment_method
+        FROM sales
+        GROUP BY DATE(created_at), payment_method
+    """,
+    'product_sales_summary': """
+        SELECT
+            p.id,
+            p.name,
+            p.barcode,
+            c.name as category,
+            COUNT(sd.id) as times_sold,
+            SUM(sd.quantity) as total_quantity_sold,
+            SUM(sd.quantity * sd.price) as total_revenue
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        LEFT JOIN sales_details sd ON p.id = sd.product_id
+        GROUP BY p.id, p.name, p.barcode, c.name
+    """,
+    'category_sales_summary': """
+        SELECT
+            c.name as category,
+            COUNT(DISTINCT p.id) as total_products,
+            SUM(p.stock) as total_stock,
+            COUNT(sd.id) as total_sales
+        FROM categories c
+        LEFT JOIN products p ON c.id = p.category_id
+        LEFT JOIN sales_details sd ON p.id = sd.product_id
+        GROUP BY c.name
+    """
+}
+
+# Stored procedures exist on MySQL only
+PROCEDURES = {
+    'restock_products': """
+        CREATE PROCEDURE restock_products()
+        BEGIN
+            SELECT
+                id,
+                name,
+                stock,
+                min_stock,
+                (min_stock - stock) as quantity_needed
+            FROM products
+            WHERE stock <= min_stock AND is_active = TRUE
+            ORDER BY (min_stock - stock) DESC;
+        END
+    """,
+    'daily_sales_report': """
+        CREATE PROCEDURE daily_sales_report(IN report_date DATE)
+        BEGIN
+            SELECT
+                p.name as product_name,
+                c.name as category_name,
+                SUM(sd.quantity) as quantity_sold,
+                SUM(sd.quantity * sd.price) as total_revenue
+            FROM sales s
+            JOIN sales_details sd ON s.id = sd.sale_id
+            JOIN products p ON sd.product_id = p.id
+            JOIN categories c ON p.category_id = c.id
+            -- Half-open range rather than DATE(s.created_at) so idx_sale_date is used
+            WHERE s.created_at >= report_date AND s.created_at < report_date + INTERVAL 1 DAY
+            GROUP BY p.name, c.name
+            ORDER BY total_revenue DESC;
+        END
+    """
+}
+
+SAMPLE_CATEGORIES = [
+    ('Beverages', 'Drinks and liquid refreshments'),
+    ('Snacks', 'Quick bites and packaged treats'),
+    ('Groceries', 'Essential food and household items'),
+    ('Electronics', 'Electronic devices and accessories'),
+    ('Household', 'Home care and maintenance products')
+]
+
+# name, description, price, stock, barcode, category, min_stock, max_stock
+SAMPLE_PRODUCTS = [
+    ('Coca Cola 330ml', 'Refreshing carbonated drink', 1.50, 100, '5449000000996', 'Beverages', 20, 200),
+    ('Pepsi 330ml', 'Classic cola beverage', 1.50, 100, '5449000000989', 'Beverages', 20, 200),
+    ('Lays Classic', 'Original potato chips', 2.99, 50, '5449000000972', 'Snacks', 15, 100),
+    ('Doritos Nacho Cheese', 'Cheese flavored chips', 2.99, 50, '5449000000965', 'Snacks', 15, 100),
+    ('Rice 1kg', 'Premium long grain rice', 5.99, 30, '5449000000958', 'Groceries', 10, 50),
+    ('USB Cable', 'Type-C charging cable', 9.99, 20, '5449000000941', 'Electronics', 5, 30),
+    ('Dish Soap', 'Liquid dish washing soap', 3.99, 40, '5449000000934', 'Household', 10, 60)
+]
+
+
+def _seed(schema):
+    for name, description in SAMPLE_CATEGORIES:
+        schema.execute("INSERT IGNORE INTO categories (name, description) VALUES (%s, %s)",
+                       (name, description))
+    for name, description, price, stock, barcode, category, min_stock, max_stock in SAMPLE_PRODUCTS:
+        schema.execute("""
+            INSERT IGNORE INTO products
+                (name, description, price, stock, barcode, category_id, min_stock, max_stock)
+            SELECT %s, %s, %s, %s, %s, id, %s, %s FROM categories WHERE name = %s
+        """, (name, description, price, stock, barcode, min_stock, max_stock, category))
+
+
+def upgrade(schema):
+    new_database = not schema.table_exists('products')
+
+    for statement in TABLES[schema.backend]:
+        schema.execute(statement)
+    if schema.backend == 'sqlite':
+        for statement in TRIGGERS.values():
+            schema.execute(statement)
+    else:
+        for name, statement in PROCEDURES.items():
+            schema.execute(f"DROP PROCEDURE IF EXISTS {name}")
+            schema.execute(statement)
+    for name, query in VIEWS.items():
+        schema.execute(f"DROP VIEW IF EXISTS {name}")
+        schema.execute(f"CREATE VIEW {name} AS {query}")
+
+    # Stores created before these were part of the schema
+    if schema.add_column('sales', 'idempotency_key', 'VARCHAR(64) NULL'):
+        schema.create_index('sales', 'idempotency_key', ['idempotency_key'], unique=True)
+    schema.create_index('sales', 'idx_sale_date', ['created_at'])
+    schema.create_index('products', 'idx_product_fulltext', ['name', 'description'], fulltext=True)
+    schema.execute("INSERT IGNORE INTO rollup_state (name, last_sale_id) VALUES ('sales', 0)")
+
+    if new_database:
+        _seed(schema)
@@ -0,0 +1,16 @@
+"""Covering indexes for the sales range scans and per-product aggregates
+
+idx_sale_date_amount answers "revenue between two timestamps" from the
+index alone. idx_detail_product_cover serves per-product quantity and
+revenue without touching sales_details rows, and idx_detail_sale_cover
+does the same for the sale -> lines join used by the rollup job and the
+dashboard's incremental refresh.
+"""
+
+
+def upgrade(schema):
+    schema.create_index('sales', 'idx_sale_date_amount', ['created_at', 'total_amount'])
+    schema.create_index('sales_details', 'idx_detail_product_cover',
+                        ['product_id', 'sale_id', 'quantity', 'price'])
+    schema.create_index('sales_details', 'idx_detail_sale_cover',
+                        ['sale_id', 'product_id', 'quantity', 'price'])
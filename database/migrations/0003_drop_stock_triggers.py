@@ -0,0 +1,13 @@
+"""Drop the per-row stock triggers now that the sale writer checks stock
+
+check_stock_before_sale ran a SELECT for every sales_details row and
+after_sale_detail_insert decremented stock a second time on top of the
+sale writer's own UPDATE. The conditional decrement (or the locking
+check) covers both in one statement per sale.
+"""
+
+
+def upgrade(schema):
+    schema.execute("DROP TRIGGER IF EXISTS check_stock_before_sale")
+    if schema.backend == 'mysql':
+        schema.execute("DROP TRIGGER IF EXISTS after_sale_detail_insert")
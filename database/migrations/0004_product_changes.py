@@ -0,0 +1,90 @@
+"""Add the product_changes table and the triggers that feed it
+
+Every lane follows this table (utils/product_changes.py) to patch its
+product caches after a sale or product edit instead of reloading them.
+"""
+
+# Product columns whose change is published to the feed
+WATCHED_COLUMNS = ('name', 'description', 'price', 'stock', 'category_id',
+                   'min_stock', 'barcode', 'is_active')
+
+TABLES = {
+    'mysql': [
+        """
+        CREATE TABLE IF NOT EXISTS product_changes (
+            version BIGINT PRIMARY KEY AUTO_INCREMENT,
+            product_id INT NOT NULL,
+            change_type VARCHAR(10) NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_product_changes_time (changed_at)
+        ) ENGINE=InnoDB
+        """
+    ],
+    'sqlite': [
+        """
+        CREATE TABLE IF NOT EXISTS product_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            change_type TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_product_changes_time ON product_changes(changed_at)"
+    ]
+}
+
+_MYSQL_CHANGED = " OR ".join(f"NOT (OLD.{column} <=> NEW.{column})" for column in WATCHED_COLUMNS)
+_SQLITE_CHANGED = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in WATCHED_COLUMNS)
+
+TRIGGERS = {
+    'mysql': {
+        'product_changes_insert': """
+            CREATE TRIGGER product_changes_insert AFTER INSERT ON products
+            FOR EACH ROW
+                INSERT INTO product_changes (product_id, change_type) VALUES (NEW.id, 'insert')
+        """,
+        'product_changes_update': f"""
+            CREATE TRIGGER product_changes_update AFTER UPDATE ON products
+            FOR EACH ROW
+            BEGIN
+                IF {_MYSQL_CHANGED} THEN
+                    INSERT INTO product_changes (product_id, change_type) VALUES (NEW.id, 'update');
+                END IF;
+            END
+        """,
+        'product_changes_delete': """
+            CREATE TRIGGER product_changes_delete AFTER DELETE ON products
+            FOR EACH ROW
+                INSERT INTO product_changes (product_id, change_type) VALUES (OLD.id, 'delete')
+        """
+    },
+    'sqlite': {
+        'product_changes_insert': """
+            CREATE TRIGGER product_changes_insert AFTER INSERT ON products
+            BEGIN
+                INSERT INTO product_changes (product_id, change_type) VALUES (NEW.id, 'insert');
+            END
+        """,
+        'product_changes_update': f"""
+            CREATE TRIGGER product_changes_update AFTER UPDATE ON products
+            WHEN {_SQLITE_CHANGED}
+            BEGIN
+                INSERT INTO product_changes (product_id, change_type) VALUES (NEW.id, 'update');
+            END
+        """,
+        'product_changes_delete': """
+            CREATE TRIGGER product_changes_delete AFTER DELETE ON products
+            BEGIN
+                INSERT INTO product_changes (product_id, change_type) VALUES (OLD.id, 'delete');
+            END
+        """
+    }
+}
+
+
+def upgrade(schema):
+    for statement in TABLES[schema.backend]:
+        schema.execute(statement)
+    for name, statement in TRIGGERS[schema.backend].items():
+        schema.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema.execute(statement)
@@ -22,10 +22,6 @@ from utils.font_config import configure_fonts
 import matplotlib
 matplotlib.use('Agg')  # Use Agg backend for better compatibility
 import bcrypt
-import platform
-import socket
-import uuid
-import json
 import threading
 from typing import Dict, Any
 
@@ -861,53 +857,9 @@ class LoginWindow(ctk.CTk):
             logger.error(f"Error showing validation message: {e}")
 
     def record_login_attempt(self, user_id, status, message):
-        """Record login attempt with enhanced tracking"""
+        """Record login attempt; written in the background by the login audit buffer"""
         try:
-            # Get system info
-            os_info = f"{platform.system()} {platform.release()}"
-            browser_info = f"Python {platform.python_version()}"
-            ip_address = socket.gethostbyname(socket.gethostname())
-            
-            # Get device info
-            device_info = {
-                "machine": platform.machine(),
-                "processor": platform.processor(),
-                "node": platform.node(),
-                "platform": platform.platform(),
-                "python_version": platform.python_version(),
-                "device_id": str(uuid.getnode())
-            }
-            
-            # Create session ID
-            session_id = str(uuid.uuid4())
-            
-            # Get location (in a real app, you might want to use a geolocation service)
-            location = "Local"
-            
-            # Insert login record
-            query = """
-                INSERT INTO login_history (
-                    user_id, ip_address, device_info, browser_info,
-                    location, os_info, session_id, status,
-                    status_message, login_type
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-            """
-            
-            self.db.execute_query(query, (
-                user_id,
-                ip_address,
-                json.dumps(device_info),
-                browser_info,
-                location,
-                os_info,
-                session_id,
-                status,
-                message,
-                'password'
-            ))
-            
+            self.db.record_login_attempt(user_id, status, message)
         except Exception as e:
             logger.error(f"Failed to record login attempt: {e}")
 
@@ -1747,14 +1699,8 @@ class Application:
             if not self.db.test_connection():
                 raise Exception("Could not connect to database")
             
-            # Ensure tables exist by checking users table
-            result = self.db.execute_query("SHOW TABLES LIKE 'users'")
-            if not result:
-                # Initialize database schema
-                from setup import initialize_database
-                if not initialize_database():
-                    raise Exception("Failed to initialize database schema")
-            
+            # Database() has already applied any pending schema migrations
+
             # Ensure admin user exists
             if not self.db.ensure_admin_exists():
                 raise Exception("Failed to create admin user")
@@ -2043,14 +1989,8 @@ if __name__ == "__main__":
         if not db.test_connection():
             raise Exception("Could not connect to database")
             
-        # Ensure database is set up
-        result = db.execute_query("SHOW TABLES LIKE 'users'")
-        if not result:
-            # Initialize database schema
-            from setup import initialize_database
-            if not initialize_database():
-                raise Exception("Failed to initialize database schema")
-        
+        # Database() has already applied any pending schema migrations
+
         # Ensure admin user exists
         if not db.ensure_admin_exists():
             raise Exception("Failed to create admin user")
@@ -67,127 +67,6 @@ def create_database():
         if 'conn' in locals():
             conn.close()
 
-def create_tables():
-    """Create necessary tables"""
-    config = read_config()
-    if not config:
-        return False
-
-    try:
-        conn = mysql.connector.connect(
-            **config,
-            charset='utf8mb4',
-            collation='utf8mb4_unicode_ci'
-        )
-        cursor = conn.cursor()
-
-        # Set connection character set
-        cursor.execute("SET NAMES utf8mb4")
-        cursor.execute("SET CHARACTER SET utf8mb4")
-        cursor.execute("SET character_set_connection=utf8mb4")
-
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role ENUM('admin', 'staff') NOT NULL DEFAULT 'staff',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP NULL,
-                status ENUM('active', 'inactive') DEFAULT 'active'
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        # Categories table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(50) NOT NULL UNIQUE,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP NULL ON UPDATE CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        # Products table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                description TEXT,
-                price DECIMAL(10,2) NOT NULL,
-                category_id INT,
-                stock INT DEFAULT 0,
-                min_stock INT DEFAULT 10,
-                barcode VARCHAR(100) UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP NULL ON UPDATE CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (category_id) REFERENCES categories(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        # Sales table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sales (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT,
-                total_amount DECIMAL(10,2) NOT NULL,
-                payment_method VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        # Sale items table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sale_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                sale_id INT,
-                product_id INT,
-                quantity INT NOT NULL,
-                price_per_unit DECIMAL(10,2) NOT NULL,
-                subtotal DECIMAL(10,2) NOT NULL,
-                FOREIGN KEY (sale_id) REFERENCES sales(id),
-                FOREIGN KEY (product_id) REFERENCES products(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        # Login history table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS login_history (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT,
-                login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ip_address VARCHAR(45),
-                device_info TEXT,
-                browser_info VARCHAR(255),
-                location VARCHAR(255),
-                os_info VARCHAR(255),
-                session_id VARCHAR(255),
-                status BOOLEAN DEFAULT TRUE,
-                status_message TEXT,
-                login_type VARCHAR(50),
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-
-        conn.commit()
-        logger.info("All tables created successfully")
-        return True
-
-    except Exception as e:
-        logger.error(f"Failed to create tables: {e}")
-        return False
-
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
-
 def create_admin_user():
     """Create default admin user if not exists"""
     config = read_config()
@@ -286,12 +165,23 @@ def create_default_data():
         if 'conn' in locals():
             conn.close()
 
+def run_migrations():
+    """Create the tables, or bring an existing database up to date, from database/migrations"""
+    try:
+        from utils.database import Database
+        applied = Database().get_migrations().migrate()
+        logger.info(f"Applied {len(applied)} migration(s)")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to apply migrations: {e}")
+        return False
+
 def initialize_database():
     """Initialize the database with all required data"""
     if not create_database():
         return False
     
-    if not create_tables():
+    if not run_migrations():
         return False
     
     if not create_admin_user():
@@ -0,0 +1,32 @@
+import pytest
+
+from utils.database import Database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A Database on a fresh SQLite file, built by the migrations like any new store
+
+    The outbox replayer's retry interval is long enough that tests drive
+    it through drain() instead of racing its thread.
+    """
+    monkeypatch.setattr(Database, '_read_backend_config', lambda self: {
+        'backend': 'sqlite', 'path': str(tmp_path / 'mart.db'), 'busy_timeout': 1.0
+    })
+    monkeypatch.setattr(Database, '_read_outbox_config', lambda self: {
+        'path': str(tmp_path / 'sale_outbox.db'), 'batch_size': 50, 'interval': 60.0, 'max_backoff': 60.0
+    })
+    monkeypatch.setattr(Database, '_read_performance_config', lambda self: {'slow_log_path': None})
+    monkeypatch.setattr(Database, '_read_checkout_config', lambda self: {
+        'stock_check': 'conditional', 'write_retries': 2, 'retry_delay': 0.01
+    })
+    monkeypatch.setattr(Database, '_instance', None)
+    database = Database()
+    database.ensure_admin_exists()
+    yield database
+    database.disconnect()
+
+
+@pytest.fixture
+def user_id(db):
+    return db.execute_query("SELECT id FROM users WHERE username = 'admin'")[0]['id']
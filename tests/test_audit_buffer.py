@@ -0,0 +1,108 @@
+import time
+
+import pytest
+from mysql.connector import errors
+
+from utils.audit_buffer import LoginAuditBuffer
+from utils.database import is_connection_error
+from utils.sqlite_backend import SQLiteCursor
+
+
+@pytest.fixture
+def audit(db):
+    # Flushed by the tests, not by the writer thread
+    buffer = LoginAuditBuffer(db, is_connection_error, flush_events=1000, flush_interval=60.0,
+                              max_buffered=3)
+    yield buffer
+    buffer.close()
+
+
+def history(db):
+    rows = db.execute_query("SELECT user_id, status_message FROM login_history ORDER BY id")
+    return [(row['user_id'], row['status_message']) for row in rows]
+
+
+def test_flush_writes_buffered_logins_in_one_go(db, audit, user_id):
+    first = audit.record(user_id, True, "ok")
+    second = audit.record(None, False, "bad password")
+
+    assert first != second
+    assert history(db) == []
+    assert audit.flush() == 2
+    assert history(db) == [(user_id, "ok"), (None, "bad password")]
+    assert audit.stats()['flushes'] == 1
+
+
+def test_unreachable_server_keeps_the_newest_rows(db, audit, user_id, monkeypatch):
+    def offline(rows):
+        raise errors.OperationalError(msg="Can't connect", errno=2003)
+
+    for number in range(4):
+        audit.record(user_id, True, f"login {number}")
+    with monkeypatch.context() as patched:
+        patched.setattr(audit, '_insert', offline)
+        assert audit.flush() == 0
+
+    stats = audit.stats()
+    assert (stats['buffered'], stats['dropped']) == (3, 1)
+    assert audit.flush() == 3
+    assert [message for _, message in history(db)] == ["login 1", "login 2", "login 3"]
+
+
+def test_refused_row_is_dropped_not_retried_forever(db, audit, user_id):
+    audit.record(user_id, True, "before")
+    audit.record(9999, True, "unknown user")
+    audit.record(user_id, True, "after")
+
+    assert audit.flush() == 2
+
+    assert history(db) == [(user_id, "before"), (user_id, "after")]
+    stats = audit.stats()
+    assert (stats['rejected'], stats['buffered']) == (1, 0)
+    assert audit.flush() == 0
+
+
+def test_large_flush_fits_the_sqlite_variable_limit(db, user_id, monkeypatch):
+    execute = SQLiteCursor.execute
+
+    def default_limit(cursor, query, params=None):
+        # Builds differ; SQLite's own default is 32766 variables per statement
+        if params and len(params) > 32766:
+            raise errors.ProgrammingError(msg="too many SQL variables")
+        return execute(cursor, query, params)
+
+    monkeypatch.setattr(SQLiteCursor, 'execute', default_limit)
+    audit = LoginAuditBuffer(db, is_connection_error, flush_events=10000, flush_interval=60.0)
+    try:
+        for _ in range(5000):
+            audit.record(user_id, True)
+
+        assert audit.flush() == 5000
+        # Written in batches, not after a failed statement row by row
+        assert audit.stats()['last_error'] is None
+    finally:
+        audit.close()
+    assert db.execute_query("SELECT COUNT(*) AS n FROM login_history")[0]['n'] == 5000
+
+
+def test_writer_thread_survives_unexpected_errors(db, user_id, monkeypatch):
+    audit = LoginAuditBuffer(db, is_connection_error, flush_events=1, flush_interval=60.0)
+    try:
+        with monkeypatch.context() as broken:
+            broken.setattr(audit, '_insert', lambda rows: 1 / 0)
+            audit.record(user_id, True, "lost")
+            for _ in range(200):
+                if audit.stats()['rejected']:
+                    break
+                time.sleep(0.01)
+
+        audit.record(user_id, True, "kept")
+        for _ in range(200):
+            if audit.stats()['written']:
+                break
+            time.sleep(0.01)
+    finally:
+        audit.close()
+
+    assert audit.stats()['rejected'] == 1
+    assert history(db) == [(user_id, "kept")]
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+from mysql.connector.errors import PoolError
+
+from utils.connection_pool import ConnectionLifecycle, ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.connection_id = number
+        self.connected = True
+        self.closed = False
+        self.resets = 0
+        self.fail_reset = False
+        self.statements = []
+
+    def is_connected(self):
+        return self.connected
+
+    def reconnect(self):
+        self.connected = True
+
+    def reset_session(self):
+        if self.fail_reset:
+            raise RuntimeError("reset failed")
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query):
+        self.connection.statements.append(query)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def make_pool(opened):
+    pools = []
+
+    def connect():
+        opened.append(FakeConnection(len(opened) + 1))
+        return opened[-1]
+
+    def make(**options):
+        options.setdefault('reap_interval', 0)
+        pool = ConnectionPool(connect, **options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close_all()
+
+
+def test_connections_are_reused_and_reset(make_pool, opened):
+    pool = make_pool(pool_size=2)
+
+    with pool.get_connection() as first:
+        first_id = first.connection_id
+    with pool.get_connection() as second:
+        assert second.connection_id == first_id
+
+    assert len(opened) == 1
+    assert opened[0].resets == 2
+    assert pool.stats()['idle'] == 1
+
+
+def test_overflow_then_wait_then_exhausted(make_pool, opened):
+    pool = make_pool(pool_size=1, max_overflow=1, timeout=0.05)
+    held = [pool.get_connection(), pool.get_connection()]
+
+    with pytest.raises(PoolError):
+        pool.get_connection()
+
+    stats = pool.stats()
+    assert (stats['in_use'], stats['peak_in_use'], stats['exhausted']) == (2, 2, 1)
+    for connection in held:
+        connection.close()
+    assert len(opened) == 2
+
+
+def test_waiter_gets_the_returned_connection(make_pool):
+    pool = make_pool(pool_size=1, max_overflow=0, timeout=2.0)
+    held = pool.get_connection()
+    borrowed = []
+
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.get_connection()))
+    waiter.start()
+    while not pool.stats()['waiters']:
+        time.sleep(0.001)
+    held.close()
+    waiter.join(1.0)
+
+    assert len(borrowed) == 1
+    borrowed[0].close()
+
+
+def test_connection_that_fails_to_reset_is_discarded(make_pool, opened):
+    pool = make_pool(pool_size=2)
+    connection = pool.get_connection()
+    opened[0].fail_reset = True
+    connection.close()
+
+    assert opened[0].closed
+    assert (pool.stats()['idle'], pool.stats()['discarded']) == (0, 1)
+
+
+def test_dropped_connection_is_reconnected_on_borrow(make_pool, opened):
+    pool = make_pool(pool_size=1)
+    pool.get_connection().close()
+    opened[0].connected = False
+
+    with pool.get_connection() as connection:
+        assert connection.is_connected()
+    assert len(opened) == 1
+
+
+def test_reaper_keeps_min_idle_warm(make_pool, opened):
+    pool = make_pool(pool_size=3, idle_timeout=0.01, min_idle=1)
+    held = [pool.get_connection() for _ in range(3)]
+    for connection in held:
+        connection.close()
+    time.sleep(0.02)
+
+    assert pool.reap_idle() == 2
+    # The most recently returned connection is the one kept
+    assert [connection.closed for connection in opened] == [True, True, False]
+
+
+def test_closed_pool_refuses_borrows(make_pool):
+    pool = make_pool()
+    pool.close_all()
+
+    with pytest.raises(PoolError):
+        pool.get_connection()
+
+
+def test_session_is_initialised_once_per_server_session(make_pool, opened):
+    lifecycle = ConnectionLifecycle()
+    pool = make_pool(pool_size=1, lifecycle=lifecycle)
+
+    for _ in range(3):
+        with pool.get_connection() as connection:
+            lifecycle.on_borrow(connection)
+    # A reconnect gets a new server thread id, and a new session
+    opened[0].connection_id = 99
+    with pool.get_connection() as connection:
+        state = lifecycle.on_borrow(connection)
+
+    assert opened[0].statements == ["SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci"] * 2
+    assert (state.borrows, state.inits) == (4, 2)
+    assert lifecycle.stats() == {'connections': 1, 'borrows': 4, 'session_inits': 2,
+                                 'round_trips_avoided': 10}
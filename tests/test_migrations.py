@@ -0,0 +1,120 @@
+import sqlite3
+
+import pytest
+
+# A store set up before schema versioning: no schema_version, no sale
+# idempotency key, no created_at index, rollups or change feed
+OLD_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        role TEXT NOT NULL,
+        is_active INTEGER DEFAULT 1,
+        last_login TIMESTAMP NULL,
+        created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+        updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    );
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(100) UNIQUE NOT NULL,
+        description TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+        updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    );
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(100) NOT NULL,
+        description TEXT,
+        price DECIMAL(10,2) NOT NULL,
+        stock INTEGER NOT NULL DEFAULT 0,
+        barcode VARCHAR(50) UNIQUE,
+        category_id INTEGER REFERENCES categories(id) ON DELETE SET NULL,
+        min_stock INTEGER DEFAULT 10,
+        max_stock INTEGER DEFAULT 1000,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+        updated_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    );
+    CREATE TABLE sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        total_amount DECIMAL(10,2) NOT NULL,
+        payment_method TEXT NOT NULL,
+        payment_status TEXT DEFAULT 'completed',
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    );
+    CREATE TABLE sales_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER NOT NULL REFERENCES sales(id) ON DELETE CASCADE,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        quantity INTEGER NOT NULL,
+        price DECIMAL(10,2) NOT NULL,
+        created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    );
+    INSERT INTO users (username, password, role) VALUES ('cashier', 'x', 'staff');
+    INSERT INTO categories (name) VALUES ('Bakery');
+    INSERT INTO products (name, price, stock, barcode, category_id) VALUES ('Baguette', 1.20, 30, '4000000000001', 1);
+    INSERT INTO sales (user_id, total_amount, payment_method) VALUES (1, 2.40, 'cash');
+    INSERT INTO sales_details (sale_id, product_id, quantity, price) VALUES (1, 1, 2, 1.20);
+"""
+
+
+@pytest.fixture
+def old_store(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / 'mart.db'))
+    connection.executescript(OLD_SCHEMA)
+    connection.close()
+
+
+@pytest.fixture
+def upgraded(old_store, db):
+    """The old store after Database() applied the migrations on startup"""
+    return db
+
+
+def names(db, kind):
+    rows = db.execute_query("SELECT name FROM sqlite_master WHERE type = %s", (kind,))
+    return {row['name'] for row in rows}
+
+
+def columns(db, table):
+    return {row['name'] for row in db.execute_query("SELECT name FROM pragma_table_info(%s)", (table,))}
+
+
+def test_startup_brings_an_old_store_up_to_date(upgraded):
+    versions = [row['version'] for row in upgraded.get_migrations().status() if row['applied_at']]
+    assert versions == [migration.version for migration in upgraded.get_migrations().available()]
+
+    assert 'idempotency_key' in columns(upgraded, 'sales')
+    assert {'sales_rollup_hourly', 'sales_rollup_daily', 'product_rollup_daily',
+            'rollup_state', 'product_changes'} <= names(upgraded, 'table')
+    assert {'idx_sale_date', 'idx_sale_date_amount'} <= names(upgraded, 'index')
+
+
+def test_upgrade_keeps_the_store_data_and_skips_the_samples(upgraded):
+    products = upgraded.execute_query("SELECT name, stock FROM products")
+    assert [(row['name'], row['stock']) for row in products] == [('Baguette', 30)]
+    assert upgraded.execute_query("SELECT COUNT(*) AS n FROM categories")[0]['n'] == 1
+    assert upgraded.execute_query("SELECT COUNT(*) AS n FROM sales_details")[0]['n'] == 1
+
+
+def test_upgraded_store_sells_and_records_changes(upgraded, user_id):
+    result = upgraded.submit_sale(user_id, [{'product_id': 1, 'quantity': 3, 'price': 1.2}], 3.6)
+
+    assert result['status'] == 'committed'
+    assert upgraded.execute_query("SELECT stock FROM products WHERE id = 1")[0]['stock'] == 27
+    changes = upgraded.execute_query("SELECT product_id FROM product_changes")
+    assert [row['product_id'] for row in changes] == [1]
+
+
+def test_migrate_again_applies_nothing(upgraded):
+    assert upgraded.get_migrations().migrate() == []
+
+
+def test_new_store_gets_the_sample_catalog(db):
+    assert db.execute_query("SELECT COUNT(*) AS n FROM products")[0]['n'] == 7
+    assert db.get_migrations().migrate() == []
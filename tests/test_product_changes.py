@@ -0,0 +1,76 @@
+import pytest
+
+from utils.product_changes import ProductChangeFeed
+
+
+@pytest.fixture
+def applied():
+    return []
+
+
+@pytest.fixture
+def feed(db, applied):
+    feed = ProductChangeFeed(db, applied.append, lambda: None, journal_size=3)
+    # The first poll only takes the current version as its starting point
+    assert feed.poll() == 0
+    return feed
+
+
+def set_stock(db, product_id, stock):
+    db.execute_query("UPDATE products SET stock = %s WHERE id = %s", (stock, product_id))
+
+
+def settle(db):
+    db.execute_query("UPDATE product_changes SET changed_at = DATE_SUB(changed_at, INTERVAL 1 MINUTE)")
+
+
+def test_poll_hands_over_the_changed_products(db, feed, applied):
+    set_stock(db, 1, 80)
+    db.delete_product_soft(2)
+    db.execute_query("UPDATE products SET max_stock = 500 WHERE id = 3")
+
+    assert feed.poll() == 2
+    assert applied[-1][1].stock == 80
+    assert applied[-1][2] is None
+    assert 3 not in applied[-1]
+    assert feed.stats()['resets'] == 1
+
+
+def test_unsettled_changes_are_applied_once(db, feed, applied):
+    set_stock(db, 1, 80)
+
+    assert feed.poll() == 1
+    assert feed.stats()['unsettled'] == 1
+    # Still young: re-read on the next poll, but not handed over again
+    assert feed.poll() == 0
+    settle(db)
+    assert feed.poll() == 0
+    assert feed.stats()['unsettled'] == 0
+    assert len(applied) == 1
+
+
+def test_since_returns_the_latest_state_per_product(db, feed):
+    start = feed.sequence
+    set_stock(db, 1, 80)
+    feed.poll()
+    middle = feed.sequence
+    settle(db)
+    set_stock(db, 1, 70)
+    set_stock(db, 4, 10)
+    feed.poll()
+
+    sequence, changed = feed.since(start)
+    assert sequence == feed.sequence
+    assert {product_id: product.stock for product_id, product in changed.items()} == {1: 70, 4: 10}
+    assert set(feed.since(middle)[1]) == {1, 4}
+    assert feed.since(feed.sequence)[1] == {}
+
+
+def test_since_asks_for_a_reload_once_the_journal_moved_on(db, feed):
+    start = feed.sequence
+    for product_id in (1, 2, 3, 4):
+        set_stock(db, product_id, 7)
+    feed.poll()
+
+    assert feed.since(start)[1] is None
+    assert set(feed.since(feed.sequence - 2)[1]) == {3, 4}
@@ -0,0 +1,79 @@
+import pytest
+
+from utils.product_import import ProductImporter
+
+HEADER = "name,description,price,stock,category_id,min_stock,barcode\n"
+
+
+def write_csv(tmp_path, lines):
+    path = tmp_path / "products.csv"
+    path.write_text(HEADER + "".join(line + "\n" for line in lines))
+    return str(path)
+
+
+def product(db, barcode):
+    rows = db.execute_query(
+        "SELECT name, price, stock, is_active FROM products WHERE barcode = %s", (barcode,)
+    )
+    return rows[0] if rows else None
+
+
+def test_report_counts_rows_and_rejects_bad_lines(db, tmp_path):
+    path = write_csv(tmp_path, [
+        "Green Tea,,1.25,40,1,5,1000000000001",
+        "Bad Price,,abc,10,1,5,1000000000002",
+        "No Category,,2.00,10,99,5,1000000000003",
+        ",,2.00,10,1,5,1000000000004",
+        "Mineral Water,,0.80,120,1,10,",
+    ])
+
+    report = db.import_products(path)
+
+    assert report['rows_read'] == 5
+    assert report['imported'] == 2
+    assert report['transactions'] == 1
+    assert [(row['line'], row['reason']) for row in report['rejected']] == [
+        (3, "price must be a number >= 0"),
+        (4, "unknown category_id"),
+        (5, "missing name"),
+    ]
+    assert product(db, '1000000000001')['stock'] == 40
+    assert product(db, '1000000000002') is None
+
+
+def test_chunks_are_one_transaction_each(db, tmp_path):
+    path = write_csv(tmp_path, [f"Item {n},,1.00,5,2,1,20000000000{n:02d}" for n in range(7)])
+
+    report = ProductImporter(db, chunk_size=3, batch_size=2).run(path)
+
+    assert report['imported'] == 7
+    assert report['transactions'] == 3
+    assert report['rejected'] == []
+
+
+def test_existing_barcode_is_updated_not_duplicated(db, tmp_path):
+    path = write_csv(tmp_path, ["Coca Cola 330ml,,0.95,75,1,10,5449000000996"])
+
+    report = db.import_products(path)
+
+    assert report['imported'] == 1
+    rows = db.execute_query("SELECT id, name, stock FROM products WHERE barcode = %s", ('5449000000996',))
+    assert [(row['id'], row['name'], row['stock']) for row in rows] == [(1, 'Coca Cola 330ml', 75)]
+
+
+def test_reimported_barcode_reactivates_deleted_product(db, tmp_path):
+    db.delete_product_soft(1)
+    assert db.get_product_by_id(1) is None
+
+    db.import_products(write_csv(tmp_path, ["Coca Cola,,1.00,60,1,10,5449000000996"]))
+
+    assert product(db, '5449000000996')['is_active']
+    assert db.get_product_by_id(1)['stock'] == 60
+
+
+def test_missing_required_column_is_refused(db, tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("name,price\nTea,1.00\n")
+
+    with pytest.raises(ValueError, match="missing stock, category_id"):
+        db.import_products(str(path))
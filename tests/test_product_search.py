@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+
+import pytest
+
+from utils import product_search
+from utils.product_search import ProductSearchIndex, query_trigrams, trigrams
+
+PRODUCTS = [
+    {'id': 1, 'name': 'Coca Cola', 'barcode': '5449000000996', 'category_name': 'Beverages',
+     'description': 'Soft drink'},
+    {'id': 2, 'name': 'Pepsi Cola', 'barcode': '5449000000989', 'category_name': 'Beverages',
+     'description': 'Soft drink'},
+    {'id': 3, 'name': 'Potato Chips', 'barcode': '4000000000001', 'category_name': 'Snacks',
+     'description': 'Salted crisps'},
+    {'id': 4, 'name': 'Dish Soap', 'barcode': None, 'category_name': 'Household',
+     'description': 'Lemon scented, cola free'},
+]
+
+
+@pytest.fixture
+def index():
+    index = ProductSearchIndex()
+    assert index.start_build()
+    assert index.finish_build(PRODUCTS, index.generation)
+    return index
+
+
+def test_trigrams_pad_word_starts():
+    assert trigrams("cola") == {"  c", " co", "col", "ola"}
+    assert query_trigrams("co") == {" co"}
+    assert query_trigrams("cola") == {"col", "ola"}
+
+
+def test_search_is_none_until_built():
+    assert ProductSearchIndex().search("cola") is None
+
+
+def test_name_matches_rank_before_other_fields(index):
+    assert index.search("cola") == [1, 2, 4]
+    assert index.search("chi") == [3]
+    assert index.search("bev") == [1, 2]
+
+
+def test_exact_barcode_ranks_first(index):
+    assert index.search("5449000000996")[0] == 1
+
+
+def test_misspelled_query_falls_back_to_partial_overlap(index):
+    assert index.search("potato chip") == [3]
+    assert index.stats()['fuzzy_fallbacks'] == 0
+    assert index.search("potatto") == [3]
+    assert index.stats()['fuzzy_fallbacks'] == 1
+
+
+def test_upsert_and_remove_patch_the_index(index):
+    index.upsert({'id': 5, 'name': 'Cola Zero', 'barcode': None, 'category_name': 'Beverages',
+                  'description': None})
+    index.upsert(dict(PRODUCTS[1], name='Pepsi Max'))
+    index.remove(4)
+
+    assert index.search("cola") == [5, 1]
+    assert index.search("pepsi max") == [2]
+
+
+def test_build_is_discarded_when_a_product_changed_meanwhile():
+    index = ProductSearchIndex()
+    index.start_build()
+    generation = index.generation
+    index.upsert(PRODUCTS[0])
+
+    assert not index.finish_build(PRODUCTS, generation)
+    assert not index.is_ready()
+    assert index.start_build()
+
+
+def test_large_candidate_sets_are_ranked_in_tiers(monkeypatch):
+    monkeypatch.setattr(product_search, 'FULL_RANK_LIMIT', 2)
+    index = ProductSearchIndex()
+    index.start_build()
+    index.finish_build(PRODUCTS, index.generation)
+
+    # Name matches in name order, then products matching on other fields
+    assert index.search("cola") == [1, 2, 4]
+    assert index.search("cola", limit=2) == [1, 2]
+
+
+def test_database_search_uses_the_index_once_built(db):
+    db._build_search_index()
+
+    names = [product['name'] for product in db.get_products_with_optional_search("coca")]
+
+    assert names == ['Coca Cola 330ml']
+    assert db._search.stats()['searches'] == 1
+
+
+def test_refused_build_releases_its_claim(db, monkeypatch):
+    def full(fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(RuntimeError("Too many pending database requests"))
+        return future
+
+    monkeypatch.setattr(db.get_async(), 'submit', full)
+    db._warm_search_index()
+
+    # The next search may try again instead of waiting on a build that never runs
+    assert db._search.start_build()
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.rows import Product, Sale
+
+
+class FakeCursor:
+    def __init__(self, *columns):
+        self.description = [(column,) for column in columns]
+
+
+def product(**fields):
+    build = Product.factory(('id', 'name', 'price', 'stock', 'relevance'))
+    return build((fields.get('id', 1), fields.get('name', 'Tea'), fields.get('price', Decimal('1.50')),
+                  fields.get('stock', 4), 0.9))
+
+
+def test_factory_converts_and_drops_undeclared_columns():
+    row = product()
+
+    assert row.price == 1.5 and isinstance(row.price, float)
+    assert 'relevance' not in row
+    assert dict(row) == {'id': 1, 'name': 'Tea', 'price': 1.5, 'stock': 4}
+
+
+def test_from_cursor_builds_one_row_per_tuple():
+    rows = Sale.from_cursor(FakeCursor('id', 'total_amount', 'payment_method'),
+                            [(1, '9.90', 'cash'), (2, None, 'card')])
+
+    assert [(row.id, row.total_amount) for row in rows] == [(1, 9.9), (2, None)]
+
+
+def test_reads_like_a_dict():
+    row = product()
+
+    assert row['name'] == 'Tea'
+    assert row.get('barcode', 'none') == 'none'
+    assert row.get('relevance') is None
+    assert 'stock' in row and 'barcode' not in row
+    assert list(row) == ['id', 'name', 'price', 'stock']
+    assert row == {'id': 1, 'name': 'Tea', 'price': 1.5, 'stock': 4}
+    with pytest.raises(KeyError):
+        row['barcode']
+
+
+def test_rows_are_read_only():
+    row = product()
+
+    with pytest.raises(AttributeError):
+        row.stock = 3
+    with pytest.raises(AttributeError):
+        del row.stock
+    with pytest.raises(TypeError):
+        row['stock'] = 3
+    assert row.stock == 4
+
+
+def test_copy_applies_changes_and_leaves_the_original():
+    row = product()
+
+    changed = row.copy(stock=3)
+
+    assert (changed.stock, row.stock) == (3, 4)
+    assert changed.name == 'Tea'
+    with pytest.raises(KeyError):
+        row.copy(relevance=1.0)
+
+
+def test_catalog_hands_out_shared_rows_nobody_can_change(db):
+    first = db.get_product_by_id(1)
+
+    with pytest.raises(AttributeError):
+        first.stock = 0
+    assert db.get_product_by_id(1) is first
+    assert first.stock == 100
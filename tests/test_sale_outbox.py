@@ -0,0 +1,105 @@
+import pytest
+from mysql.connector import errors
+
+from utils.sale_outbox import new_idempotency_key
+
+
+def stock(db, product_id):
+    return db.execute_query("SELECT stock FROM products WHERE id = %s", (product_id,))[0]['stock']
+
+
+def sale(user_id, product_id, quantity, price=1.5):
+    return {
+        'user_id': user_id,
+        'items': [{'product_id': product_id, 'quantity': quantity, 'price': price}],
+        'total': quantity * price,
+        'customer_id': None,
+        'payment_method': 'cash'
+    }
+
+
+def booked(db, key):
+    return db.execute_query("SELECT id FROM sales WHERE idempotency_key = %s", (key,))
+
+
+def test_sale_is_queued_while_server_is_unreachable(db, user_id, monkeypatch):
+    def unreachable(**kwargs):
+        raise errors.DatabaseError(msg="Can't connect to MySQL server", errno=2003)
+
+    with monkeypatch.context() as offline:
+        offline.setattr(db, '_write_sale', unreachable)
+        offline.setattr(db._replayer, 'wake', lambda: None)
+        result = db.submit_sale(user_id, sale(user_id, 1, 2)['items'], 3.0)
+
+    assert result['status'] == 'queued'
+    assert db.get_sale_outbox_stats()['pending'] == 1
+    assert not db._replayer.online
+
+    assert db._replayer.drain() == 1
+    assert booked(db, result['idempotency_key'])
+    assert stock(db, 1) == 98
+    assert db.get_sale_outbox_stats()['pending'] == 0
+
+
+def test_refused_sale_is_raised_not_queued(db, user_id):
+    with pytest.raises(errors.IntegrityError):
+        db.submit_sale(user_id, sale(user_id, 9999, 1)['items'], 1.5)
+    assert db.get_sale_outbox_stats()['pending'] == 0
+
+
+def test_replay_books_sale_even_when_stock_ran_out(db, user_id):
+    key = new_idempotency_key()
+    db._outbox.enqueue(key, sale(user_id, 1, 150))
+
+    db._replayer.drain()
+
+    assert booked(db, key)
+    assert stock(db, 1) == 0
+    assert db.get_rejected_sales() == []
+
+
+def test_replay_rejects_only_the_sale_the_server_refuses(db, user_id):
+    good, bad = new_idempotency_key(), new_idempotency_key()
+    db._outbox.enqueue(bad, sale(user_id, 9999, 1))
+    db._outbox.enqueue(good, sale(user_id, 2, 3))
+
+    db._replayer.drain()
+
+    assert booked(db, good)
+    assert not booked(db, bad)
+    assert stock(db, 2) == 97
+    rejected = db.get_rejected_sales()
+    assert [entry['idempotency_key'] for entry in rejected] == [bad]
+    assert 'FOREIGN KEY' in rejected[0]['error']
+
+    db.dismiss_rejected_sales([bad])
+    assert db.get_rejected_sales() == []
+    assert db.get_sale_outbox_stats()['rejected'] == 0
+
+
+def test_replay_of_an_already_written_sale_is_not_booked_twice(db, user_id):
+    key = new_idempotency_key()
+    queued = sale(user_id, 1, 2)
+    db._write_sale(idempotency_key=key, **queued)
+    db._outbox.enqueue(key, queued)
+
+    db._replayer.drain()
+
+    assert len(booked(db, key)) == 1
+    assert stock(db, 1) == 98
+    assert db.get_sale_outbox_stats()['sent'] == 1
+
+
+def test_failed_replay_keeps_sales_pending(db, user_id, monkeypatch):
+    key = new_idempotency_key()
+    db._outbox.enqueue(key, sale(user_id, 1, 1))
+
+    def lost(*args, **kwargs):
+        raise errors.OperationalError(msg="Lost connection to MySQL server during query", errno=2013)
+
+    monkeypatch.setattr(db._sale_writer, 'write', lost)
+    with pytest.raises(errors.OperationalError):
+        db._replayer.drain()
+
+    assert db.get_sale_outbox_stats()['pending'] == 1
+    assert not booked(db, key)
@@ -0,0 +1,101 @@
+import pytest
+from mysql.connector import errors
+
+from utils.sale_writer import LOCKING, InsufficientStockError, SaleWriter
+
+
+def stock(db, product_id):
+    return db.execute_query("SELECT stock FROM products WHERE id = %s", (product_id,))[0]['stock']
+
+
+def line(product_id, quantity, price=1.5):
+    return {'product_id': product_id, 'quantity': quantity, 'price': price}
+
+
+def sale_count(db):
+    return db.execute_query("SELECT COUNT(*) AS n FROM sales")[0]['n']
+
+
+@pytest.fixture(params=['conditional', LOCKING])
+def stock_check(request, db):
+    db.get_sale_writer().stock_check = request.param
+    return request.param
+
+
+def test_aggregate_quantities_sums_lines_and_skips_empty_products():
+    items = [line(1, 2), line(2, 0), line(1, 3), line(3, 1), line(3, -1)]
+    assert SaleWriter.aggregate_quantities(items) == {1: 5}
+
+
+def test_sale_writes_lines_and_decrements_stock(db, user_id, stock_check):
+    result = db.submit_sale(user_id, [line(1, 2), line(2, 1), line(1, 3)], 9.0)
+
+    assert result['status'] == 'committed'
+    lines = db.execute_query(
+        "SELECT product_id, quantity FROM sales_details WHERE sale_id = %s ORDER BY id", (result['sale_id'],)
+    )
+    assert [(row['product_id'], row['quantity']) for row in lines] == [(1, 2), (2, 1), (1, 3)]
+    assert stock(db, 1) == 95
+    assert stock(db, 2) == 99
+
+
+def test_shortfall_raises_and_writes_nothing(db, user_id, stock_check):
+    with pytest.raises(InsufficientStockError) as raised:
+        db.submit_sale(user_id, [line(1, 1), line(6, 15), line(6, 10)], 40.0)
+
+    assert raised.value.shortfalls == [{
+        'product_id': 6, 'name': 'USB Cable', 'requested': 25, 'available': 20, 'shortfall': 5
+    }]
+    assert sale_count(db) == 0
+    assert stock(db, 1) == 100
+    assert stock(db, 6) == 20
+    assert db.get_sale_write_stats()['shortfalls'] == 1
+
+
+def test_inactive_product_counts_as_out_of_stock(db, user_id, stock_check):
+    db.delete_product_soft(3)
+
+    with pytest.raises(InsufficientStockError) as raised:
+        db.submit_sale(user_id, [line(3, 1)], 1.5)
+
+    assert raised.value.shortfalls[0]['available'] == 0
+    assert stock(db, 3) == 50
+
+
+def test_zero_quantity_line_is_refused_not_reported_short(db, user_id):
+    with pytest.raises(errors.IntegrityError):
+        db.submit_sale(user_id, [line(1, 0), line(2, 1)], 1.5)
+    assert sale_count(db) == 0
+    assert stock(db, 2) == 100
+
+
+def test_sale_waits_out_a_busy_lock(db, user_id, monkeypatch):
+    writer = db.get_sale_writer()
+    write = writer.write
+    attempts = []
+
+    def busy_once(*args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise errors.DatabaseError(msg="database is locked", errno=1205)
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(writer, 'write', busy_once)
+    result = db.submit_sale(user_id, [line(1, 1)], 1.5)
+
+    assert result['status'] == 'committed'
+    assert len(attempts) == 2
+    assert writer.retries == 1
+
+
+def test_estimate_shortfalls_reads_the_cached_catalog(db):
+    items = [line(1, 2), line(6, 15), line(6, 10)]
+    # Products the cache does not hold are left to the sale write
+    assert db.estimate_shortfalls(items) == []
+
+    db.get_products_with_optional_search()
+
+    assert db.estimate_shortfalls(items) == [{
+        'product_id': 6, 'name': 'USB Cable', 'requested': 25, 'available': 20, 'shortfall': 5
+    }]
+    assert db.estimate_shortfalls([line(6, 20)]) == []
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+
+def line(product_id, quantity, price=1.5):
+    return {'product_id': product_id, 'quantity': quantity, 'price': price}
+
+
+def test_lines_of_a_sale_arrive_together_across_chunks(db, user_id):
+    baskets = [[line(1, 1), line(2, 1), line(3, 1)], [line(4, 2)], [line(5, 1), line(6, 1)]]
+    for basket in baskets:
+        db.submit_sale(user_id, basket, 1.5 * len(basket))
+    # Sale 1 rang up last: time order, not id order, decides where it goes
+    db.execute_query("UPDATE sales SET created_at = DATE_ADD(created_at, INTERVAL 1 MINUTE) WHERE id = 1")
+
+    today = date.today()
+    chunks = list(db.iter_sales_details(today, today + timedelta(days=1), chunk_size=2))
+    sale_ids = [row['sale_id'] for chunk in chunks for row in chunk]
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2]
+    assert sale_ids == [2, 3, 3, 1, 1, 1]
+
+
+def test_export_range_is_served_by_the_sale_date_index(db):
+    query, params = db._sales_details_query(date(2024, 1, 1), date(2024, 1, 31))
+
+    plan = " ".join(row['detail'] for row in db.explain(query, params))
+
+    assert "idx_sale_date" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,87 @@
+from datetime import date
+
+import pytest
+
+from utils.sales_rollup import SalesRollup
+
+
+def line(product_id, quantity, price):
+    return {'product_id': product_id, 'quantity': quantity, 'price': price}
+
+
+def watermark(db):
+    return db.execute_query("SELECT last_sale_id FROM rollup_state WHERE name = 'sales'")[0]['last_sale_id']
+
+
+@pytest.fixture
+def sales(db, user_id):
+    db.submit_sale(user_id, [line(1, 2, 1.5), line(2, 1, 1.5)], 4.5)
+    db.submit_sale(user_id, [line(1, 1, 1.5)], 1.5)
+    db.submit_sale(user_id, [line(6, 3, 5.0)], 15.0)
+    settle(db)
+
+
+def settle(db):
+    """Age every sale past the settle window"""
+    db.execute_query("UPDATE sales SET created_at = DATE_SUB(created_at, INTERVAL 10 SECOND)")
+
+
+def totals(rollup):
+    today = date.today()
+    daily = rollup.daily(today, today)
+    products = {row['product_id']: row for row in rollup.products(today, today)}
+    return daily, products
+
+
+def check_totals(daily, products):
+    assert [(row['num_sales'], row['total_revenue'], row['num_items'], row['total_items'])
+            for row in daily] == [(3, 21.0, 4, 7)]
+    assert {product_id: (row['total_quantity'], row['total_revenue'], row['num_transactions'])
+            for product_id, row in products.items()} == {
+        1: (3, 4.5, 2), 2: (1, 1.5, 1), 6: (3, 15.0, 1)
+    }
+
+
+def test_rolled_up_totals_match_the_sales(db, sales):
+    rollup = db.get_sales_rollup()
+
+    assert rollup.catch_up(force=True) == 3
+    assert watermark(db) == 3
+    check_totals(*totals(rollup))
+    # Nothing new: the watermark keeps sales from being counted twice
+    assert rollup.catch_up(force=True) == 0
+    check_totals(*totals(rollup))
+
+
+def test_unsettled_sales_are_read_from_the_sales_table(db, sales):
+    rollup = SalesRollup(db, settle_seconds=3600)
+
+    # Too young to roll up: the watermark stays put, readers add the tail
+    assert rollup.catch_up(force=True) == 0
+    assert watermark(db) == 0
+    check_totals(*totals(rollup))
+
+
+def test_incremental_catch_up_matches_a_rebuild(db, user_id, sales):
+    rollup = db.get_sales_rollup()
+    rollup.catch_up(force=True)
+    db.submit_sale(user_id, [line(2, 4, 1.5)], 6.0)
+    settle(db)
+    rollup.catch_up(force=True)
+    incremental = totals(rollup)
+
+    assert rollup.rebuild() == 4
+    assert totals(rollup) == incremental
+    assert incremental[0][0]['num_sales'] == 4
+    assert incremental[1][2]['total_quantity'] == 5
+
+
+def test_snapshot_splits_settled_and_unsettled_sales(db, sales):
+    today = date.today()
+
+    settled = db.get_sales_rollup().snapshot(today, today, today)
+    unsettled = db.get_sales_rollup().snapshot(today, today, today, settle_seconds=3600)
+
+    assert (settled['last_sale_id'], settled['unsettled_ids']) == (3, [])
+    assert (unsettled['last_sale_id'], unsettled['unsettled_ids']) == (0, [1, 2, 3])
+    assert settled['daily'] == unsettled['daily']
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+
+import pytest
+from mysql.connector import errors
+
+from utils.database import is_connection_error, is_lock_conflict
+from utils.sqlite_backend import SQLiteBackend, SQLiteConnection, translate_sql
+
+
+def test_translate_sql_rewrites_the_mysql_dialect():
+    assert translate_sql("INSERT IGNORE INTO t (a) VALUES (%s)") == "INSERT OR IGNORE INTO t (a) VALUES (?)"
+    assert translate_sql("SELECT DATE_SUB(CURDATE(), INTERVAL 7 DAY)") == "SELECT DATE(CURDATE(), '-7 day')"
+    assert translate_sql("SELECT DATE_SUB(NOW(), INTERVAL %s SECOND)") == \
+        "SELECT DATETIME(NOW(), '-' || ? || ' second')"
+    assert translate_sql("SELECT DATE_ADD(s.created_at, INTERVAL 2 WEEK)") == \
+        "SELECT DATETIME(s.created_at, '+14 day')"
+    assert translate_sql("SELECT CAST(x AS SIGNED)") == "SELECT CAST(x AS INTEGER)"
+    assert translate_sql("SELECT id FROM products WHERE id = %s FOR UPDATE").strip() == \
+        "SELECT id FROM products WHERE id = ?"
+    assert translate_sql("SHOW TABLES LIKE 'sales'") == \
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sales'"
+
+
+def test_session_statements_are_skipped():
+    assert translate_sql("SET SESSION lock_wait_timeout = 10") is None
+
+    connection = SQLiteConnection(':memory:')
+    cursor = connection.cursor()
+    cursor.execute("SET time_zone = '+00:00'")
+    assert (cursor.fetchall(), cursor.rowcount) == ([], 0)
+    connection.close()
+
+
+def test_rows_come_back_like_mysql_connector():
+    connection = SQLiteConnection(':memory:')
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT %s AS day, %s AS at, GREATEST(1, 5, 3) AS top",
+                   (date(2024, 5, 1), datetime(2024, 5, 1, 9, 30)))
+
+    assert cursor.fetchall() == [{'day': date(2024, 5, 1), 'at': datetime(2024, 5, 1, 9, 30), 'top': 5}]
+    connection.close()
+
+
+def test_bad_statement_is_not_a_lost_server():
+    connection = SQLiteConnection(':memory:')
+    with pytest.raises(errors.ProgrammingError) as raised:
+        connection.cursor().execute("SELECT missing FROM sqlite_master")
+
+    assert not is_connection_error(raised.value)
+    assert not is_lock_conflict(raised.value)
+    connection.close()
+
+
+def test_unopenable_file_counts_as_unreachable(tmp_path):
+    with pytest.raises(errors.OperationalError) as raised:
+        SQLiteConnection(str(tmp_path / 'missing' / 'mart.db'))
+
+    assert raised.value.errno == 2002
+    assert is_connection_error(raised.value)
+
+
+def test_busy_lock_is_a_retryable_lock_conflict(tmp_path):
+    path = str(tmp_path / 'mart.db')
+    writer = SQLiteConnection(path)
+    waiter = SQLiteConnection(path, busy_timeout=0.05)
+    writer.start_transaction()
+    try:
+        with pytest.raises(errors.DatabaseError) as raised:
+            waiter.start_transaction()
+    finally:
+        writer.rollback()
+
+    assert raised.value.errno == 1205
+    assert is_lock_conflict(raised.value)
+    assert not is_connection_error(raised.value)
+    writer.close()
+    waiter.close()
+
+
+def test_backend_creates_the_database_folder(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'data' / 'mart.db'))
+    backend.ensure_directory()
+
+    connection = backend.connect()
+    assert connection.is_connected()
+    connection.close()
+    assert (tmp_path / 'data' / 'mart.db').exists()
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """Future-returning facade over Database backed by a bounded worker pool
+
+    Any Database method can be called through the facade and returns a
+    concurrent.futures.Future instead of blocking, e.g.
+    ``async_db.execute_query(query, params)``. At most ``max_pending``
+    calls may be queued or running; beyond that the returned future fails
+    immediately so a stuck database cannot pile up work behind the UI.
+    """
+
+    def __init__(self, db, max_workers: int = 4, max_pending: int = 32):
+        self._db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) on a worker thread"""
+        if not self._slots.acquire(blocking=False):
+            future: Future = Future()
+            future.set_exception(RuntimeError("Too many pending database requests"))
+            return future
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def __getattr__(self, name: str) -> Callable[..., Future]:
+        method = getattr(self._db, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs) -> Future:
+            return self.submit(method, *args, **kwargs)
+        return call
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) from asyncio code without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+
+def deliver_to_tk(widget, future: Future, on_success: Callable[[Any], None],
+                  on_error: Optional[Callable[[Exception], None]] = None, poll_ms: int = 30):
+    """Invoke on_success/on_error on the Tk thread once future completes
+
+    Tk is not thread-safe, so instead of touching widgets from the worker
+    the Tk thread polls the future with after(). Results for widgets that
+    have been destroyed in the meantime are dropped.
+    """
+    def check():
+        try:
+            if not widget.winfo_exists():
+                return
+        except Exception:
+            return
+
+        if not future.done():
+            widget.after(poll_ms, check)
+            return
+
+        error = future.exception()
+        if error is None:
+            on_success(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            logger.error(f"Background database call failed: {error}")
+
+    widget.after(0, check)
@@ -0,0 +1,200 @@
+import json
+import uuid
+import socket
+import platform
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOGIN_HISTORY_COLUMNS = (
+    'user_id', 'ip_address', 'device_info', 'browser_info', 'location',
+    'os_info', 'session_id', 'status', 'status_message', 'login_type'
+)
+# Rows per INSERT statement; SQLite allows at most 32766 placeholders per statement
+INSERT_BATCH = 500
+
+
+def host_info() -> Dict[str, str]:
+    """Address and device details of this machine
+
+    gethostbyname() can block on DNS and platform.processor() shells out on
+    some systems, so LoginAuditBuffer looks them up once when it is created
+    rather than on a login.
+    """
+    try:
+        ip_address = socket.gethostbyname(socket.gethostname())
+    except OSError:
+        ip_address = '127.0.0.1'
+    device_info = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "node": platform.node(),
+        "platform": platform.platform(),
+        "python_version": platform.python_version(),
+        "device_id": str(uuid.getnode())
+    }
+    return {
+        'ip_address': ip_address,
+        'device_info': json.dumps(device_info),
+        'browser_info': f"Python {platform.python_version()}",
+        'os_info': f"{platform.system()} {platform.release()}",
+        'location': "Local"
+    }
+
+
+class LoginAuditBuffer:
+    """Write-behind buffer for login_history rows
+
+    ``record`` only appends to an in-memory list, so a login never waits on
+    the audit insert. A background thread writes the buffered rows with a
+    single multi-row INSERT once ``flush_events`` have accumulated or
+    ``flush_interval`` seconds have passed. If the server cannot be reached
+    (``retryable`` decides which errors mean that) the rows are kept for
+    the next flush, up to ``max_buffered`` rows, after which the oldest are
+    dropped. Any other error is retried row by row, and rows that still
+    fail are logged and dropped, since they would fail every flush. Large
+    flushes are split into statements of INSERT_BATCH rows.
+    """
+
+    def __init__(self, db, retryable: Callable[[Exception], bool], flush_events: int = 20,
+                 flush_interval: float = 2.0, max_buffered: int = 5000):
+        self._db = db
+        self._retryable = retryable
+        self._host = host_info()
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._rows: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="login-audit-writer", daemon=True)
+        self._thread.start()
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, user_id: Optional[int], status: bool, message: Optional[str] = None,
+               login_type: str = 'password') -> str:
+        """Buffer one login attempt; returns the session id given to it"""
+        info = self._host
+        session_id = str(uuid.uuid4())
+        row = (
+            user_id, info['ip_address'], info['device_info'], info['browser_info'],
+            info['location'], info['os_info'], session_id, status, message, login_type
+        )
+        with self._lock:
+            self._rows.append(row)
+            self.recorded += 1
+            full = len(self._rows) >= self.flush_events
+        if full:
+            self._wake.set()
+        return session_id
+
+    def _insert(self, rows: List[Tuple[Any, ...]]):
+        """Write rows in one transaction, INSERT_BATCH rows per statement"""
+        columns = ", ".join(LOGIN_HISTORY_COLUMNS)
+        row_placeholders = "(" + ", ".join(["%s"] * len(LOGIN_HISTORY_COLUMNS)) + ")"
+        with self._db.get_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for start in range(0, len(rows), INSERT_BATCH):
+                    batch = rows[start:start + INSERT_BATCH]
+                    cursor.execute(
+                        f"INSERT INTO login_history ({columns}) VALUES "
+                        f"{', '.join([row_placeholders] * len(batch))}",
+                        [value for row in batch for value in row]
+                    )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _requeue(self, rows: List[Tuple[Any, ...]]):
+        """Put rows back in front of the buffer for the next flush, dropping the oldest if full"""
+        with self._lock:
+            self._rows = rows + self._rows
+            overflow = len(self._rows) - self.max_buffered
+            if overflow > 0:
+                del self._rows[:overflow]
+                self.dropped += overflow
+                logger.warning(f"Login audit buffer full, dropped {overflow} oldest record(s)")
+
+    def _insert_each(self, rows: List[Tuple[Any, ...]]) -> int:
+        """Write rows one at a time so a row the server refuses only loses itself"""
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                self._insert([row])
+                written += 1
+            except Exception as e:
+                self.last_error = str(e)
+                if self._retryable(e):
+                    self._requeue(rows[index:])
+                    break
+                self.rejected += 1
+                logger.error(f"Dropped login record {dict(zip(LOGIN_HISTORY_COLUMNS, row))}: {e}")
+        return written
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+
+            try:
+                self._insert(rows)
+                written = len(rows)
+            except Exception as e:
+                self.last_error = str(e)
+                if self._retryable(e):
+                    logger.error(f"Failed to write {len(rows)} login record(s), will retry: {e}")
+                    self._requeue(rows)
+                    return 0
+                logger.warning(f"Login records refused ({e}), writing them one by one")
+                written = self._insert_each(rows)
+
+            self.written += written
+            self.flushes += 1
+            return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the writer alive; the next flush starts from what is buffered then
+                self.last_error = str(e)
+                logger.exception(f"Login audit flush failed: {e}")
+
+    def close(self):
+        """Stop the writer thread and write whatever is still buffered"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._rows)
+        return {
+            'buffered': buffered,
+            'recorded': self.recorded,
+            'written': self.written,
+            'flushes': self.flushes,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,105 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# Marker stored for barcodes known not to match any active product
+_NOT_FOUND = object()
+
+
+class BarcodeLookup:
+    """Exact-match barcode resolver for the sales lane scanner
+
+    Lookups are answered from an in-process hash map first, then from the
+    shared product catalog when it is warm, and only then from the database
+    through an equality query on the indexed barcode column. Entries are
+    dropped whenever the catalog generation changes, so product edits and
+    stock movements are never served stale.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[Dict[str, Any]]], catalog=None,
+                 max_entries: int = 20000):
+        self._fetch = fetch
+        self._catalog = catalog
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._generation = catalog.generation if catalog else 0
+        self._latency = {
+            'memory': LatencyRecorder(),
+            'catalog': LatencyRecorder(),
+            'database': LatencyRecorder(),
+            'all': LatencyRecorder()
+        }
+
+    def _sync_generation(self):
+        """Forget cached entries if the catalog was invalidated since they were stored"""
+        if self._catalog is None:
+            return
+        generation = self._catalog.generation
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def _remember(self, barcode: str, value: Any, generation: int):
+        with self._lock:
+            # Skip results that may predate an invalidation that happened meanwhile
+            if self._catalog is not None and self._catalog.generation != generation:
+                return
+            self._entries[barcode] = value
+            self._entries.move_to_end(barcode)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Resolve a scanned barcode to an active product, or None"""
+        barcode = (barcode or '').strip()
+        if not barcode:
+            return None
+
+        start = time.perf_counter()
+        with self._lock:
+            self._sync_generation()
+            generation = self._generation
+            cached = self._entries.get(barcode)
+            if cached is not None:
+                self._entries.move_to_end(barcode)
+
+        if cached is not None:
+            self._finish('memory', start)
+            return None if cached is _NOT_FOUND else cached
+
+        if self._catalog is not None and self._catalog.is_loaded():
+            product = self._catalog.get_by_barcode(barcode)
+            if product is not None or self._catalog.is_loaded():
+                self._remember(barcode, product if product else _NOT_FOUND, generation)
+                self._finish('catalog', start)
+                return product
+
+        product = self._fetch(barcode)
+        self._remember(barcode, product if product else _NOT_FOUND, generation)
+        self._finish('database', start)
+        return product
+
+    def _finish(self, source: str, start: float):
+        elapsed = time.perf_counter() - start
+        self._latency[source].record(elapsed)
+        self._latency['all'].record(elapsed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency statistics per resolution path, in milliseconds"""
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'entries': entries,
+            **{source: recorder.snapshot() for source, recorder in self._latency.items()}
+        }
@@ -0,0 +1,330 @@
+import threading
+import time
+import weakref
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mysql.connector.errors import PoolError
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# SET statements the old get_connection ran on every borrow
+LEGACY_SESSION_STATEMENTS = 3
+
+
+def raw_connection(conn):
+    """Unwrap a pooled connection to the underlying MySQL connection"""
+    return getattr(conn, '_cnx', None) or conn
+
+
+class SessionState:
+    """What we know about one physical connection's server session"""
+
+    def __init__(self, connection_id):
+        self.connection_id = connection_id
+        self.initialized_at = time.time()
+        self.borrows = 0
+        self.inits = 1
+
+
+class ConnectionLifecycle:
+    """Configure each pooled connection's session once instead of on every borrow
+
+    A session is initialised the first time its connection is seen and again
+    only when the server thread id changes, i.e. after a reconnect. Sessions
+    reset by the pool keep their charset because the connector re-applies it
+    after COM_RESET_CONNECTION.
+    """
+
+    def __init__(self, charset: str = 'utf8mb4', collation: str = 'utf8mb4_unicode_ci'):
+        self.charset = charset
+        self.collation = collation
+        self._lock = threading.Lock()
+        self._states: "weakref.WeakKeyDictionary[Any, SessionState]" = weakref.WeakKeyDictionary()
+        self.borrows = 0
+        self.session_inits = 0
+
+    def _initialize_session(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SET NAMES {self.charset} COLLATE {self.collation}")
+        finally:
+            cursor.close()
+
+    def on_borrow(self, conn) -> SessionState:
+        """Record a borrow and initialise the session if it has not been yet"""
+        raw = raw_connection(conn)
+        connection_id = getattr(raw, 'connection_id', None)
+        with self._lock:
+            state = self._states.get(raw)
+            needs_init = state is None or state.connection_id != connection_id
+
+        if needs_init:
+            self._initialize_session(conn)
+            with self._lock:
+                if state is None:
+                    state = SessionState(connection_id)
+                    self._states[raw] = state
+                else:
+                    state.connection_id = connection_id
+                    state.initialized_at = time.time()
+                    state.inits += 1
+                self.session_inits += 1
+                logger.debug(f"Initialized session for connection {connection_id}")
+
+        with self._lock:
+            state.borrows += 1
+            self.borrows += 1
+        return state
+
+    def forget(self, conn):
+        """Drop tracking for a connection that was closed for good"""
+        with self._lock:
+            self._states.pop(raw_connection(conn), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'connections': len(self._states),
+                'borrows': self.borrows,
+                'session_inits': self.session_inits,
+                # The pool resets sessions on release either way, as the old pool did
+                'round_trips_avoided': self.borrows * LEGACY_SESSION_STATEMENTS - self.session_inits
+            }
+
+
+class PooledConnection:
+    """Borrowed connection handle; close() hands it back to the pool"""
+
+    def __init__(self, pool: "ConnectionPool", cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, attr):
+        return getattr(self._cnx, attr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        cnx, self._cnx = self._cnx, None
+        if cnx is not None:
+            self._pool.release(cnx)
+
+
+class ConnectionPool:
+    """Bounded connection pool with overflow, a blocking wait queue and idle reaping
+
+    Up to ``pool_size`` connections are kept around; under load up to
+    ``max_overflow`` extra ones may be opened. When every connection is in
+    use, callers wait up to ``timeout`` seconds for one to be returned
+    before PoolError is raised. Connections idle for longer than
+    ``idle_timeout`` are closed by a background reaper, keeping at least
+    ``min_idle`` warm.
+    """
+
+    def __init__(self, connect: Callable[[], Any], pool_size: int = 5, max_overflow: int = 5,
+                 timeout: float = 10.0, idle_timeout: float = 300.0, min_idle: int = 1,
+                 reset_session: bool = True, lifecycle: Optional[ConnectionLifecycle] = None,
+                 reap_interval: float = 30.0):
+        if pool_size <= 0:
+            raise ValueError("pool_size must be positive")
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.min_idle = max(0, min(min_idle, pool_size))
+        self.reset_session = reset_session
+        self.lifecycle = lifecycle
+
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []  # (connection, returned_at); newest last
+        self._in_use = 0
+        self._opening = 0
+        self._waiters = 0
+        self._closed = False
+
+        self.created = 0
+        self.discarded = 0
+        self.reaped = 0
+        self.exhausted = 0
+        self.peak_in_use = 0
+        self._wait_times = LatencyRecorder()
+
+        self._stop_reaper = threading.Event()
+        self._reaper = None
+        if idle_timeout and reap_interval:
+            self._reaper = threading.Thread(
+                target=self._reap_loop, args=(reap_interval,), name="db-pool-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    @property
+    def capacity(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    def _total(self) -> int:
+        return len(self._idle) + self._in_use + self._opening
+
+    def get_connection(self) -> PooledConnection:
+        """Borrow a connection, waiting up to the pool timeout if all are in use"""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle:
+                    cnx, _ = self._idle.pop()
+                    self._checkout()
+                    break
+                if self._total() < self.capacity:
+                    self._opening += 1
+                    cnx = None
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.exhausted += 1
+                    self._wait_times.record(time.perf_counter() - started)
+                    raise PoolError(
+                        f"Failed getting connection; pool exhausted "
+                        f"({self._in_use} in use, waited {self.timeout:.1f}s)"
+                    )
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+        if cnx is None:
+            try:
+                cnx = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._opening -= 1
+                self.created += 1
+                self._checkout()
+        else:
+            cnx = self._revalidate(cnx)
+
+        self._wait_times.record(time.perf_counter() - started)
+        return PooledConnection(self, cnx)
+
+    def _checkout(self):
+        self._in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self._in_use)
+
+    def _revalidate(self, cnx):
+        """Reconnect a pooled connection the server has dropped"""
+        try:
+            if not cnx.is_connected():
+                cnx.reconnect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self.discarded += 1
+                self._cond.notify()
+            self._disconnect(cnx)
+            raise
+        return cnx
+
+    def release(self, cnx):
+        """Return a borrowed connection, resetting its session first"""
+        healthy = True
+        try:
+            if self.reset_session:
+                cnx.reset_session()
+        except Exception as e:
+            logger.warning(f"Discarding connection that failed to reset: {e}")
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            keep = healthy and not self._closed
+            if keep:
+                self._idle.append((cnx, time.monotonic()))
+            else:
+                self.discarded += 1
+            self._cond.notify()
+
+        if not keep:
+            self._disconnect(cnx)
+
+    def _disconnect(self, cnx):
+        if self.lifecycle:
+            self.lifecycle.forget(cnx)
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def reap_idle(self) -> int:
+        """Close connections idle past idle_timeout; returns how many were closed"""
+        if not self.idle_timeout:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        victims = []
+        with self._cond:
+            keep = []
+            # Oldest first, so the most recently used connections stay warm
+            for cnx, returned_at in self._idle:
+                idle_left = len(self._idle) - len(victims)
+                if returned_at < cutoff and idle_left > self.min_idle:
+                    victims.append(cnx)
+                else:
+                    keep.append((cnx, returned_at))
+            self._idle = keep
+            self.reaped += len(victims)
+        for cnx in victims:
+            self._disconnect(cnx)
+        if victims:
+            logger.debug(f"Reaped {len(victims)} idle connection(s)")
+        return len(victims)
+
+    def _reap_loop(self, interval: float):
+        while not self._stop_reaper.wait(interval):
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.warning(f"Idle connection reaper failed: {e}")
+
+    def close_all(self):
+        """Close idle connections and refuse new borrows"""
+        self._stop_reaper.set()
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for cnx, _ in idle:
+            self._disconnect(cnx)
+
+    def stats(self) -> Dict[str, Any]:
+        """Live pool occupancy and wait-time statistics"""
+        waits = self._wait_times.snapshot()
+        with self._cond:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiters': self._waiters,
+                'open': len(self._idle) + self._in_use,
+                'peak_in_use': self.peak_in_use,
+                'created': self.created,
+                'discarded': self.discarded,
+                'reaped': self.reaped,
+                'exhausted': self.exhausted,
+                'wait_p50_ms': waits['p50_ms'],
+                'wait_p95_ms': waits['p95_ms'],
+                'wait_max_ms': waits['max_ms']
+            }
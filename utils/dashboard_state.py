@@ -0,0 +1,166 @@
+import heapq
+import threading
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from .rows import Sale
+
+logger = logging.getLogger(__name__)
+
+# Sales still this young when fetched are looked for again on the next
+# refresh, in case an older id commits after a newer one was seen
+SETTLE_SECONDS = 10
+# A refresh that finds more new sales than this rebuilds from the rollups
+MAX_INCREMENT = 5000
+
+
+class DashboardAggregates:
+    """Dashboard totals kept in memory and advanced from a sales watermark
+
+    The first refresh of a day loads today's summary, the trend and the
+    per-product totals from the sales rollups. Later refreshes only fetch
+    sales with an id after the watermark and fold them into the counters,
+    trend buckets and product totals; the low stock list is re-queried
+    only when new sales arrived or products changed. A full rebuild
+    happens again on date rollover.
+    """
+
+    def __init__(self, db, trend_days: int = 7, top_days: int = 30, top_n: int = 5):
+        self.db = db
+        self.trend_days = trend_days
+        self.top_days = top_days
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._last_sale_id = 0
+        self._recent_ids: Set[int] = set()
+        self._trend: Dict[date, Dict[str, Any]] = {}
+        self._products: Dict[int, Dict[str, Any]] = {}
+        self._low_stock: Optional[List[Dict[str, Any]]] = None
+        self._catalog_generation: Optional[int] = None
+        self.rebuilds = 0
+        self.increments = 0
+
+    def _rebuild(self, today: date):
+        snapshot = self.db.get_sales_rollup().snapshot(
+            today - timedelta(days=self.trend_days), today - timedelta(days=self.top_days), today,
+            SETTLE_SECONDS
+        )
+        self._trend = {row['date']: row for row in snapshot['daily']}
+        self._products = {row['product_id']: row for row in snapshot['products']}
+        self._last_sale_id = snapshot['last_sale_id']
+        self._recent_ids = set(snapshot['unsettled_ids'])
+        self._day = today
+        self.rebuilds += 1
+
+    def _fold(self, sales: List[Sale], today: date) -> bool:
+        """Add sales fetched after the watermark; returns True if any were new"""
+        trend_start = today - timedelta(days=self.trend_days)
+        top_start = today - timedelta(days=self.top_days)
+        settled_before = datetime.now() - timedelta(seconds=SETTLE_SECONDS)
+        changed = False
+        watermark_blocked = False
+
+        for sale in sales:
+            sale_id = sale.id
+            if sale_id not in self._recent_ids:
+                changed = True
+                sale_day = sale.created_at.date()
+                if trend_start <= sale_day <= today:
+                    bucket = self._trend.setdefault(sale_day, {
+                        'date': sale_day, 'num_sales': 0, 'total_revenue': 0.0,
+                        'num_items': 0, 'total_items': 0
+                    })
+                    bucket['num_sales'] += 1
+                    bucket['total_revenue'] += sale.total_amount
+                    bucket['num_items'] += len(sale.lines)
+                    bucket['total_items'] += sum(line.quantity for line in sale.lines)
+                if top_start <= sale_day <= today:
+                    for product_id in {line.product_id for line in sale.lines}:
+                        self._products.setdefault(product_id, {
+                            'product_id': product_id, 'total_quantity': 0,
+                            'total_revenue': 0.0, 'num_transactions': 0
+                        })['num_transactions'] += 1
+                    for line in sale.lines:
+                        totals = self._products[line.product_id]
+                        totals['total_quantity'] += line.quantity
+                        totals['total_revenue'] += line.price * line.quantity
+                        if line.name:
+                            totals['name'] = line.name
+
+            # Move the watermark past settled sales only; keep younger ones
+            # in _recent_ids so they are skipped, not double counted, next time
+            if not watermark_blocked and sale.created_at < settled_before:
+                self._last_sale_id = sale_id
+                self._recent_ids.discard(sale_id)
+            else:
+                watermark_blocked = True
+                self._recent_ids.add(sale_id)
+        return changed
+
+    def _top_products(self) -> List[Dict[str, Any]]:
+        top = heapq.nlargest(self.top_n, self._products.values(), key=lambda row: row['total_quantity'])
+        missing = [row['product_id'] for row in top if 'name' not in row]
+        for product_id in missing:
+            product = self.db.get_product_by_id(product_id)
+            self._products[product_id]['name'] = product['name'] if product else f"#{product_id}"
+        return [dict(row) for row in top]
+
+    def refresh(self) -> Dict[str, Any]:
+        """Bring the totals up to date; called off the Tk thread
+
+        The result has the same keys the dashboard renders ('summary',
+        'low_stock', 'sales_data', 'product_data') plus 'sales_changed' and
+        'low_stock_changed', so unchanged widgets need not be redrawn.
+        """
+        with self._lock:
+            today = date.today()
+            sales_changed = False
+            if self._day != today:
+                self._rebuild(today)
+                sales_changed = True
+            else:
+                sales = self.db.get_sales_since(self._last_sale_id, MAX_INCREMENT)
+                if len(sales) >= MAX_INCREMENT:
+                    # Far behind (e.g. the dashboard was closed for hours)
+                    self._rebuild(today)
+                    sales_changed = True
+                elif sales:
+                    sales_changed = self._fold(sales, today)
+                    self.increments += 1
+
+            low_stock_changed = False
+            generation = self.db.get_catalog_generation()
+            if sales_changed or generation != self._catalog_generation:
+                self._catalog_generation = generation
+                low_stock = self.db.get_low_stock_products() or []
+                if low_stock != self._low_stock:
+                    self._low_stock = low_stock
+                    low_stock_changed = True
+
+            today_totals = self._trend.get(today)
+            num_sales = today_totals['num_sales'] if today_totals else 0
+            revenue = today_totals['total_revenue'] if today_totals else None
+            return {
+                'sales_changed': sales_changed,
+                'low_stock_changed': low_stock_changed,
+                'summary': {
+                    'total_sales': num_sales,
+                    'total_revenue': revenue,
+                    'average_sale': revenue / num_sales if num_sales else None
+                },
+                'low_stock': list(self._low_stock or []),
+                'sales_data': [dict(row) for _, row in sorted(self._trend.items())],
+                'product_data': self._top_products()
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'day': self._day,
+                'last_sale_id': self._last_sale_id,
+                'unsettled': len(self._recent_ids),
+                'rebuilds': self.rebuilds,
+                'increments': self.increments
+            }
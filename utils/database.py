@@ -1,14 +1,31 @@
 import mysql.connector
-from mysql.connector import Error
-from mysql.connector import pooling
+from mysql.connector import Error, errors
 import bcrypt
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Iterator, Tuple, Type
 import logging
 import time
 from contextlib import contextmanager
 from configparser import ConfigParser
 import os
+import re
+import random
 import threading
+from datetime import date, datetime, timedelta
+
+from .barcode_lookup import BarcodeLookup
+from .product_search import ProductSearchIndex
+from .sale_writer import InsufficientStockError, SaleWriter
+from .connection_pool import ConnectionLifecycle, ConnectionPool
+from .query_stats import QueryStats
+from .async_db import AsyncDatabase
+from .sqlite_backend import SQLiteBackend
+from .sale_outbox import OutboxReplayer, SaleOutbox, new_idempotency_key
+from .audit_buffer import LoginAuditBuffer
+from .product_import import ProductImporter
+from .sales_rollup import SalesRollup
+from .migrations import MigrationRunner
+from .product_changes import ProductChangeFeed
+from .rows import Product, Row, Sale, SaleLine
 
 try:
     from config import DB_CONFIG
@@ -18,6 +35,169 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def day_range(start: date, end: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """Half-open datetime bounds [start 00:00, day after end 00:00) covering whole days"""
+    end = end or start
+    return (datetime.combine(start, datetime.min.time()),
+            datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+
+def time_range(column: str, start: date, end: Optional[date] = None) -> Tuple[str, Tuple[datetime, datetime]]:
+    """Predicate and params selecting the whole days start..end on a timestamp column
+
+    DATE(column) = ... or DATE(column) BETWEEN ... hides the column inside a
+    function, so its index cannot be used and every row is scanned. This
+    compares the bare column against half-open bounds instead, which the
+    index serves as a range scan, e.g.
+    ``time_range('s.created_at', start, end)`` gives
+    ``("s.created_at >= %s AND s.created_at < %s", (start 00:00, end+1 00:00))``.
+    """
+    return f"{column} >= %s AND {column} < %s", day_range(start, end)
+
+
+# CR_CONNECTION_ERROR, CR_CONN_HOST_ERROR, CR_SERVER_GONE_ERROR, CR_SERVER_LOST, CR_SERVER_LOST_EXTENDED
+_CONNECTION_ERRNOS = (2002, 2003, 2006, 2013, 2055)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """True for failures that mean the server could not be reached, not that it refused the statement
+
+    Decided by client errno, not exception class: mysql.connector raises
+    some lost connections as plain DatabaseError, and OperationalError
+    also covers statements the server refused. An exhausted or closed
+    pool counts as unreachable too.
+    """
+    if isinstance(error, errors.PoolError):
+        return True
+    if getattr(error, 'errno', None) in _CONNECTION_ERRNOS:
+        return True
+    # Raised without an errno when the connection was already closed
+    return isinstance(error, errors.OperationalError) and 'Connection not available' in str(error)
+
+
+# ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK (the SQLite backend reports a busy lock as 1205)
+_LOCK_CONFLICT_ERRNOS = (1205, 1213)
+_DEADLOCK_ERRNO = 1213
+
+
+def is_lock_conflict(error: Exception) -> bool:
+    """True for a transaction that lost a lock race and can simply be run again"""
+    return getattr(error, 'errno', None) in _LOCK_CONFLICT_ERRNOS
+
+
+class ProductCatalog:
+    """Process-wide cache of active products keyed by id and barcode
+
+    The cached Product rows are handed out as they are, not copied. Rows
+    are read-only, so a change replaces a row rather than modifying it and
+    no caller can alter what the others see (row.copy() makes a changed
+    copy).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_barcode: Dict[str, Dict[str, Any]] = {}
+        self._ordered: List[Dict[str, Any]] = []
+        self._stale_by_id: Dict[int, Dict[str, Any]] = {}
+        self._loaded = False
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation, used to discard stale loads"""
+        return self._generation
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, products: List[Dict[str, Any]], generation: int) -> bool:
+        """Install a freshly queried product list unless it was invalidated meanwhile"""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._ordered = list(products)
+            self._by_id = {p['id']: p for p in self._ordered}
+            self._by_barcode = {p['barcode']: p for p in self._ordered if p.get('barcode')}
+            self._loaded = True
+            return True
+
+    def invalidate(self):
+        """Drop all cached products; the next lookup reloads the catalog"""
+        with self._lock:
+            self._generation += 1
+            if self._loaded:
+                self._stale_by_id = self._by_id
+            self._loaded = False
+            self._ordered = []
+            self._by_id = {}
+            self._by_barcode = {}
+            self.invalidations += 1
+
+    def patch(self, changed: Dict[int, Optional[Dict[str, Any]]]):
+        """Apply re-read products (None for ones no longer active) without a full reload"""
+        with self._lock:
+            # Loads that started before this patch would reinstate old rows
+            self._generation += 1
+            if not self._loaded:
+                return
+            added = False
+            for product_id, product in changed.items():
+                old = self._by_id.pop(product_id, None)
+                if old and old.get('barcode'):
+                    self._by_barcode.pop(old['barcode'], None)
+                if product:
+                    added = added or old is None
+                    self._by_id[product_id] = product
+                    if product.get('barcode'):
+                        self._by_barcode[product['barcode']] = product
+            ordered = [self._by_id[p['id']] for p in self._ordered if p['id'] in self._by_id]
+            if added:
+                listed = {p['id'] for p in ordered}
+                ordered.extend(p for p in self._by_id.values() if p['id'] not in listed)
+                ordered.sort(key=lambda p: str(p.get('name', '')).lower())
+            self._ordered = ordered
+
+    def get_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._by_id.get(product_id)
+
+    def get_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._by_barcode.get(barcode)
+
+    def get_stale_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Last known copy of a product, for when the server cannot be reached"""
+        with self._lock:
+            return self._by_id.get(product_id) or self._stale_by_id.get(product_id)
+
+    def all_products(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._ordered)
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'loaded': self._loaded,
+                'size': len(self._by_id),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations
+            }
+
 class Database:
     _instance = None
     _lock = threading.Lock()
@@ -37,24 +217,104 @@ class Database:
     def _initialize(self):
         """Initialize the database connection pool"""
         try:
-            config = self._read_config()
-            if not config:
-                raise Exception("Failed to read database configuration")
-
-            pool_config = {
-                "pool_name": "mypool",
-                "pool_size": 5,
-                "pool_reset_session": True,
-                **config
-            }
+            connect = self._create_connector()
 
-            self._pool = mysql.connector.pooling.MySQLConnectionPool(**pool_config)
+            pool_config = self._read_pool_config()
+            self._pool = ConnectionPool(
+                connect,
+                reset_session=True,
+                lifecycle=self._lifecycle,
+                **pool_config
+            )
+            self._migrate_schema()
+            self._catalog = ProductCatalog()
+            self._barcode_lookup = BarcodeLookup(self._fetch_product_by_barcode, self._catalog)
+            self._search = ProductSearchIndex()
+            checkout_config = self._read_checkout_config()
+            self._sale_writer = SaleWriter(checkout_config['stock_check'])
+            self._write_retries = checkout_config['write_retries']
+            self._retry_delay = checkout_config['retry_delay']
+            self._query_stats = QueryStats(**self._read_performance_config())
+            self._async = None
+            self._audit = None
+            self._rollup = SalesRollup(self)
+            self._outbox, self._replayer = self._create_outbox()
+            self._product_changes = ProductChangeFeed(
+                self, self._patch_products, self._reset_product_caches,
+                **self._read_changes_config()
+            )
             logger.info("Database connection pool initialized successfully")
 
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    def _create_connector(self):
+        """Set up the configured backend and return its connection factory"""
+        backend_config = self._read_backend_config()
+        self.backend = backend_config['backend']
+        
+        if self.backend == 'sqlite':
+            sqlite = SQLiteBackend(backend_config['path'], backend_config['busy_timeout'])
+            sqlite.ensure_directory()
+            self._lifecycle = ConnectionLifecycle()
+            logger.info(f"Using SQLite database {backend_config['path']}")
+            return sqlite.connect
+        
+        if self.backend != 'mysql':
+            raise Exception(f"Unknown database backend: {self.backend}")
+        
+        config = self._read_config()
+        if not config:
+            raise Exception("Failed to read database configuration")
+        self._lifecycle = ConnectionLifecycle(config['charset'], config['collation'])
+        return lambda: mysql.connector.connect(**config)
+
+    def _migrate_schema(self):
+        """Apply pending migrations so no lane runs against an older schema than its code"""
+        try:
+            self.get_migrations().migrate()
+        except Exception as e:
+            raise Exception(
+                f"Database schema could not be brought up to date: {e}. "
+                f"Run 'python -m utils.migrations status' to see which migration is pending"
+            ) from e
+
+    def _read_backend_config(self) -> Dict[str, Any]:
+        """Read which database backend to use from the [database] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        config.read(os.path.join(base_dir, 'config.ini'))
+        path = config.get('sqlite', 'path', fallback='data/mart.db')
+        return {
+            'backend': config.get('database', 'backend', fallback='mysql').strip().lower(),
+            'path': path if os.path.isabs(path) else os.path.join(base_dir, path),
+            'busy_timeout': config.getfloat('sqlite', 'busy_timeout', fallback=5.0)
+        }
+
+    def _read_outbox_config(self) -> Dict[str, Any]:
+        """Read the offline sale queue settings from the [outbox] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        config.read(os.path.join(base_dir, 'config.ini'))
+        path = config.get('outbox', 'path', fallback='data/sale_outbox.db')
+        return {
+            'path': path if os.path.isabs(path) else os.path.join(base_dir, path),
+            'batch_size': config.getint('outbox', 'batch_size', fallback=50),
+            'interval': config.getfloat('outbox', 'retry_interval', fallback=5.0),
+            'max_backoff': config.getfloat('outbox', 'max_backoff', fallback=60.0)
+        }
+
+    def _create_outbox(self):
+        """Open the local sale outbox and resume replaying anything left from last run"""
+        config = self._read_outbox_config()
+        outbox = SaleOutbox(config.pop('path'))
+        replayer = OutboxReplayer(outbox, self._replay_sales, **config)
+        if not replayer.online:
+            logger.warning(f"{outbox.stats()['pending']} queued sale(s) waiting to be replayed")
+            replayer.wake()
+        return outbox, replayer
+
     def _read_config(self) -> Dict[str, str]:
         """Read database configuration from config.ini"""
         config = ConfigParser()
@@ -74,21 +334,91 @@ class Database:
             logger.error(f"Failed to read config: {e}")
             return {}
 
+    def _read_pool_config(self) -> Dict[str, Any]:
+        """Read connection pool sizing from the [pool] section of config.ini"""
+        config = ConfigParser()
+        try:
+            config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini')
+            config.read(config_path)
+            return {
+                'pool_size': config.getint('pool', 'size', fallback=5),
+                'max_overflow': config.getint('pool', 'max_overflow', fallback=5),
+                'timeout': config.getfloat('pool', 'timeout', fallback=10.0),
+                'idle_timeout': config.getfloat('pool', 'idle_timeout', fallback=300.0),
+                'min_idle': config.getint('pool', 'min_idle', fallback=1)
+            }
+        except Exception as e:
+            logger.error(f"Failed to read pool config, using defaults: {e}")
+            return {}
+
+    def _read_performance_config(self) -> Dict[str, Any]:
+        """Read slow-query logging settings from the [performance] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        try:
+            config.read(os.path.join(base_dir, 'config.ini'))
+            log_path = config.get('performance', 'slow_query_log', fallback='logs/slow_queries.log')
+            return {
+                'slow_threshold_ms': config.getfloat('performance', 'slow_query_ms', fallback=200.0),
+                'slow_log_path': os.path.join(base_dir, log_path) if log_path else None
+            }
+        except Exception as e:
+            logger.error(f"Failed to read performance config, using defaults: {e}")
+            return {}
+
+    def _read_audit_config(self) -> Dict[str, Any]:
+        """Read login audit flush settings from the [audit] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        try:
+            config.read(os.path.join(base_dir, 'config.ini'))
+            return {
+                'flush_events': config.getint('audit', 'flush_events', fallback=20),
+                'flush_interval': config.getfloat('audit', 'flush_interval', fallback=2.0)
+            }
+        except Exception as e:
+            logger.error(f"Failed to read audit config, using defaults: {e}")
+            return {}
+
+    def _read_changes_config(self) -> Dict[str, Any]:
+        """Read product change feed settings from the [changes] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        try:
+            config.read(os.path.join(base_dir, 'config.ini'))
+            return {
+                'poll_interval': config.getfloat('changes', 'poll_interval', fallback=2.0),
+                'retention_hours': config.getfloat('changes', 'retention_hours', fallback=24.0)
+            }
+        except Exception as e:
+            logger.error(f"Failed to read change feed config, using defaults: {e}")
+            return {}
+
+    def _read_checkout_config(self) -> Dict[str, Any]:
+        """Read sale write settings from the [checkout] section of config.ini"""
+        config = ConfigParser()
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        defaults = {'stock_check': 'conditional', 'write_retries': 3, 'retry_delay': 0.05}
+        try:
+            config.read(os.path.join(base_dir, 'config.ini'))
+            return {
+                'stock_check': config.get('checkout', 'stock_check', fallback='conditional').strip().lower(),
+                'write_retries': config.getint('checkout', 'write_retries', fallback=3),
+                'retry_delay': config.getfloat('checkout', 'retry_delay', fallback=0.05)
+            }
+        except Exception as e:
+            logger.error(f"Failed to read checkout config, using defaults: {e}")
+            return defaults
+
     @contextmanager
     def get_connection(self):
         """Get a connection from the pool with automatic cleanup"""
         conn = None
         try:
             conn = self._pool.get_connection()
-            cursor = conn.cursor()
-            
-            # Set connection character set
-            cursor.execute("SET NAMES utf8mb4")
-            cursor.execute("SET CHARACTER SET utf8mb4")
-            cursor.execute("SET character_set_connection=utf8mb4")
             
-            cursor.close()
-            logger.info("Database connection established successfully")
+            # Character set is configured once per physical connection
+            self._lifecycle.on_borrow(conn)
             yield conn
         except Error as err:
             logger.error(f"Database connection error: {err}")
@@ -97,22 +427,84 @@ class Database:
             if conn:
                 try:
                     conn.close()
-                    logger.info("Database connection returned to pool")
                 except Exception as e:
                     logger.warning(f"Error closing connection: {e}")
 
-    def execute_query(self, query: str, params: tuple = None) -> Optional[List[Dict[str, Any]]]:
-        """Execute a query and return results as a list of dictionaries"""
+    def get_async(self) -> AsyncDatabase:
+        """Get the shared future-returning facade used by views to keep the Tk thread free"""
+        if self._async is None:
+            with self._lock:
+                if self._async is None:
+                    self._async = AsyncDatabase(self)
+        return self._async
+
+    def get_login_audit(self) -> LoginAuditBuffer:
+        """Get the shared write-behind buffer for login_history records"""
+        if self._audit is None:
+            with self._lock:
+                if self._audit is None:
+                    self._audit = LoginAuditBuffer(
+                        self, lambda e: is_connection_error(e) or is_lock_conflict(e),
+                        **self._read_audit_config()
+                    )
+        return self._audit
+
+    def record_login_attempt(self, user_id: Optional[int], status: bool,
+                             message: Optional[str] = None) -> str:
+        """Queue a login_history record without waiting for the insert; returns its session id"""
+        return self.get_login_audit().record(user_id, status, message)
+
+    def get_catalog_generation(self) -> int:
+        """Counter that changes whenever products or stock may have changed in this process"""
+        return self._catalog.generation
+
+    def get_product_changes(self) -> ProductChangeFeed:
+        """Get the product change feed, starting its poller on first use"""
+        self._product_changes.start()
+        return self._product_changes
+
+    def get_sale_writer(self) -> SaleWriter:
+        """Get the sale writer, e.g. to switch its stock_check mode"""
+        return self._sale_writer
+
+    def get_sales_rollup(self) -> SalesRollup:
+        """Get the rollup tables that serve the dashboard and report totals"""
+        return self._rollup
+
+    def get_migrations(self) -> MigrationRunner:
+        """Get the schema migration runner for this database"""
+        return MigrationRunner(self)
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Get borrow counts and session-init round trips saved by the lifecycle layer"""
+        return self._lifecycle.stats()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get live connection pool occupancy and wait times"""
+        return self._pool.stats()
+
+    def execute_query(self, query: str, params: tuple = None,
+                      row_type: Optional[Type[Row]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Execute a query and return results as a list of dictionaries
+
+        With a row_type (e.g. Product) rows are fetched as tuples and built
+        straight into that slotted class instead.
+        """
         try:
             with self.get_connection() as connection:
-                cursor = connection.cursor(dictionary=True)
-                cursor.execute(query, params)
-                
-                if query.strip().upper().startswith(('SELECT', 'SHOW')):
-                    result = cursor.fetchall()
-                else:
-                    connection.commit()
-                    result = None
+                cursor = connection.cursor(dictionary=row_type is None)
+                with self._track_query(query, params) as tracked:
+                    cursor.execute(query, params)
+                    
+                    if query.strip().upper().startswith(('SELECT', 'SHOW')):
+                        result = cursor.fetchall()
+                        if row_type is not None:
+                            result = row_type.from_cursor(cursor, result)
+                        tracked['rows'] = len(result)
+                    else:
+                        connection.commit()
+                        result = None
+                        tracked['rows'] = cursor.rowcount
                     
                 cursor.close()
                 return result
@@ -121,6 +513,59 @@ class Database:
             logger.error(f"Query execution failed: {e}")
             raise
 
+    def stream_query(self, query: str, params: tuple = None,
+                     chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield rows of a SELECT in chunks from an unbuffered cursor
+
+        Rows are pulled from the server as they are consumed, so memory stays
+        bounded by chunk_size however large the result is. The connection is
+        held until the generator is exhausted or closed; a stream abandoned
+        half-way leaves unread rows behind, so its connection is discarded
+        by the pool rather than reused.
+        """
+        with self.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            with self._track_query(query, params) as tracked:
+                try:
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        tracked['rows'] += len(rows)
+                        yield rows
+                finally:
+                    try:
+                        cursor.close()
+                    except Error as e:
+                        logger.debug(f"Stream closed with unread rows: {e}")
+
+    @contextmanager
+    def _track_query(self, query: str, params):
+        """Time a statement and record it in the query statistics"""
+        tracked = {'rows': 0}
+        start = time.perf_counter()
+        try:
+            yield tracked
+        except Exception:
+            self._query_stats.record(query, params, time.perf_counter() - start, 0, error=True)
+            raise
+        self._query_stats.record(query, params, time.perf_counter() - start, tracked['rows'])
+
+    def get_query_stats(self, top_n: int = 10, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """Get the top statements by total time (or another metric) with latency histograms"""
+        return self._query_stats.top_statements(top_n, order_by)
+
+    def dump_query_stats(self, top_n: int = 10) -> str:
+        """Log and return a table of the top statements by total time"""
+        report = self._query_stats.format_top(top_n)
+        logger.info(f"Top {top_n} statements by total time:\n{report}")
+        return report
+
+    def reset_query_stats(self):
+        """Clear collected query statistics"""
+        self._query_stats.reset()
+
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
@@ -135,6 +580,9 @@ class Database:
         try:
             result = self.execute_query("SELECT id FROM users WHERE username = 'admin'")
             if not result:
+                if self.backend == 'sqlite':
+                    # setup.py talks to MySQL directly
+                    return self.create_user('admin', 'admin123', 'admin')
                 from setup import create_admin_user
                 return create_admin_user()
             logger.info("Admin user already exists")
@@ -169,7 +617,20 @@ class Database:
     def disconnect(self):
         """Clean up database resources"""
         try:
-            if hasattr(self, '_pool'):
+            if getattr(self, '_audit', None):
+                self._audit.close()
+                self._audit = None
+            if getattr(self, '_product_changes', None):
+                self._product_changes.stop()
+            if getattr(self, '_replayer', None):
+                self._replayer.stop()
+                self._outbox.close()
+                self._replayer = None
+            if getattr(self, '_async', None):
+                self._async.shutdown()
+                self._async = None
+            if getattr(self, '_pool', None):
+                self._pool.close_all()
                 self._pool = None
                 logger.info("Database resources cleaned up")
         except Exception as e:
@@ -215,6 +676,194 @@ class Database:
             logger.error(f"Failed to get products: {e}")
             return []
 
+    def iter_products(self, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stream all active products in chunks, for exports"""
+        query = """
+            SELECT p.*, c.name as category_name 
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.is_active = TRUE
+            ORDER BY p.name
+        """
+        return self.stream_query(query, chunk_size=chunk_size)
+
+    @staticmethod
+    def _split_page(rows: Optional[List[Dict[str, Any]]], limit: int,
+                    key) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """Drop the look-ahead row and derive the cursor for the next page"""
+        rows = rows or []
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, key(rows[-1])
+        return rows, None
+
+    def get_products_page(self, search: str = None, after: Optional[tuple] = None,
+                          limit: int = 100) -> Tuple[List[Dict], Optional[tuple]]:
+        """Get one page of active products ordered by name
+
+        Uses keyset pagination: ``after`` is the (name, id) of the last row
+        already shown, so each page is a range scan on the name index no
+        matter how deep the user has scrolled. Returns the rows and the
+        cursor for the next page, or None when there are no more rows.
+        """
+        try:
+            query = """
+                SELECT p.*, c.name as category_name 
+                FROM products p 
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.is_active = TRUE
+            """
+            params: List[Any] = []
+            
+            if search:
+                query += " AND (p.name LIKE %s OR c.name LIKE %s)"
+                params.extend([f"%{search}%", f"%{search}%"])
+            
+            if after:
+                query += " AND (p.name, p.id) > (%s, %s)"
+                params.extend(after)
+            
+            # Fetch one extra row to know whether another page exists
+            query += " ORDER BY p.name, p.id LIMIT %s"
+            params.append(limit + 1)
+            
+            result = self.execute_query(query, tuple(params))
+            return self._split_page(result, limit, lambda row: (row['name'], row['id']))
+            
+        except Exception as e:
+            logger.error(f"Failed to get products page: {e}")
+            return [], None
+
+    def get_sales_page(self, after: Optional[tuple] = None,
+                       limit: int = 100) -> Tuple[List[Dict], Optional[tuple]]:
+        """Get one page of sales, newest first, after the (created_at, id) cursor"""
+        try:
+            query = """
+                SELECT 
+                    s.id,
+                    s.created_at,
+                    s.total_amount,
+                    s.payment_method,
+                    s.payment_status,
+                    u.username as cashier,
+                    c.name as customer_name
+                FROM sales s
+                LEFT JOIN users u ON s.user_id = u.id
+                LEFT JOIN customers c ON s.customer_id = c.id
+            """
+            params: List[Any] = []
+            
+            if after:
+                query += " WHERE (s.created_at, s.id) < (%s, %s)"
+                params.extend(after)
+            
+            query += " ORDER BY s.created_at DESC, s.id DESC LIMIT %s"
+            params.append(limit + 1)
+            
+            result = self.execute_query(query, tuple(params))
+            return self._split_page(result, limit, lambda row: (row['created_at'], row['id']))
+            
+        except Exception as e:
+            logger.error(f"Failed to get sales page: {e}")
+            return [], None
+
+    def _login_history_query(self, search_term: str) -> Tuple[str, List[Any]]:
+        """Login history joined with usernames, filtered by user, IP or device"""
+        query = """
+            SELECT 
+                lh.id,
+                lh.created_at,
+                u.username,
+                lh.ip_address,
+                lh.device_info,
+                lh.status,
+                lh.browser_info,
+                lh.location
+            FROM login_history lh
+            LEFT JOIN users u ON lh.user_id = u.id
+        """
+        params: List[Any] = []
+        if search_term:
+            search_pattern = f"%{search_term}%"
+            query += """
+            WHERE (
+                u.username LIKE %s OR
+                lh.ip_address LIKE %s OR
+                lh.device_info LIKE %s
+            )
+            """
+            params.extend([search_pattern] * 3)
+        return query, params
+
+    def get_login_history_page(self, search_term: str = "", after: Optional[tuple] = None,
+                               limit: int = 100) -> Tuple[List[Dict], Optional[tuple]]:
+        """Get one page of login history, newest first, after the (created_at, id) cursor"""
+        try:
+            query, params = self._login_history_query(search_term)
+            
+            if after:
+                query += " AND" if params else " WHERE"
+                query += " (lh.created_at, lh.id) < (%s, %s)"
+                params.extend(after)
+            
+            query += " ORDER BY lh.created_at DESC, lh.id DESC LIMIT %s"
+            params.append(limit + 1)
+            
+            result = self.execute_query(query, tuple(params))
+            return self._split_page(result, limit, lambda row: (row['created_at'], row['id']))
+            
+        except Exception as e:
+            logger.error(f"Failed to get login history page: {e}")
+            return [], None
+
+    def iter_login_history(self, search_term: str = "",
+                           chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stream the full filtered login history in chunks, for exports"""
+        query, params = self._login_history_query(search_term)
+        query += " ORDER BY lh.created_at DESC, lh.id DESC"
+        return self.stream_query(query, tuple(params) or None, chunk_size=chunk_size)
+
+    def _sales_details_query(self, start: date, end: date) -> Tuple[str, Tuple[datetime, datetime]]:
+        """Sale lines with product and cashier between two dates (inclusive)"""
+        predicate, params = time_range('s.created_at', start, end)
+        query = f"""
+            SELECT 
+                s.id as sale_id,
+                s.created_at,
+                p.name as product_name,
+                sd.quantity,
+                sd.price,
+                (sd.quantity * sd.price) as total,
+                u.username as sold_by
+            FROM sales s
+            JOIN sales_details sd ON s.id = sd.sale_id
+            JOIN products p ON sd.product_id = p.id
+            JOIN users u ON s.user_id = u.id
+            WHERE {predicate}
+            ORDER BY s.created_at, s.id
+        """
+        return query, params
+
+    def iter_sales_details(self, start: date, end: date,
+                           chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stream sale lines between two dates (inclusive) in chunks, for exports
+
+        Lines of one sale arrive together, ordered by sale time then id.
+        """
+        query, params = self._sales_details_query(start, end)
+        return self.stream_query(query, params, chunk_size=chunk_size)
+
+    def explain(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        """Get the execution plan of a SELECT (EXPLAIN on MySQL, EXPLAIN QUERY PLAN on SQLite)"""
+        prefix = "EXPLAIN QUERY PLAN " if self.backend == 'sqlite' else "EXPLAIN "
+        with self.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(prefix + query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
     def add_product(self, data: Dict[str, Any]) -> bool:
         """Add a new product with optional barcode"""
         query = """
@@ -234,10 +883,24 @@ class Database:
                 data.get('min_stock', 10),
                 data.get('barcode')  # Added barcode field
             ))
+            self.invalidate_catalog()
+            self._sync_search_index()
             return True
         except Error:
             return False
 
+    def import_products(self, path: str, progress=None) -> Dict[str, Any]:
+        """Bulk import products from a CSV file, upserting by barcode
+
+        Returns the import report: rows read, imported, rejected rows with
+        line numbers and reasons, elapsed time and throughput.
+        """
+        try:
+            return ProductImporter(self).run(path, progress)
+        finally:
+            self.invalidate_catalog()
+            self._search.reset()
+
     def update_product(self, product_id: int, data: Dict[str, Any]) -> bool:
         """Update an existing product"""
         query = """
@@ -256,6 +919,8 @@ class Database:
                 data.get('min_stock', 10),
                 product_id
             ))
+            self.invalidate_catalog()
+            self._sync_search_index(product_id)
             return True
         except Error:
             return False
@@ -265,6 +930,8 @@ class Database:
         query = "DELETE FROM products WHERE id = %s"
         try:
             self.execute_query(query, (product_id,))
+            self.invalidate_catalog()
+            self._search.remove(product_id)
             return True
         except Error:
             return False
@@ -274,48 +941,199 @@ class Database:
         return self.execute_query("SELECT * FROM categories")
 
     def add_sale(self, user_id: int, items: List[Dict], total: float, 
-                customer_id: Optional[int] = None) -> Optional[int]:
+                customer_id: Optional[int] = None, payment_method: str = 'cash',
+                idempotency_key: Optional[str] = None) -> Optional[int]:
         """Add a new sale with its details"""
         try:
-            with self.get_connection() as connection:
-                cursor = connection.cursor(dictionary=True)
-                
-                # Insert sale
-                sale_query = """
-                    INSERT INTO sales (user_id, customer_id, total_amount, payment_method)
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(sale_query, (user_id, customer_id, total, 'cash'))
-                sale_id = cursor.lastrowid
-                
-                # Insert sale details and update stock
-                for item in items:
-                    detail_query = """
-                        INSERT INTO sales_details (sale_id, product_id, quantity, price)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(detail_query, (
-                        sale_id, item['product_id'], item['quantity'], item['price']
-                    ))
-                    
-                    # Update stock
-                    stock_query = """
-                        UPDATE products 
-                        SET stock = stock - %s
-                        WHERE id = %s
-                    """
-                    cursor.execute(stock_query, (item['quantity'], item['product_id']))
-                
-                connection.commit()
-                cursor.close()
-                return sale_id
-                
+            return self._write_sale(user_id, items, total, customer_id, payment_method, idempotency_key)
         except Error as e:
             logger.error(f"Error adding sale: {e}")
-            if 'connection' in locals():
-                connection.rollback()
             return None
 
+    def _write_sale(self, user_id: int, items: List[Dict], total: float,
+                    customer_id: Optional[int] = None, payment_method: str = 'cash',
+                    idempotency_key: Optional[str] = None) -> int:
+        """Write a sale, running it again if it lost a deadlock or lock wait"""
+        def write() -> int:
+            with self.get_connection() as connection:
+                try:
+                    return self._sale_writer.write(
+                        connection, user_id, items, total, customer_id, payment_method, idempotency_key
+                    )
+                except Error:
+                    connection.rollback()
+                    raise
+
+        sale_id = self._retry_lock_conflicts(write, "Sale write")
+        self._products_changed()
+        return sale_id
+
+    def _retry_lock_conflicts(self, write: Callable[[], Any], what: str) -> Any:
+        """Run a write transaction, running it again if it lost a deadlock or lock wait
+
+        Retries are bounded by write_retries and spaced with jittered
+        exponential backoff, so lanes that collided do not collide again.
+        """
+        attempt = 0
+        while True:
+            try:
+                return write()
+            except Error as e:
+                if not is_lock_conflict(e) or attempt >= self._write_retries:
+                    raise
+                attempt += 1
+                self._sale_writer.record_retry(deadlock=getattr(e, 'errno', None) == _DEADLOCK_ERRNO)
+                delay = random.uniform(0, self._retry_delay * 2 ** attempt)
+                logger.warning(f"{what} hit a lock conflict, retry {attempt}/{self._write_retries} "
+                               f"in {delay * 1000:.0f} ms: {e}")
+                time.sleep(delay)
+
+    def estimate_shortfalls(self, items: List[Dict]) -> List[Dict[str, Any]]:
+        """Lines the cached catalog says stock cannot cover, without a database round trip
+
+        A hint for the checkout screen, safe on the Tk thread and offline.
+        The cache may trail other lanes by a poll interval, so the sale
+        write checks again in its own transaction. Products the cache does
+        not hold are left to that check. Same shape as the shortfalls of
+        InsufficientStockError.
+        """
+        shortfalls = []
+        for product_id, requested in SaleWriter.aggregate_quantities(items).items():
+            product = self._catalog.get_stale_by_id(product_id)
+            if product is None:
+                continue
+            available = int(product.get('stock') or 0)
+            if requested > available:
+                shortfalls.append({
+                    'product_id': product_id,
+                    'name': product.get('name'),
+                    'requested': requested,
+                    'available': available,
+                    'shortfall': requested - available
+                })
+        return shortfalls
+
+    def submit_sale(self, user_id: int, items: List[Dict], total: float,
+                    customer_id: Optional[int] = None, payment_method: str = 'cash') -> Dict[str, Any]:
+        """Write a sale, or queue it in the local outbox if the server is unreachable
+
+        Returns a dict with status 'committed' and the sale_id, or status
+        'queued' when the sale was stored locally for replay. Errors other
+        than connectivity (bad product, constraint violations) are raised;
+        InsufficientStockError carries the lines that were short. Stock is
+        checked inside the sale transaction, by the conditional stock UPDATE
+        or by SaleWriter.reserve's SELECT ... FOR UPDATE (stock_check in the
+        [checkout] section), so the check and the write cannot drift apart.
+        """
+        key = new_idempotency_key()
+        sale = {
+            'user_id': user_id,
+            'items': items,
+            'total': total,
+            'customer_id': customer_id,
+            'payment_method': payment_method
+        }
+
+        # While earlier sales are still queued the server is known to be
+        # down; don't make the customer wait for another connect timeout
+        if self._replayer.online:
+            try:
+                sale_id = self._write_sale(idempotency_key=key, **sale)
+                return {'status': 'committed', 'sale_id': sale_id, 'idempotency_key': key}
+            except Error as e:
+                if not is_connection_error(e):
+                    raise
+                logger.warning(f"Server unreachable, queueing sale {key}: {e}")
+
+        self._outbox.enqueue(key, sale)
+        self._replayer.online = False
+        self._replayer.wake()
+        return {'status': 'queued', 'sale_id': None, 'idempotency_key': key}
+
+    def _replay_sales(self, batch: List[Dict[str, Any]]):
+        """Write a batch of queued sales in one transaction; called by the outbox replayer
+
+        These sales have already happened: the customer left with the goods
+        and an OFFLINE receipt. Stock that other lanes sold in the meantime
+        does not stop one from being booked (see _replay_sale), and a lock
+        conflict runs the batch again. Only a sale the server refuses
+        outright, e.g. for a product that no longer exists, is parked as
+        rejected for review.
+        """
+        try:
+            sent, rejected = self._retry_lock_conflicts(lambda: self._replay_batch(batch), "Sale replay")
+        except Error as e:
+            # Still pending; the replayer tries again after its backoff
+            self._outbox.mark_failed([entry['idempotency_key'] for entry in batch], str(e))
+            raise
+
+        self._outbox.mark_sent(sent)
+        for key, error in rejected:
+            logger.error(f"Queued sale {key} was refused by the server and needs review: {error}")
+            self._outbox.mark_rejected(key, error)
+        if sent:
+            self._products_changed()
+
+    def _replay_batch(self, batch: List[Dict[str, Any]]) -> Tuple[List[tuple], List[tuple]]:
+        """One attempt at writing a batch; returns (key, sale_id) sent and (key, error) rejected"""
+        sent: List[tuple] = []
+        rejected: List[tuple] = []
+        with self.get_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for entry in batch:
+                    key, sale = entry['idempotency_key'], entry['sale']
+                    # A savepoint per sale, so one refused sale doesn't sink the batch
+                    cursor.execute("SAVEPOINT outbox_sale")
+                    try:
+                        sent.append((key, self._replay_sale(connection, cursor, key, sale)))
+                    except Error as e:
+                        if is_connection_error(e) or is_lock_conflict(e):
+                            raise
+                        cursor.execute("ROLLBACK TO SAVEPOINT outbox_sale")
+                        cursor.execute("SELECT id FROM sales WHERE idempotency_key = %s", (key,))
+                        existing = cursor.fetchone()
+                        if existing:
+                            # An earlier attempt did reach the server
+                            sent.append((key, existing[0]))
+                        else:
+                            rejected.append((key, str(e)))
+                connection.commit()
+            except Error:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        return sent, rejected
+
+    def _replay_sale(self, connection, cursor, key: str, sale: Dict[str, Any]) -> int:
+        """Write one queued sale inside the batch, booking it even if stock ran out meanwhile"""
+        args = (connection, sale['user_id'], sale['items'], sale['total'],
+                sale.get('customer_id'), sale.get('payment_method', 'cash'))
+        try:
+            return self._sale_writer.write(*args, idempotency_key=key, commit=False)
+        except InsufficientStockError as e:
+            logger.warning(f"Queued sale {key} sold more than is in stock now, "
+                           f"booking it with stock clamped at zero: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT outbox_sale")
+            return self._sale_writer.write(*args, idempotency_key=key, commit=False, clamp_stock=True)
+
+    def get_sale_outbox_stats(self) -> Dict[str, Any]:
+        """Get queued, replayed and rejected offline sale counts"""
+        return self._replayer.stats()
+
+    def get_rejected_sales(self) -> List[Dict[str, Any]]:
+        """Get queued sales the server refused, oldest first, for a manager to review"""
+        return self._outbox.rejected()
+
+    def dismiss_rejected_sales(self, keys: List[str]):
+        """Mark rejected queued sales as reviewed so they are no longer flagged"""
+        self._outbox.mark_reviewed(keys)
+
+    def get_sale_write_stats(self) -> Dict[str, Any]:
+        """Get per-phase timings of the batched sale writer"""
+        return self._sale_writer.stats()
+
     def get_low_stock_products(self) -> List[Dict]:
         """Get products with stock below minimum level"""
         query = """
@@ -324,58 +1142,116 @@ class Database:
             LEFT JOIN categories c ON p.category_id = c.id
             WHERE p.stock <= p.min_stock
         """
-        return self.execute_query(query)
+        return self.execute_query(query, row_type=Product)
 
     def get_daily_sales_summary(self) -> Dict[str, Any]:
         """Get sales summary for the current day"""
+        today = date.today()
+        days = self._rollup.daily(today, today)
+        if not days:
+            return {'total_sales': 0, 'total_revenue': None, 'average_sale': None}
+        day = days[0]
+        return {
+            'total_sales': day['num_sales'],
+            'total_revenue': day['total_revenue'],
+            'average_sale': day['total_revenue'] / day['num_sales'] if day['num_sales'] else None
+        }
+
+    def get_sales_since(self, after_id: int, limit: int = 1000) -> List[Sale]:
+        """Get up to limit sales with an id after after_id, oldest first, each with its lines"""
         query = """
-            SELECT 
-                COUNT(*) as total_sales,
-                SUM(total_amount) as total_revenue,
-                AVG(total_amount) as average_sale
-            FROM sales 
-            WHERE DATE(created_at) = CURDATE()
+            SELECT s.id, s.created_at, s.total_amount,
+                   sd.product_id, sd.quantity, sd.price, p.name
+            FROM (
+                SELECT id, created_at, total_amount FROM sales
+                WHERE id > %s ORDER BY id LIMIT %s
+            ) s
+            LEFT JOIN sales_details sd ON sd.sale_id = s.id
+            LEFT JOIN products p ON p.id = sd.product_id
+            ORDER BY s.id
         """
-        result = self.execute_query(query)
-        return result[0] if result else None
+        sales: List[Dict[str, Any]] = []
+        for row in self.execute_query(query, (after_id, limit)) or []:
+            if not sales or sales[-1].id != row['id']:
+                sales.append(Sale(
+                    id=row['id'],
+                    created_at=row['created_at'],
+                    total_amount=float(row['total_amount']),
+                    lines=[]
+                ))
+            if row['product_id'] is not None:
+                sales[-1].lines.append(SaleLine(
+                    sale_id=row['id'],
+                    product_id=row['product_id'],
+                    quantity=row['quantity'],
+                    price=float(row['price']),
+                    name=row['name']
+                ))
+        return sales
+
+    def get_sales_trend(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Get per-day sales for the last N days and today, served from the rollups"""
+        try:
+            today = date.today()
+            return self._rollup.daily(today - timedelta(days=days), today)
+        except Error as e:
+            logger.error(f"Failed to get sales trend: {e}")
+            return []
+
+    def get_hourly_sales(self, day: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Get per-hour sales of one day (today by default)"""
+        try:
+            return self._rollup.hourly(day or date.today())
+        except Error as e:
+            logger.error(f"Failed to get hourly sales: {e}")
+            return []
+
+    def get_top_products(self, start: date, end: date, limit: int = 5,
+                         by: str = 'quantity') -> List[Dict[str, Any]]:
+        """Get the best selling products between two dates (inclusive) by quantity or revenue"""
+        try:
+            return self._rollup.top_products(start, end, limit, by)
+        except Error as e:
+            logger.error(f"Failed to get top products: {e}")
+            return []
+
+    def get_sales_report(self, start: date, end: date) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get per-day sales and the top 5 products by revenue between two dates (inclusive)"""
+        return self._rollup.daily(start, end), self._rollup.top_products(start, end, 5, 'revenue')
 
     def get_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
         """Get product details by barcode with enhanced error handling"""
         try:
-            # Clean barcode input
-            barcode = barcode.strip()
-            if not barcode:
-                return None
-            
-            # Query with category information
-            query = """
-                SELECT p.*, c.name as category_name 
-                FROM products p 
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.barcode = %s AND p.is_active = TRUE
-            """
-            
-            # Execute with retry mechanism
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    result = self.execute_query(query, (barcode,))
-                    if result:
-                        # Convert decimal values to float
-                        product = result[0]
-                        if 'price' in product:
-                            product['price'] = float(product['price'])
-                        return product
-                    return None
-                    
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise
-                    time.sleep(0.5)
-            
+            return self._barcode_lookup.lookup(barcode)
         except Exception as e:
             logger.error(f"Error getting product by barcode: {e}")
             return None
+
+    def _fetch_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Exact-match barcode query served by the barcode index"""
+        # Query with category information
+        query = """
+            SELECT p.*, c.name as category_name 
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.barcode = %s AND p.is_active = TRUE
+        """
+        
+        # Execute with retry mechanism
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                result = self.execute_query(query, (barcode,), row_type=Product)
+                return result[0] if result else None
+                
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(0.5)
+
+    def get_barcode_lookup_stats(self) -> Dict[str, Any]:
+        """Get latency statistics of the barcode lookup engine"""
+        return self._barcode_lookup.stats()
     
     def update_product_barcode(self, product_id: int, barcode: str) -> bool:
         """Update product's barcode with validation"""
@@ -402,6 +1278,8 @@ class Database:
             """
             
             self.execute_query(query, (barcode, product_id))
+            self.invalidate_catalog()
+            self._sync_search_index(product_id)
             return True
             
         except Exception as e:
@@ -420,14 +1298,7 @@ class Database:
                 ORDER BY p.name
             """
             
-            result = self.execute_query(query)
-            
-            # Convert decimal values to float
-            if result:
-                for product in result:
-                    if 'price' in product:
-                        product['price'] = float(product['price'])
-            
+            result = self.execute_query(query, row_type=Product)
             return result if result else []
             
         except Exception as e:
@@ -465,14 +1336,17 @@ class Database:
             try:
                 with self.get_connection() as conn:
                     cursor = conn.cursor(dictionary=True)
-                    cursor.execute(query, params)
-                    
-                    if query.strip().upper().startswith('SELECT'):
-                        result = cursor.fetchall()
-                        return result if result else []
-                    else:
-                        conn.commit()
-                        return True
+                    with self._track_query(query, params) as tracked:
+                        cursor.execute(query, params)
+                        
+                        if query.strip().upper().startswith('SELECT'):
+                            result = cursor.fetchall()
+                            tracked['rows'] = len(result)
+                            return result if result else []
+                        else:
+                            conn.commit()
+                            tracked['rows'] = cursor.rowcount
+                            return True
                     
             except Error as err:
                 retry_count += 1
@@ -527,62 +1401,268 @@ class Database:
             logger.error(f"User creation failed: {e}")
             return False
 
-    def get_products_with_optional_search(self, search_term=None):
+    def get_products_with_optional_search(self, search_term=None, limit: int = 200):
         """Get products with optional search term and enhanced error handling"""
         try:
-            # Base query with category join
-            query = """
-                SELECT p.*, c.name as category_name 
-                FROM products p 
-                LEFT JOIN categories c ON p.category_id = c.id 
-                WHERE 1=1
-            """
-            params = []
-            
-            # Add search condition if term provided
             if search_term:
-                # Clean and validate search term
                 search_term = search_term.strip()
-                if search_term:
-                    query += """ 
-                        AND (
-                            p.name LIKE %s 
-                            OR p.description LIKE %s
-                            OR c.name LIKE %s
-                            OR CAST(p.price AS CHAR) LIKE %s
-                        )
-                    """
-                    search_pattern = f"%{search_term}%"
-                    params.extend([search_pattern] * 4)
-            
-            # Add sorting and active products only
-            query += " AND p.is_active = 1 ORDER BY p.name ASC"
-            
-            # Execute query with retry mechanism
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    results = self.execute_query(query, params)
-                    
-                    # Convert decimal values to float for JSON serialization
-                    if results:
-                        for product in results:
-                            if 'price' in product:
-                                product['price'] = float(product['price'])
-                    
-                    return results if results else []
-                    
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise
-                    time.sleep(0.5)  # Wait before retry
+            
+            # The unfiltered catalog is served from the in-memory cache
+            if not search_term:
+                if self._ensure_catalog():
+                    return self._catalog.all_products()
+                return self._query_products(None)
+            
+            product_ids = self._search.search(search_term, limit)
+            if product_ids is None:
+                # Index still cold: build it in the background, answer from MySQL
+                self._warm_search_index()
+                return self._fulltext_search(search_term, limit)
+            
+            return self._resolve_products(product_ids)
             
         except Exception as e:
             logger.error(f"Error in get_products_with_optional_search: {e}")
             return []  # Return empty list on error
-            
+
+    def _warm_search_index(self):
+        """Start building the product search index unless it is already built or building"""
+        if self._search.start_build():
+            try:
+                future = self.get_async().submit(self._build_search_index)
+            except Exception as e:
+                self._search.abort_build()
+                logger.warning(f"Could not schedule product search index build: {e}")
+                return
+            # A full worker pool hands back a future that has already failed
+            future.add_done_callback(self._search_build_done)
+
+    def _search_build_done(self, future):
+        """Release the build claim if the build was refused or died before finishing"""
+        error = future.exception()
+        if error is not None:
+            self._search.abort_build()
+            logger.warning(f"Could not build product search index: {error}")
+
+    def _build_search_index(self):
+        generation = self._search.generation
+        try:
+            if self._ensure_catalog():
+                products = self._catalog.all_products()
+            else:
+                products = self._query_products(None)
+        except Exception as e:
+            self._search.abort_build()
+            logger.error(f"Failed to build product search index: {e}")
+            return
+        
+        if not self._search.finish_build(products, generation):
+            logger.info("Products changed while indexing; search index will be rebuilt on next search")
+
+    def _sync_search_index(self, product_id: Optional[int] = None):
+        """Patch the search index after a product write instead of rebuilding it
+
+        With a product_id that product is re-read and re-indexed; without one
+        (after an insert) every product newer than the index is picked up.
+        """
+        if not self._search.is_ready():
+            self._search.mark_changed()
+            return
+        
+        query = """
+            SELECT p.*, c.name as category_name 
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.is_active = TRUE AND 
+        """
+        try:
+            if product_id is None:
+                rows = self.execute_query(query + "p.id > %s", (self._search.max_id,))
+            else:
+                rows = self.execute_query(query + "p.id = %s", (product_id,))
+                if not rows:
+                    self._search.remove(product_id)
+            for row in rows or []:
+                self._search.upsert(row)
+        except Exception as e:
+            # Better a rebuild than an index that silently misses products
+            logger.error(f"Failed to update product search index, resetting it: {e}")
+            self._search.reset()
+
+    def _resolve_products(self, product_ids: List[int]) -> List[Dict[str, Any]]:
+        """Turn ranked search hits into current product rows, keeping the ranking"""
+        if not product_ids:
+            return []
+        
+        if self._ensure_catalog():
+            products = (self._catalog.get_by_id(product_id) for product_id in product_ids)
+            return [product for product in products if product]
+        
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        query = f"""
+            SELECT p.*, c.name as category_name 
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.id IN ({placeholders}) AND p.is_active = TRUE
+        """
+        rows = {row['id']: row for row in self.execute_query(query, tuple(product_ids), row_type=Product) or []}
+        return [rows[product_id] for product_id in product_ids if product_id in rows]
+
+    def _fulltext_search(self, search_term: str, limit: int) -> List[Dict[str, Any]]:
+        """Search through the MySQL FULLTEXT index while the in-memory index is cold"""
+        if self.backend == 'sqlite':
+            return self._query_products(search_term)[:limit]
+        
+        words = re.findall(r"\w+", search_term)
+        if not words:
+            return []
+        
+        # Every word must match, each as a prefix, e.g. "+coca* +col*"
+        boolean_query = " ".join(f"+{word}*" for word in words)
+        query = """
+            SELECT p.*, c.name as category_name,
+                   MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE) AS relevance
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.is_active = 1
+              AND MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE)
+            UNION
+            SELECT p.*, c.name as category_name, 1000 AS relevance
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.is_active = 1 AND p.barcode = %s
+            ORDER BY relevance DESC, name ASC
+            LIMIT %s
+        """
+        try:
+            # Product has no relevance column, so the sort key is dropped
+            results = self.execute_query(query, (boolean_query, boolean_query, search_term, limit),
+                                         row_type=Product)
+        except Error as e:
+            # No FULLTEXT index on this database yet; fall back to the LIKE scan
+            logger.warning(f"FULLTEXT search unavailable, using LIKE search: {e}")
+            return self._query_products(search_term)[:limit]
+        
+        return results or []
+
+    def get_search_stats(self) -> Dict[str, Any]:
+        """Get product search index size, update counts and search latency"""
+        return self._search.stats()
+
+    def _query_products(self, search_term: Optional[str]) -> List[Dict[str, Any]]:
+        """Query active products from the database, optionally filtered by a search term"""
+        # Base query with category join
+        query = """
+            SELECT p.*, c.name as category_name 
+            FROM products p 
+            LEFT JOIN categories c ON p.category_id = c.id 
+            WHERE 1=1
+        """
+        params = []
+        
+        # Add search condition if term provided
+        if search_term:
+            query += """ 
+                AND (
+                    p.name LIKE %s 
+                    OR p.description LIKE %s
+                    OR c.name LIKE %s
+                    OR CAST(p.price AS CHAR) LIKE %s
+                )
+            """
+            search_pattern = f"%{search_term}%"
+            params.extend([search_pattern] * 4)
+        
+        # Add sorting and active products only
+        query += " AND p.is_active = 1 ORDER BY p.name ASC"
+        
+        # Execute query with retry mechanism
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                results = self.execute_query(query, params, row_type=Product)
+                return results if results else []
+                
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(0.5)  # Wait before retry
+        
         return []  # Ensure we always return a list
 
+    def _ensure_catalog(self) -> bool:
+        """Make sure the product catalog cache is populated; returns False if loading failed"""
+        if self._catalog.is_loaded():
+            self._catalog.record(hit=True)
+            return True
+        
+        self._catalog.record(hit=False)
+        generation = self._catalog.generation
+        try:
+            products = self._query_products(None)
+        except Exception as e:
+            logger.error(f"Failed to load product catalog: {e}")
+            return False
+        
+        # A product changed while we were loading; let the caller query directly
+        return self._catalog.load(products, generation)
+
+    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Get an active product by id from the catalog cache"""
+        try:
+            if self._ensure_catalog():
+                return self._catalog.get_by_id(product_id)
+            
+            # Cache unavailable, fall back to a direct lookup
+            query = """
+                SELECT p.*, c.name as category_name 
+                FROM products p 
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.id = %s AND p.is_active = TRUE
+            """
+            result = self.execute_query(query, (product_id,), row_type=Product)
+            return result[0] if result else None
+        except Error as e:
+            if is_connection_error(e):
+                # Keep the lane selling from the last known catalog while offline
+                logger.warning(f"Server unreachable, using cached product {product_id}: {e}")
+                return self._catalog.get_stale_by_id(product_id)
+            logger.error(f"Error getting product {product_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting product {product_id}: {e}")
+            return None
+
+    def invalidate_catalog(self):
+        """Discard cached products after a product or stock change"""
+        self._catalog.invalidate()
+
+    def _products_changed(self):
+        """After this lane changed stock: let the change feed patch the caches, or drop them"""
+        if not self._product_changes.wake():
+            self.invalidate_catalog()
+
+    def _patch_products(self, changed: Dict[int, Optional[Dict[str, Any]]]):
+        """Apply products re-read by the change feed to the catalog and search index"""
+        self._catalog.patch(changed)
+        if not self._search.is_ready():
+            self._search.mark_changed()
+            return
+        for product_id, product in changed.items():
+            if product:
+                self._search.upsert(product)
+            else:
+                self._search.remove(product_id)
+
+    def _reset_product_caches(self):
+        """Drop the catalog and search index when the change feed lost track"""
+        self.invalidate_catalog()
+        self._search.reset()
+
+    def get_catalog_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters of the product catalog cache"""
+        return self._catalog.stats()
+
     def add_product_with_validation(self, data: Dict[str, Any]) -> bool:
         """Add a new product with validation"""
         try:
@@ -608,7 +1688,10 @@ class Database:
                 VALUES ({', '.join(placeholders)}, TRUE)
             """
             
-            return bool(self.execute_query_with_retries(query, tuple(values)))
+            success = bool(self.execute_query_with_retries(query, tuple(values)))
+            self.invalidate_catalog()
+            self._sync_search_index()
+            return success
             
         except Exception as e:
             logger.error(f"Failed to add product: {e}")
@@ -642,7 +1725,10 @@ class Database:
                 WHERE id = %s
             """
             
-            return bool(self.execute_query_with_retries(query, tuple(values)))
+            success = bool(self.execute_query_with_retries(query, tuple(values)))
+            self.invalidate_catalog()
+            self._sync_search_index(product_id)
+            return success
             
         except Exception as e:
             logger.error(f"Failed to update product: {e}")
@@ -652,7 +1738,10 @@ class Database:
         """Soft delete a product"""
         try:
             query = "UPDATE products SET is_active = FALSE WHERE id = %s"
-            return bool(self.execute_query_with_retries(query, (product_id,)))
+            success = bool(self.execute_query_with_retries(query, (product_id,)))
+            self.invalidate_catalog()
+            self._search.remove(product_id)
+            return success
         except Exception as e:
             logger.error(f"Failed to delete product: {e}")
             return False
@@ -666,56 +1755,26 @@ class Database:
             logger.error(f"Failed to get categories: {e}")
             return []
 
-    def create_tables(self):
+    def create_tables(self) -> List[int]:
+        """Bring the schema up to date by applying pending migrations"""
         try:
-            # Create users table
-            self.execute_query("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(50) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    role VARCHAR(20) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create login_history table
-            self.execute_query("""
-                CREATE TABLE IF NOT EXISTS login_history (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_id INT,
-                    ip_address VARCHAR(45),
-                    device_info VARCHAR(255),
-                    status BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-
+            return self.get_migrations().migrate()
         except Error as e:
             logger.error(f"Error creating tables: {e}")
-            raise 
+            raise
 
     def get_daily_sales(self) -> Dict[str, Any]:
         """Get daily sales statistics"""
         try:
-            query = """
-                SELECT 
-                    COUNT(*) as total_sales,
-                    COALESCE(SUM(total_amount), 0) as total_revenue,
-                    COUNT(DISTINCT product_id) as unique_items,
-                    COALESCE(SUM(quantity), 0) as total_items
-                FROM sales s
-                LEFT JOIN sales_details sd ON s.id = sd.sale_id
-                WHERE DATE(s.created_at) = CURDATE()
-            """
-            result = self.execute_query(query)
-            if result and result[0]:
-                stats = result[0]
-                # Convert decimal values to float
-                if stats['total_revenue']:
-                    stats['total_revenue'] = float(stats['total_revenue'])
-                return stats
+            today = date.today()
+            days = self._rollup.daily(today, today)
+            if days:
+                return {
+                    'total_sales': days[0]['num_sales'],
+                    'total_revenue': days[0]['total_revenue'],
+                    'unique_items': len(self._rollup.products(today, today)),
+                    'total_items': days[0]['total_items']
+                }
             return {
                 'total_sales': 0,
                 'total_revenue': 0.0,
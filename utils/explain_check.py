@@ -0,0 +1,64 @@
+import sys
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import time_range
+
+logger = logging.getLogger(__name__)
+
+
+def _range_scans(db, plan: List[Dict[str, Any]], table: str, index: str) -> bool:
+    """Whether the plan reads ``table`` through a range scan of ``index``
+
+    Indexes that extend it (e.g. the covering idx_sale_date_amount) count too.
+    """
+    if db.backend == 'sqlite':
+        # e.g. "SEARCH s USING INDEX idx_sale_date (created_at>? AND created_at<?)"
+        return any(f"INDEX {index}" in row['detail'] and '>' in row['detail'] for row in plan)
+    return any(row.get('table') == table and row.get('type') == 'range'
+               and (row.get('key') or '').startswith(index)
+               for row in plan)
+
+
+def checks(db, start: date, end: date) -> List[Tuple[str, str, tuple, str, str]]:
+    """(name, query, params, table alias, expected index) for each reporting query"""
+    query, params = db._sales_details_query(start, end)
+    login_predicate, login_params = time_range('created_at', start, end)
+    return [
+        ('sales details export', query, params, 's', 'idx_sale_date'),
+        ('login history by day',
+         f"SELECT id, user_id, status FROM login_history WHERE {login_predicate}",
+         login_params, 'login_history',
+         'idx_login_created_at' if db.backend == 'sqlite' else 'idx_created_at')
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """python -m utils.explain_check [days]
+
+    Runs EXPLAIN on the date-filtered reporting queries and fails if one of
+    them would not use a range scan on its created_at index. On a nearly
+    empty MySQL table the optimizer may prefer a full scan; run it against
+    a database with realistic data.
+    """
+    from .database import Database
+
+    logging.basicConfig(level=logging.INFO)
+    args = argv if argv is not None else sys.argv[1:]
+    days = int(args[0]) if args else 30
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+
+    db = Database()
+    failed = 0
+    for name, query, params, table, index in checks(db, start, end):
+        plan = db.explain(query, params)
+        ok = _range_scans(db, plan, table, index)
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {'range scan on ' + index if ok else plan}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import os
+import re
+import sys
+import time
+import logging
+import importlib.util
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'migrations')
+# Migration files are named NNNN_short_name.py and applied in version order
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+# Named lock that keeps two lanes starting at once from migrating together
+LOCK_NAME = 'mart_schema_migrations'
+# MySQL error for a metadata lock wait that ran into lock_wait_timeout
+_LOCK_WAIT_TIMEOUT = 1205
+
+VERSION_TABLE = {
+    'mysql': """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP NOT NULL,
+            duration_ms INT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB
+    """,
+    'sqlite': """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL,
+            duration_ms INTEGER NOT NULL DEFAULT 0
+        )
+    """
+}
+
+
+class Migration:
+    """One migration file; its module is loaded on first use"""
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"mart_migration_{self.version:04d}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def description(self) -> str:
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def upgrade(self, schema: 'SchemaEditor'):
+        self.module.upgrade(schema)
+
+
+class SchemaEditor:
+    """Backend-aware DDL helpers handed to each migration's ``upgrade()``
+
+    Every helper checks the catalog first and does nothing if the object
+    already exists, so a migration can run against a database created by an
+    older setup.py or schema file, or be re-run after MySQL committed part
+    of it. On
+    MySQL indexes and columns are added with ALGORITHM=INPLACE, LOCK=NONE so
+    sales keep being written while the index builds; a metadata lock that
+    cannot be had within lock_wait_timeout is retried instead of leaving
+    the ALTER queued in front of every checkout.
+    """
+
+    def __init__(self, cursor, backend: str, retries: int = 3, retry_delay: float = 5.0):
+        self.cursor = cursor
+        self.backend = backend
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def execute(self, query: str, params: tuple = None):
+        self.cursor.execute(query, params)
+
+    def _scalar(self, query: str, params: tuple) -> bool:
+        self.cursor.execute(query, params)
+        return bool(self.cursor.fetchall())
+
+    def table_exists(self, table: str) -> bool:
+        if self.backend == 'sqlite':
+            return self._scalar("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return self._scalar(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+
+    def column_exists(self, table: str, column: str) -> bool:
+        if self.backend == 'sqlite':
+            return self._scalar("SELECT 1 FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+        return self._scalar(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+            (table, column)
+        )
+
+    def index_exists(self, table: str, index: str) -> bool:
+        if self.backend == 'sqlite':
+            return self._scalar(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                (table, index)
+            )
+        return self._scalar(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+            (table, index)
+        )
+
+    def _alter(self, statement: str):
+        """Run an online ALTER, retrying when the metadata lock is not granted in time"""
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.cursor.execute(statement)
+                return
+            except Error as e:
+                if getattr(e, 'errno', None) != _LOCK_WAIT_TIMEOUT or attempt == self.retries:
+                    raise
+                logger.warning(f"Waiting for a metadata lock ({attempt}/{self.retries}), "
+                               f"retrying in {self.retry_delay:.0f}s: {statement.strip()}")
+                time.sleep(self.retry_delay)
+
+    def add_column(self, table: str, column: str, definition: str) -> bool:
+        """Add a column if it is missing; returns True if it was added"""
+        if self.column_exists(table, column):
+            return False
+        if self.backend == 'sqlite':
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        else:
+            self._alter(f"ALTER TABLE {table} ADD COLUMN {column} {definition}, "
+                        f"ALGORITHM=INPLACE, LOCK=NONE")
+        logger.info(f"Added column {table}.{column}")
+        return True
+
+    def create_index(self, table: str, name: str, columns: List[str],
+                     unique: bool = False, fulltext: bool = False) -> bool:
+        """Build an index without blocking writes; returns True if it was created
+
+        FULLTEXT indexes exist only on MySQL (SQLite search is served by the
+        in-memory index) and need LOCK=SHARED, which still allows reads.
+        """
+        if fulltext and self.backend == 'sqlite':
+            return False
+        if self.index_exists(table, name):
+            return False
+        started = time.perf_counter()
+        if self.backend == 'sqlite':
+            self.cursor.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+                f"ON {table} ({', '.join(columns)})"
+            )
+        else:
+            kind = 'FULLTEXT INDEX' if fulltext else 'UNIQUE INDEX' if unique else 'INDEX'
+            self._alter(f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(columns)}), "
+                        f"ALGORITHM=INPLACE, LOCK={'SHARED' if fulltext else 'NONE'}")
+        logger.info(f"Created index {name} on {table} in {time.perf_counter() - started:.1f}s")
+        return True
+
+
+class MigrationRunner:
+    """Applies the numbered files in database/migrations and records them in schema_version
+
+    On SQLite each migration runs in one IMMEDIATE transaction together
+    with its schema_version row. MySQL commits DDL implicitly, so there the
+    runner holds a named lock for the whole run and relies on the
+    SchemaEditor helpers being safe to repeat if a migration fails halfway.
+    """
+
+    def __init__(self, db, directory: str = MIGRATIONS_DIR, lock_wait_timeout: int = 10):
+        self.db = db
+        self.directory = directory
+        self.lock_wait_timeout = lock_wait_timeout
+
+    def available(self) -> List[Migration]:
+        migrations = []
+        for filename in sorted(os.listdir(self.directory)):
+            match = _FILE_RE.match(filename)
+            if match:
+                migrations.append(Migration(int(match.group(1)), match.group(2),
+                                            os.path.join(self.directory, filename)))
+        return migrations
+
+    def _applied(self, cursor) -> Dict[int, Dict[str, Any]]:
+        cursor.execute(VERSION_TABLE[self.db.backend])
+        cursor.execute("SELECT version, name, applied_at, duration_ms FROM schema_version ORDER BY version")
+        return {row['version']: row for row in cursor.fetchall()}
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Every known migration with when it was applied (None if pending)"""
+        with self.db.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                applied = self._applied(cursor)
+                connection.commit()
+            finally:
+                cursor.close()
+        return [
+            {
+                'version': migration.version,
+                'name': migration.name,
+                'applied_at': applied.get(migration.version, {}).get('applied_at'),
+                'duration_ms': applied.get(migration.version, {}).get('duration_ms')
+            }
+            for migration in self.available()
+        ]
+
+    def _apply(self, connection, cursor, migration: Migration) -> bool:
+        sqlite = self.db.backend == 'sqlite'
+        started = time.perf_counter()
+        try:
+            if sqlite:
+                connection.start_transaction()
+                cursor.execute("SELECT 1 FROM schema_version WHERE version = %s", (migration.version,))
+                if cursor.fetchall():
+                    connection.rollback()
+                    return False
+            logger.info(f"Applying migration {migration.version:04d}: {migration.description}")
+            migration.upgrade(SchemaEditor(cursor, self.db.backend))
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (%s, %s, %s, %s)",
+                (migration.version, migration.name, datetime.now(), duration_ms)
+            )
+            connection.commit()
+        except Error:
+            connection.rollback()
+            logger.error(f"Migration {migration.version:04d} ({migration.name}) failed")
+            raise
+        logger.info(f"Applied migration {migration.version:04d} in {duration_ms} ms")
+        return True
+
+    def migrate(self, target: Optional[int] = None) -> List[int]:
+        """Apply pending migrations up to ``target`` (all if None); returns the versions applied"""
+        done = []
+        with self.db.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            locked = False
+            try:
+                if self.db.backend == 'mysql':
+                    cursor.execute("SELECT GET_LOCK(%s, 60) AS locked", (LOCK_NAME,))
+                    locked = bool(cursor.fetchall()[0]['locked'])
+                    if not locked:
+                        raise RuntimeError("Another process is applying migrations")
+                    cursor.execute(f"SET SESSION lock_wait_timeout = {int(self.lock_wait_timeout)}")
+
+                applied = self._applied(cursor)
+                connection.commit()
+                for migration in self.available():
+                    if migration.version in applied or (target is not None and migration.version > target):
+                        continue
+                    if self._apply(connection, cursor, migration):
+                        done.append(migration.version)
+            finally:
+                if locked:
+                    cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (LOCK_NAME,))
+                    cursor.fetchall()
+                cursor.close()
+        if not done:
+            logger.info("Schema is up to date")
+        return done
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """python -m utils.migrations [status|migrate [version]]"""
+    from .database import Database
+
+    logging.basicConfig(level=logging.INFO)
+    args = argv if argv is not None else sys.argv[1:]
+    command = args[0] if args else 'migrate'
+    runner = Database().get_migrations()
+    if command == 'status':
+        for row in runner.status():
+            state = f"applied {row['applied_at']} ({row['duration_ms']} ms)" if row['applied_at'] else "pending"
+            print(f"{row['version']:04d} {row['name']:<30} {state}")
+    elif command == 'migrate':
+        applied = runner.migrate(int(args[1]) if len(args) > 1 else None)
+        print(f"Applied {len(applied)} migration(s)")
+    else:
+        print(f"Unknown command {command!r}; use status or migrate")
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import time
+import threading
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .rows import Product
+
+logger = logging.getLogger(__name__)
+
+# Changes younger than this are read again on the next poll, in case a
+# lower version commits after a higher one was already seen
+SETTLE_SECONDS = 5
+# A poll that finds more changes than this resets the caches instead
+MAX_CHANGES = 2000
+# How often the feed deletes changes older than the retention period
+PRUNE_INTERVAL = 600
+
+
+class ProductChangeFeed:
+    """Follows the product_changes table so every lane sees stock and price edits
+
+    Triggers on products append a row with an increasing version for each
+    insert, delete and change of a watched column, whichever lane or tool
+    made it. A background thread fetches the rows after the last version
+    it has seen, re-reads just those products and hands them to
+    ``on_change`` as {product_id: product, or None if no longer active}.
+    Views follow along through ``since()``, which only reads an in-memory
+    journal and so is safe to call from the Tk thread.
+
+    If the feed falls too far behind (more than MAX_CHANGES pending, or
+    offline for longer than the retention period) ``on_reset`` is called
+    instead so the caches reload from scratch.
+    """
+
+    def __init__(self, db, on_change: Callable[[Dict[int, Optional[Dict[str, Any]]]], None],
+                 on_reset: Callable[[], None], poll_interval: float = 2.0,
+                 retention_hours: float = 24.0, journal_size: int = 5000):
+        self.db = db
+        self._on_change = on_change
+        self._on_reset = on_reset
+        self.poll_interval = poll_interval
+        self.retention_s = retention_hours * 3600
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watermark: Optional[int] = None
+        self._pending: Set[int] = set()
+        self._journal: Deque[Tuple[int, int, Optional[Dict[str, Any]]]] = deque(maxlen=journal_size)
+        self._sequence = 0
+        self._floor = 0
+        self._last_ok = 0.0
+        self._last_prune = 0.0
+        # False until the first successful poll and after a failed one
+        self.available = False
+        self.polls = 0
+        self.applied = 0
+        self.resets = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def sequence(self) -> int:
+        """Position of the newest journal entry, to pass to since() later"""
+        with self._lock:
+            return self._sequence
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="product-change-feed", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> bool:
+        """Poll now, e.g. right after this lane wrote a sale; False if the feed is not usable"""
+        self.start()
+        self._wake.set()
+        return self.available
+
+    def stop(self, timeout: float = 2.0):
+        """Stop polling, waiting briefly for a poll in flight so it does not outlive the pool"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _reset(self, watermark: int):
+        self._watermark = watermark
+        self._pending.clear()
+        with self._lock:
+            self._sequence += 1
+            self._floor = self._sequence
+            self._journal.clear()
+        self.resets += 1
+        self._on_reset()
+
+    def _fetch_products(self, product_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        rows = self.db.execute_query(f"""
+            SELECT p.*, c.name as category_name
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE p.id IN ({placeholders})
+        """, tuple(product_ids), row_type=Product) or []
+        changed: Dict[int, Optional[Dict[str, Any]]] = dict.fromkeys(product_ids)
+        for row in rows:
+            if row.is_active:
+                changed[row.id] = row
+        return changed
+
+    def poll(self) -> int:
+        """Apply changes made since the last poll; returns how many products changed"""
+        if self._watermark is None or time.monotonic() - self._last_ok > self.retention_s:
+            # First poll, or offline so long that changes may have been pruned:
+            # start from the newest version and let the caches reload
+            latest = self.db.execute_query("SELECT MAX(version) AS version FROM product_changes")
+            self._reset(latest[0]['version'] or 0)
+            self._last_ok = time.monotonic()
+            return 0
+
+        rows = self.db.execute_query("""
+            SELECT version, product_id,
+                   changed_at < DATE_SUB(NOW(), INTERVAL %s SECOND) AS settled
+            FROM product_changes
+            WHERE version > %s
+            ORDER BY version
+            LIMIT %s
+        """, (SETTLE_SECONDS, self._watermark, MAX_CHANGES + 1)) or []
+        self.polls += 1
+        self._last_ok = time.monotonic()
+
+        if len(rows) > MAX_CHANGES:
+            logger.info(f"More than {MAX_CHANGES} product changes pending, reloading caches")
+            latest = self.db.execute_query("SELECT MAX(version) AS version FROM product_changes")
+            self._reset(latest[0]['version'] or self._watermark)
+            return 0
+
+        product_ids: List[int] = []
+        blocked = False
+        for row in rows:
+            version = row['version']
+            if version not in self._pending and row['product_id'] not in product_ids:
+                product_ids.append(row['product_id'])
+            # Only move the watermark past settled changes; younger ones stay
+            # in _pending so they are not applied twice
+            if not blocked and row['settled']:
+                self._watermark = version
+                self._pending.discard(version)
+            else:
+                blocked = True
+                self._pending.add(version)
+
+        if not product_ids:
+            return 0
+        changed = self._fetch_products(product_ids)
+        self._on_change(changed)
+        with self._lock:
+            for product_id, product in changed.items():
+                if len(self._journal) == self._journal.maxlen:
+                    self._floor = self._journal[0][0]
+                self._sequence += 1
+                self._journal.append((self._sequence, product_id, product))
+        self.applied += len(changed)
+        return len(changed)
+
+    def since(self, sequence: int) -> Tuple[int, Optional[Dict[int, Optional[Dict[str, Any]]]]]:
+        """Products changed after ``sequence``, latest state per product
+
+        Returns the new sequence and {product_id: product or None}, or None
+        instead of the dict if the journal no longer reaches back that far
+        and the caller has to reload everything.
+        """
+        with self._lock:
+            if sequence < self._floor:
+                return self._sequence, None
+            changed = {
+                product_id: product
+                for entry_sequence, product_id, product in self._journal
+                if entry_sequence > sequence
+            }
+            return self._sequence, changed
+
+    def prune(self):
+        """Delete changes older than the retention period"""
+        self.db.execute_query(
+            "DELETE FROM product_changes WHERE changed_at < DATE_SUB(NOW(), INTERVAL %s SECOND)",
+            (int(self.retention_s),)
+        )
+        self._last_prune = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+                    self.prune()
+                self.available = True
+            except Exception as e:
+                if self.last_error != str(e):
+                    logger.warning(f"Product change feed poll failed: {e}")
+                self.last_error = str(e)
+                self.available = False
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sequence, journal = self._sequence, len(self._journal)
+        return {
+            'available': self.available,
+            'watermark': self._watermark,
+            'unsettled': len(self._pending),
+            'sequence': sequence,
+            'journal': journal,
+            'polls': self.polls,
+            'applied': self.applied,
+            'resets': self.resets,
+            'last_error': self.last_error
+        }
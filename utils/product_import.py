@@ -0,0 +1,194 @@
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['name', 'price', 'stock', 'category_id']
+COLUMNS = ['name', 'description', 'price', 'stock', 'category_id', 'min_stock', 'barcode']
+UPDATE_COLUMNS = ['name', 'description', 'price', 'stock', 'category_id', 'min_stock']
+# A re-imported barcode brings a soft-deleted product back into the catalog
+REACTIVATE = "is_active = TRUE"
+
+# Rows read from the file at a time; each chunk is one transaction
+CHUNK_SIZE = 5000
+# Rows per multi-row INSERT statement
+BATCH_SIZE = 500
+# products.max_stock default, which min_stock may not exceed
+DEFAULT_MAX_STOCK = 1000
+
+
+def _upsert_clause(backend: str) -> str:
+    """Barcode conflict handling in the dialect of the active backend"""
+    if backend == 'sqlite':
+        assignments = ", ".join([f"{column} = excluded.{column}" for column in UPDATE_COLUMNS]
+                                + [REACTIVATE])
+        return f"ON CONFLICT(barcode) DO UPDATE SET {assignments}"
+    assignments = ", ".join([f"{column} = VALUES({column})" for column in UPDATE_COLUMNS]
+                            + [REACTIVATE])
+    return f"ON DUPLICATE KEY UPDATE {assignments}"
+
+
+class ProductImporter:
+    """Bulk CSV import of products, upserting by barcode
+
+    The file is read in chunks of ``chunk_size`` rows. Each chunk is
+    validated column-wise with pandas and written in one transaction as
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE statements of
+    ``batch_size`` rows, so a large supplier list costs a handful of
+    commits instead of one connection borrow and commit per row. Rows with
+    a barcode that already exists update that product and reactivate it if
+    it had been deleted (if a barcode appears more than once in the file,
+    the last row wins); rows without a barcode are always inserted.
+    Invalid rows are skipped and reported with their line number and
+    reason.
+    """
+
+    def __init__(self, db, chunk_size: int = CHUNK_SIZE, batch_size: int = BATCH_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._upsert = _upsert_clause(db.backend)
+
+    @staticmethod
+    def _insert_sql(rows: int = 1) -> str:
+        values = ", ".join(["(" + ", ".join(["%s"] * len(COLUMNS)) + ")"] * rows)
+        return f"INSERT INTO products ({', '.join(COLUMNS)}) VALUES {values}"
+
+    def _category_ids(self) -> Set[int]:
+        rows = self.db.execute_query("SELECT id FROM categories") or []
+        return {row['id'] for row in rows}
+
+    def validate(self, chunk: pd.DataFrame, first_line: int,
+                 category_ids: Set[int]) -> Tuple[List[Tuple[Any, ...]], List[Dict[str, Any]]]:
+        """Split a chunk into insertable value tuples and rejected rows"""
+        frame = pd.DataFrame(index=chunk.index)
+        frame['name'] = chunk['name'].astype('string').str.strip()
+        frame['description'] = (chunk['description'].astype('string').str.strip()
+                                if 'description' in chunk else pd.NA)
+        frame['price'] = pd.to_numeric(chunk['price'], errors='coerce').round(2)
+        frame['stock'] = pd.to_numeric(chunk['stock'], errors='coerce')
+        frame['category_id'] = pd.to_numeric(chunk['category_id'], errors='coerce')
+        frame['min_stock'] = (pd.to_numeric(chunk['min_stock'], errors='coerce')
+                              if 'min_stock' in chunk else 10)
+        if 'barcode' in chunk:
+            barcodes = chunk['barcode'].astype('string').str.strip()
+            # Spreadsheets turn 13 digit barcodes into floats ("5449000000996.0")
+            frame['barcode'] = barcodes.str.replace(r"\.0$", "", regex=True).replace("", pd.NA)
+        else:
+            frame['barcode'] = pd.NA
+
+        checks = [
+            (frame['name'].isna() | (frame['name'].str.len() == 0), "missing name"),
+            (frame['name'].str.len() > 100, "name longer than 100 characters"),
+            (frame['price'].isna() | (frame['price'] < 0), "price must be a number >= 0"),
+            (frame['stock'].isna() | (frame['stock'] < 0) | (frame['stock'] % 1 != 0),
+             "stock must be a whole number >= 0"),
+            (~frame['category_id'].isin(category_ids), "unknown category_id"),
+            (frame['min_stock'].isna() | (frame['min_stock'] < 0) | (frame['min_stock'] % 1 != 0)
+             | (frame['min_stock'] > DEFAULT_MAX_STOCK),
+             f"min_stock must be a whole number between 0 and {DEFAULT_MAX_STOCK}"),
+            (frame['barcode'].str.len() > 50, "barcode longer than 50 characters")
+        ]
+        reasons = pd.Series(pd.NA, index=frame.index, dtype='object')
+        for failed, reason in checks:
+            failed = failed.fillna(False).astype(bool)
+            reasons = reasons.mask(failed & reasons.isna(), reason)
+
+        # CSV line numbers: header is line 1
+        line_numbers = first_line + pd.RangeIndex(len(chunk))
+        rejected = [
+            {'line': int(line), 'name': name if pd.notna(name) else None, 'reason': reason}
+            for line, name, reason in zip(line_numbers[reasons.notna().to_numpy()],
+                                          frame['name'][reasons.notna()], reasons.dropna())
+        ]
+
+        valid = frame[reasons.isna()].astype({'stock': 'int64', 'category_id': 'int64',
+                                              'min_stock': 'int64'})
+        valid = valid.astype(object).where(valid.notna(), None)
+        return list(valid[COLUMNS].itertuples(index=False, name=None)), rejected
+
+    def _write_batch(self, cursor, rows: List[Tuple[Any, ...]],
+                     rejected: List[Dict[str, Any]]) -> int:
+        """Write one batch; on failure retry its rows one by one so only the bad ones are lost"""
+        keyed = [row for row in rows if row[-1] is not None]
+        plain = [row for row in rows if row[-1] is None]
+        cursor.execute("SAVEPOINT product_import")
+        try:
+            if keyed:
+                cursor.execute(
+                    f"{self._insert_sql(len(keyed))} {self._upsert}",
+                    [value for row in keyed for value in row]
+                )
+            if plain:
+                cursor.execute(self._insert_sql(len(plain)),
+                               [value for row in plain for value in row])
+            return len(rows)
+        except Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT product_import")
+            logger.warning(f"Batch of {len(rows)} products failed ({e}), retrying row by row")
+
+        written = 0
+        for row in rows:
+            cursor.execute("SAVEPOINT product_import")
+            try:
+                query = self._insert_sql()
+                cursor.execute(f"{query} {self._upsert}" if row[-1] is not None else query, row)
+                written += 1
+            except Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT product_import")
+                rejected.append({'line': None, 'name': row[0], 'reason': str(e)})
+        return written
+
+    def run(self, path: str,
+            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Import a CSV file and return a report of what was written and rejected"""
+        started = time.perf_counter()
+        header = pd.read_csv(path, nrows=0)
+        missing = [column for column in REQUIRED_COLUMNS if column not in header.columns]
+        if missing:
+            raise ValueError(f"CSV must contain columns: {', '.join(REQUIRED_COLUMNS)} "
+                             f"(missing {', '.join(missing)})")
+
+        category_ids = self._category_ids()
+        report: Dict[str, Any] = {'rows_read': 0, 'imported': 0, 'rejected': [], 'transactions': 0}
+        reader = pd.read_csv(path, chunksize=self.chunk_size, dtype={'barcode': str},
+                             skipinitialspace=True)
+
+        for chunk in reader:
+            first_line = report['rows_read'] + 2
+            report['rows_read'] += len(chunk)
+            rows, rejected = self.validate(chunk, first_line, category_ids)
+            report['rejected'].extend(rejected)
+            if not rows:
+                continue
+
+            with self.db.get_connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    connection.start_transaction()
+                    for start in range(0, len(rows), self.batch_size):
+                        report['imported'] += self._write_batch(
+                            cursor, rows[start:start + self.batch_size], report['rejected']
+                        )
+                    connection.commit()
+                    report['transactions'] += 1
+                except Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+
+            if progress:
+                progress(dict(report, elapsed_s=time.perf_counter() - started))
+
+        elapsed = time.perf_counter() - started
+        report['elapsed_s'] = round(elapsed, 3)
+        report['rows_per_s'] = round(report['rows_read'] / elapsed, 1) if elapsed else 0.0
+        logger.info(f"Imported {report['imported']} of {report['rows_read']} products from {path} "
+                    f"in {elapsed:.2f}s ({report['rows_per_s']} rows/s), "
+                    f"{len(report['rejected'])} rejected")
+        return report
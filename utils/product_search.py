@@ -0,0 +1,310 @@
+import re
+import heapq
+import bisect
+import threading
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# Candidate sets up to this size are scored individually; larger ones are
+# ranked in tiers (barcode, name, other fields) ordered by product name
+FULL_RANK_LIMIT = 300
+
+# Share of the query's trigrams a product must contain to match when no
+# product contains all of them (tolerates a typo or two)
+FUZZY_MIN_MATCH = 0.6
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text: Any) -> str:
+    """Lowercase and collapse text to space separated words"""
+    if text is None:
+        return ""
+    return " ".join(_WORD_RE.findall(str(text).lower()))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of every word, padded so word starts produce their own grams
+
+    "cola" gives {"  c", " co", "col", "ola"}, so a one or two character
+    query still has a gram ("  c", " co") to look up.
+    """
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f"  {word}"
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def query_trigrams(text: str) -> Set[str]:
+    """Trigrams of a search query
+
+    Words of three or more characters match anywhere inside an indexed
+    word, like the LIKE '%term%' search they replace; shorter words can
+    only be looked up through their padded grams, so they match word starts.
+    """
+    grams: Set[str] = set()
+    for word in text.split():
+        if len(word) < 3:
+            grams.add(f"  {word}"[-3:])
+        else:
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class ProductSearchIndex:
+    """In-memory trigram index over product name, barcode, category and description
+
+    The index is built once from the full product list and then patched one
+    product at a time as products change, so it never needs a full rebuild
+    after the first load. A search intersects the posting sets of the query
+    trigrams (falling back to partial overlap for misspelled queries) and
+    ranks the candidates by where the query occurs. Only product ids are
+    returned; callers resolve them against the catalog so stock and price
+    are always current.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+        self._building = False
+        self._generation = 0
+        self._clear()
+        self.searches = 0
+        self.fallbacks = 0
+        self.updates = 0
+        self._latency = LatencyRecorder()
+
+    def _clear(self):
+        self._postings: Dict[str, Set[int]] = {}       # all fields
+        self._name_postings: Dict[str, Set[int]] = {}  # name only, for ranking
+        self._docs: Dict[int, Tuple[str, str, str, str]] = {}
+        self._names: Dict[int, str] = {}
+        self._barcodes: Dict[str, int] = {}
+        self._order: List[Tuple[str, int]] = []        # (name, id), sorted
+        self._order_ids: List[int] = []                # ids in the same order
+        self.max_id = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every product change, used to discard stale builds"""
+        return self._generation
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def start_build(self) -> bool:
+        """Claim the right to build the index; False if built or being built"""
+        with self._lock:
+            if self._ready or self._building:
+                return False
+            self._building = True
+            return True
+
+    @staticmethod
+    def _document(product: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        return (
+            normalize(product.get('name')),
+            normalize(product.get('barcode')),
+            normalize(product.get('category_name')),
+            normalize(product.get('description'))
+        )
+
+    def _add_locked(self, product_id: int, doc: Tuple[str, str, str, str]):
+        name, barcode = doc[0], doc[1]
+        self._docs[product_id] = doc
+        self._names[product_id] = name
+        for gram in trigrams(" ".join(doc)):
+            self._postings.setdefault(gram, set()).add(product_id)
+        for gram in trigrams(name):
+            self._name_postings.setdefault(gram, set()).add(product_id)
+        if barcode:
+            self._barcodes[barcode] = product_id
+        self.max_id = max(self.max_id, product_id)
+
+    def _remove_locked(self, product_id: int):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        del self._names[product_id]
+        name, barcode = doc[0], doc[1]
+        for postings, grams in ((self._postings, trigrams(" ".join(doc))),
+                                (self._name_postings, trigrams(name))):
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(product_id)
+                    if not ids:
+                        del postings[gram]
+        if barcode and self._barcodes.get(barcode) == product_id:
+            del self._barcodes[barcode]
+        position = bisect.bisect_left(self._order, (name, product_id))
+        if position < len(self._order) and self._order[position] == (name, product_id):
+            del self._order[position]
+            del self._order_ids[position]
+
+    def finish_build(self, products: Iterable[Dict[str, Any]], generation: int) -> bool:
+        """Index the full product list unless a product changed while it was queried"""
+        fresh = ProductSearchIndex()
+        for product in products:
+            fresh._add_locked(product['id'], self._document(product))
+        fresh._order = sorted((doc[0], product_id) for product_id, doc in fresh._docs.items())
+        fresh._order_ids = [product_id for _, product_id in fresh._order]
+
+        with self._lock:
+            self._building = False
+            if generation != self._generation:
+                return False
+            self._postings = fresh._postings
+            self._name_postings = fresh._name_postings
+            self._docs = fresh._docs
+            self._names = fresh._names
+            self._barcodes = fresh._barcodes
+            self._order = fresh._order
+            self._order_ids = fresh._order_ids
+            self.max_id = fresh.max_id
+            self._ready = True
+        logger.info(f"Product search index built: {len(fresh._docs)} products, "
+                    f"{len(fresh._postings)} trigrams")
+        return True
+
+    def abort_build(self):
+        """Release the build claim after the product list could not be loaded"""
+        with self._lock:
+            self._building = False
+
+    def upsert(self, product: Dict[str, Any]):
+        """Add or re-index one product"""
+        doc = self._document(product)
+        with self._lock:
+            self._generation += 1
+            if not self._ready:
+                return
+            product_id = product['id']
+            self._remove_locked(product_id)
+            self._add_locked(product_id, doc)
+            position = bisect.bisect_left(self._order, (doc[0], product_id))
+            self._order.insert(position, (doc[0], product_id))
+            self._order_ids.insert(position, product_id)
+            self.updates += 1
+
+    def remove(self, product_id: int):
+        """Drop a deleted or deactivated product from the index"""
+        with self._lock:
+            self._generation += 1
+            if self._ready:
+                self._remove_locked(product_id)
+                self.updates += 1
+
+    def mark_changed(self):
+        """Note a change the caller could not apply, so an in-flight build is discarded"""
+        with self._lock:
+            self._generation += 1
+
+    def reset(self):
+        """Forget the index; the next search rebuilds it"""
+        with self._lock:
+            self._generation += 1
+            self._ready = False
+            self._clear()
+
+    def _score(self, product_id: int, query: str, overlap: float) -> float:
+        name, barcode, category, description = self._docs[product_id]
+        score = overlap * 10
+        if barcode and barcode == query:
+            score += 100
+        if name.startswith(query):
+            score += 30
+        elif query in name:
+            score += 20
+        if query in category:
+            score += 8
+        if query in description:
+            score += 4
+        return score
+
+    def _by_name(self, ids: Set[int], limit: int) -> List[int]:
+        """Up to limit ids from the set, in product name order"""
+        if not ids or limit <= 0:
+            return []
+        if len(ids) * 8 < len(self._order_ids):
+            # Sparse: sorting the few matches beats scanning the whole order
+            return sorted(heapq.nsmallest(limit, ids, key=self._names.__getitem__),
+                          key=lambda product_id: (self._names[product_id], product_id))
+        return list(islice(filter(ids.__contains__, self._order_ids), limit))
+
+    @staticmethod
+    def _intersect(postings: Dict[str, Set[int]], grams: Set[str]) -> Set[int]:
+        sets = sorted((postings.get(gram, set()) for gram in grams), key=len)
+        if not sets[0]:
+            return set()
+        return set.intersection(*sets)
+
+    def search(self, text: str, limit: int = 200) -> Optional[List[int]]:
+        """Ranked ids of products matching text, or None if the index is not ready"""
+        query = normalize(text)
+        if not self._ready:
+            return None
+        with self._latency.time(), self._lock:
+            self.searches += 1
+            grams = query_trigrams(query)
+            if not grams:
+                return []
+
+            candidates = self._intersect(self._postings, grams)
+            if len(candidates) > FULL_RANK_LIMIT:
+                # Too many to score one by one: exact barcode, then name
+                # matches, then the rest, each tier in name order
+                ranked: List[int] = []
+                exact = self._barcodes.get(query)
+                if exact is not None:
+                    ranked.append(exact)
+                name_matches = self._intersect(self._name_postings, grams)
+                name_matches.discard(exact)
+                ranked += self._by_name(name_matches, limit - len(ranked))
+                if len(ranked) < limit:
+                    rest = candidates - name_matches
+                    rest.discard(exact)
+                    ranked += self._by_name(rest, limit - len(ranked))
+                return ranked
+
+            overlap: Dict[int, float] = dict.fromkeys(candidates, 1.0)
+            if not overlap:
+                # Nothing contains every trigram; accept products that share most of them
+                self.fallbacks += 1
+                counts: Dict[int, int] = {}
+                for gram in grams:
+                    for product_id in self._postings.get(gram, ()):
+                        counts[product_id] = counts.get(product_id, 0) + 1
+                needed = max(1, int(len(grams) * FUZZY_MIN_MATCH + 0.999))
+                overlap = {
+                    product_id: count / len(grams)
+                    for product_id, count in counts.items() if count >= needed
+                }
+
+            return heapq.nsmallest(
+                limit, overlap,
+                key=lambda product_id: (-self._score(product_id, query, overlap[product_id]),
+                                        self._docs[product_id][0], product_id)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        latency = self._latency.snapshot()
+        with self._lock:
+            return {
+                'ready': self._ready,
+                'products': len(self._docs),
+                'trigrams': len(self._postings),
+                'searches': self.searches,
+                'fuzzy_fallbacks': self.fallbacks,
+                'updates': self.updates,
+                'p50_ms': latency['p50_ms'],
+                'p95_ms': latency['p95_ms'],
+                'max_ms': latency['max_ms']
+            }
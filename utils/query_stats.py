@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import logging
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_COMMENT_RE = re.compile(r"(--[^\n]*|/\*.*?\*/)", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_RE = re.compile(r"\bVALUES\s*\([^)]*\)(?:\s*,\s*\([^)]*\))*", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """Normalize a statement so calls that differ only in values group together"""
+    text = _COMMENT_RE.sub(" ", query)
+    text = _STRING_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (...)", text)
+    text = _VALUES_RE.sub("VALUES (...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def redact_params(params) -> str:
+    """Describe parameters by type only so values never reach the log"""
+    if not params:
+        return "[]"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + "}"
+    return "[" + ", ".join(f"<{type(value).__name__}>" for value in params) + "]"
+
+
+class StatementStats:
+    """Counters and latency distribution for one statement fingerprint"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.slow = 0
+        self.latency = LatencyRecorder(window=512)
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float, rows: int, error: bool, slow: bool):
+        self.calls += 1
+        self.rows += max(rows, 0)
+        if error:
+            self.errors += 1
+        if slow:
+            self.slow += 1
+        self.latency.record(seconds)
+        elapsed_ms = seconds * 1000
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[index] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        latency = self.latency.snapshot()
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return {
+            'statement': self.fingerprint,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'slow': self.slow,
+            'total_ms': latency['total_ms'],
+            'mean_ms': latency['mean_ms'],
+            'p50_ms': latency['p50_ms'],
+            'p95_ms': latency['p95_ms'],
+            'p99_ms': latency['p99_ms'],
+            'max_ms': latency['max_ms'],
+            'histogram': dict(zip(labels, self.histogram))
+        }
+
+
+class QueryStats:
+    """Per-fingerprint query statistics with a rotating slow-query log"""
+
+    def __init__(self, slow_threshold_ms: float = 200.0, slow_log_path: Optional[str] = None,
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self._statements: Dict[str, StatementStats] = {}
+        self._slow_logger = self._create_slow_logger(slow_log_path, max_bytes, backup_count)
+
+    @staticmethod
+    def _create_slow_logger(path: Optional[str], max_bytes: int, backup_count: int):
+        slow_logger = logging.getLogger("mart.slow_queries")
+        if path and not slow_logger.handlers:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                              encoding='utf-8')
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                slow_logger.addHandler(handler)
+                slow_logger.setLevel(logging.INFO)
+                slow_logger.propagate = False
+            except OSError as e:
+                logger.warning(f"Slow query log disabled: {e}")
+        return slow_logger
+
+    def record(self, query: str, params, seconds: float, rows: int = 0, error: bool = False):
+        """Account one execution of a statement"""
+        key = fingerprint(query)
+        slow = seconds * 1000 >= self.slow_threshold_ms
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key)
+            stats.add(seconds, rows, error, slow)
+        if slow:
+            self._slow_logger.info(
+                f"{seconds * 1000:.1f}ms rows={rows} error={error} "
+                f"params={redact_params(params)} query={key}"
+            )
+
+    def top_statements(self, n: int = 10, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """The n statements with the highest value of order_by (total_ms, calls, p95_ms, ...)"""
+        with self._lock:
+            snapshot = [stats.as_dict() for stats in self._statements.values()]
+        snapshot.sort(key=lambda row: row.get(order_by, 0), reverse=True)
+        return snapshot[:n]
+
+    def format_top(self, n: int = 10) -> str:
+        """Plain-text table of the top statements by total time"""
+        lines = [f"{'total ms':>10} {'calls':>7} {'p95 ms':>8} {'rows':>9}  statement"]
+        for row in self.top_statements(n):
+            lines.append(
+                f"{row['total_ms']:>10.1f} {row['calls']:>7} {row['p95_ms']:>8.2f} "
+                f"{row['rows']:>9}  {row['statement'][:120]}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
@@ -0,0 +1,162 @@
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Sequence, Tuple
+
+_MISSING = object()
+# Rows refuse attribute assignment; construction goes through object's setter
+_set_field = object.__setattr__
+
+
+def _money(value) -> float:
+    """DECIMAL columns arrive as Decimal (MySQL) or str/float (SQLite)"""
+    return float(value)
+
+
+class Row:
+    """Typed, read-only row with ``__slots__`` that still reads like the dict rows it replaces
+
+    A dict per row costs several hundred bytes and every caller converted
+    price from Decimal again. Subclasses list their columns in
+    ``__slots__`` and the converters to apply in ``CONVERTERS``; the row
+    factory applies them once, as the row is built from the cursor's
+    tuple. ``row['price']``, ``row.get('stock', 0)``, ``dict(row)`` and
+    ``row.price`` all work. Columns the class does not declare (e.g. a
+    sort key like ``relevance``) are left out; columns the query did not
+    select are simply absent, as they would be from a dict.
+
+    Rows are immutable because caches such as ProductCatalog hand the same
+    row to every caller; ``row.copy(stock=3)`` returns a changed copy.
+    """
+
+    __slots__ = ()
+    CONVERTERS: Dict[str, Callable[[Any], Any]] = {}
+    _fields: FrozenSet[str] = frozenset()
+    _factories: Dict[Tuple[str, ...], Callable[[Sequence[Any]], 'Row']] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+        cls._factories = {}
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            if name not in self._fields:
+                raise KeyError(f"{type(self).__name__} has no column {name!r}")
+            _set_field(self, name, value)
+
+    @classmethod
+    def factory(cls, columns: Sequence[str]) -> Callable[[Sequence[Any]], 'Row']:
+        """Build-one-row function for a result set with these column names, cached per column list"""
+        key = tuple(columns)
+        build = cls._factories.get(key)
+        if build is None:
+            fields = [(index, name, cls.CONVERTERS.get(name))
+                      for index, name in enumerate(key) if name in cls._fields]
+            new = object.__new__
+
+            def build(values: Sequence[Any]) -> 'Row':
+                row = new(cls)
+                for index, name, convert in fields:
+                    value = values[index]
+                    if convert is not None and value is not None:
+                        value = convert(value)
+                    _set_field(row, name, value)
+                return row
+
+            cls._factories[key] = build
+        return build
+
+    @classmethod
+    def from_cursor(cls, cursor, rows: List[Sequence[Any]]) -> List['Row']:
+        """Convert tuple rows fetched from ``cursor``"""
+        build = cls.factory([column[0] for column in cursor.description or ()])
+        return [build(values) for values in rows]
+
+    # Mapping interface, so code written against dict rows keeps working
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._fields:
+            return getattr(self, key, default)
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields and hasattr(self, key)
+
+    def keys(self) -> List[str]:
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def values(self) -> List[Any]:
+        return [self[name] for name in self.keys()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, self[name]) for name in self.keys()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __bool__(self) -> bool:
+        # ``if product:`` should not count the columns; a fetched row always has some
+        return True
+
+    def copy(self, **changes) -> 'Row':
+        """A new row with the same columns, with ``changes`` applied"""
+        row = object.__new__(type(self))
+        for name in self.__slots__:
+            value = changes.pop(name, getattr(self, name, _MISSING))
+            if value is not _MISSING:
+                _set_field(row, name, value)
+        if changes:
+            raise KeyError(f"{type(self).__name__} has no column {next(iter(changes))!r}")
+        return row
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is read-only; use copy() to change it")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is read-only; use copy() to change it")
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Row, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+Mapping.register(Row)
+
+
+class Product(Row):
+    """A products row joined with its category name"""
+
+    __slots__ = ('id', 'name', 'description', 'price', 'stock', 'barcode', 'category_id',
+                 'min_stock', 'max_stock', 'is_active', 'created_at', 'updated_at', 'category_name')
+    CONVERTERS = {'price': _money}
+
+
+class SaleLine(Row):
+    """A sales_details row, optionally with the product name"""
+
+    __slots__ = ('id', 'sale_id', 'product_id', 'quantity', 'price', 'created_at', 'name')
+    CONVERTERS = {'price': _money}
+
+
+class Sale(Row):
+    """A sales row; ``lines`` holds its SaleLines when they were fetched with it"""
+
+    __slots__ = ('id', 'customer_id', 'user_id', 'total_amount', 'payment_method', 'payment_status',
+                 'notes', 'idempotency_key', 'created_at', 'lines')
+    CONVERTERS = {'total_amount': _money}
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+SENT = 'sent'
+REJECTED = 'rejected'
+REVIEWED = 'reviewed'
+
+
+def new_idempotency_key() -> str:
+    """Key that identifies one checkout across retries and replays"""
+    return uuid.uuid4().hex
+
+
+class SaleOutbox:
+    """Durable local queue of sales that could not be written to the server
+
+    Sales are stored in a small SQLite file with synchronous=FULL, so an
+    enqueue is on disk before the lane moves on even if the PC loses power.
+    Every entry carries the idempotency key that is also written to
+    sales.idempotency_key, which makes replaying an entry safe even if an
+    earlier attempt reached the server.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sale_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                sale_id INTEGER,
+                created_at REAL NOT NULL,
+                sent_at REAL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_status ON sale_outbox(status, id)"
+        )
+
+    def enqueue(self, idempotency_key: str, sale: Dict[str, Any]) -> int:
+        """Persist a sale for later replay; returns its outbox id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO sale_outbox (idempotency_key, payload, created_at) VALUES (?, ?, ?)",
+                (idempotency_key, json.dumps(sale, default=float), time.time())
+            )
+            return cursor.lastrowid
+
+    def pending(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Oldest pending sales first, as dicts with the key and original arguments"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, idempotency_key, payload, attempts FROM sale_outbox "
+                "WHERE status = ? ORDER BY id LIMIT ?",
+                (PENDING, limit)
+            ).fetchall()
+        return [
+            {'id': row[0], 'idempotency_key': row[1], 'sale': json.loads(row[2]), 'attempts': row[3]}
+            for row in rows
+        ]
+
+    def mark_sent(self, results: List[Tuple[str, int]]):
+        """Record the server-side sale id of each replayed key"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE sale_outbox SET status = ?, sale_id = ?, sent_at = ?, attempts = attempts + 1 "
+                "WHERE idempotency_key = ?",
+                [(SENT, sale_id, time.time(), key) for key, sale_id in results]
+            )
+            self._conn.execute("COMMIT")
+
+    def mark_rejected(self, idempotency_key: str, error: str):
+        """Park a sale the server refused for good (e.g. invalid product) for manual review"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sale_outbox SET status = ?, last_error = ?, attempts = attempts + 1 "
+                "WHERE idempotency_key = ?",
+                (REJECTED, error, idempotency_key)
+            )
+
+    def mark_reviewed(self, keys: List[str]):
+        """Clear rejected sales from review once a manager has dealt with them"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE sale_outbox SET status = ? WHERE idempotency_key = ? AND status = ?",
+                [(REVIEWED, key, REJECTED) for key in keys]
+            )
+
+    def mark_failed(self, keys: List[str], error: str):
+        """Count a failed delivery attempt; the sales stay pending"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE sale_outbox SET attempts = attempts + 1, last_error = ? WHERE idempotency_key = ?",
+                [(error, key) for key in keys]
+            )
+
+    def purge_sent(self, older_than_s: float = 7 * 86400) -> int:
+        """Delete delivered entries once they are old enough to be of no use"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sale_outbox WHERE status = ? AND sent_at < ?",
+                (SENT, time.time() - older_than_s)
+            )
+            return cursor.rowcount
+
+    def rejected(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, payload, last_error, created_at FROM sale_outbox "
+                "WHERE status = ? ORDER BY id",
+                (REJECTED,)
+            ).fetchall()
+        return [
+            {'idempotency_key': row[0], 'sale': json.loads(row[1]), 'error': row[2], 'created_at': row[3]}
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM sale_outbox GROUP BY status"
+            ).fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM sale_outbox WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+        return {
+            'pending': counts.get(PENDING, 0),
+            'sent': counts.get(SENT, 0),
+            'rejected': counts.get(REJECTED, 0),
+            'oldest_pending_age_s': time.time() - oldest if oldest else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxReplayer:
+    """Background thread that drains the outbox to the server in batches
+
+    ``deliver`` receives a batch of pending entries and writes them in one
+    transaction; if it raises, the server is treated as unreachable and
+    the next attempt is delayed with exponential backoff up to
+    ``max_backoff`` seconds. While entries are pending, ``online`` is False
+    so checkouts go straight to the outbox instead of waiting on a server
+    that is known to be down.
+    """
+
+    def __init__(self, outbox: SaleOutbox, deliver: Callable[[List[Dict[str, Any]]], None],
+                 batch_size: int = 50, interval: float = 5.0, max_backoff: float = 60.0):
+        self.outbox = outbox
+        self._deliver = deliver
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.online = outbox.stats()['pending'] == 0
+        self.replayed = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sale-outbox-replayer", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Try to drain now, e.g. right after a sale was queued"""
+        self.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def drain(self) -> int:
+        """Deliver pending sales batch by batch until empty; returns how many were sent"""
+        delivered = 0
+        while not self._stop.is_set():
+            batch = self.outbox.pending(self.batch_size)
+            if not batch:
+                self.online = True
+                break
+            self._deliver(batch)
+            delivered += len(batch)
+        return delivered
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.is_set():
+            try:
+                sent = self.drain()
+                if sent:
+                    self.replayed += sent
+                    logger.info(f"Replayed {sent} queued sale(s)")
+                delay = self.interval
+            except Exception as e:
+                self.online = False
+                self.failures += 1
+                self.last_error = str(e)
+                delay = min(delay * 2, self.max_backoff)
+                logger.warning(f"Sale replay failed, retrying in {delay:.0f}s: {e}")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.outbox.stats(),
+            'online': self.online,
+            'replayed': self.replayed,
+            'replay_failures': self.failures,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,250 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from mysql.connector import errors
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(errors.DatabaseError):
+    """Raised when a sale asks for more than is in stock; ``shortfalls`` lists the lines"""
+
+    def __init__(self, shortfalls: List[Dict[str, Any]]):
+        lines = ", ".join(
+            f"{line['name'] or '#' + str(line['product_id'])} "
+            f"(requested {line['requested']}, available {line['available']})"
+            for line in shortfalls
+        )
+        super().__init__(msg=f"Insufficient stock: {lines}")
+        self.shortfalls = shortfalls
+
+
+# Stock is checked by the decrement itself (UPDATE ... WHERE stock >= q)
+CONDITIONAL = 'conditional'
+# Stock rows are locked and checked with SELECT ... FOR UPDATE first
+LOCKING = 'locking'
+
+
+class SaleWriter:
+    """Writes a sale in a fixed number of statements regardless of basket size
+
+    The sale header is one INSERT, all detail lines go out as a single
+    multi-row INSERT through executemany, and every stock decrement is
+    folded into one CASE-based UPDATE. With ``stock_check='conditional'``
+    (the default) that UPDATE only matches rows that still have enough
+    stock, and fewer affected rows than products means the sale is short;
+    no row is locked before the decrement, so lanes selling the same item
+    hold its lock only for the UPDATE. ``'locking'`` instead checks the
+    basket with one SELECT ... FOR UPDATE up front. Each phase is timed so
+    the cost of a checkout commit can be followed over time.
+    """
+
+    PHASES = ('reserve', 'header', 'details', 'stock', 'commit')
+
+    def __init__(self, stock_check: str = CONDITIONAL):
+        if stock_check not in (CONDITIONAL, LOCKING):
+            raise ValueError(f"Unknown stock_check {stock_check!r}")
+        self.stock_check = stock_check
+        self._timings = {phase: LatencyRecorder() for phase in self.PHASES + ('total',)}
+        self.last_timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.shortfalls = 0
+        self.retries = 0
+        self.deadlocks = 0
+
+    def record_retry(self, deadlock: bool = False):
+        """Count a write that was rolled back on a lock conflict and tried again
+
+        ``deadlock`` tells deadlocks apart from lock wait timeouts.
+        """
+        with self._lock:
+            self.retries += 1
+            self.deadlocks += deadlock
+
+    @staticmethod
+    def aggregate_quantities(items: List[Dict[str, Any]]) -> Dict[int, int]:
+        """Sum quantities per product so repeated cart lines decrement stock once
+
+        Products whose lines add up to nothing are left out: they take no
+        stock, and the conditional UPDATE would not count them as matched.
+        sales_details rejects the non-positive lines themselves.
+        """
+        quantities: Dict[int, int] = {}
+        for item in items:
+            product_id = item['product_id']
+            quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+        return {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+
+    @staticmethod
+    def reserve(cursor, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lock the basket's product rows and return the lines stock cannot cover
+
+        Runs inside the caller's transaction. Rows are locked in id order so
+        two lanes selling overlapping baskets queue instead of deadlocking,
+        and the stock seen here cannot change before the decrement. Each
+        shortfall is a dict with product_id, name, requested, available and
+        shortfall; missing or inactive products count as zero available.
+        """
+        quantities = SaleWriter.aggregate_quantities(items)
+        if not quantities:
+            return []
+        product_ids = sorted(quantities)
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(f"""
+            SELECT id, name, stock, is_active FROM products
+            WHERE id IN ({placeholders})
+            ORDER BY id
+            FOR UPDATE
+        """, tuple(product_ids))
+        rows = {row[0]: row for row in cursor.fetchall()}
+
+        shortfalls = []
+        for product_id, requested in quantities.items():
+            row = rows.get(product_id)
+            available = int(row[2]) if row and row[3] else 0
+            if requested > available:
+                shortfalls.append({
+                    'product_id': product_id,
+                    'name': row[1] if row else None,
+                    'requested': requested,
+                    'available': available,
+                    'shortfall': requested - available
+                })
+        return shortfalls
+
+    @staticmethod
+    def build_stock_update(quantities: Dict[int, int], conditional: bool = False,
+                           clamp: bool = False) -> Tuple[str, tuple]:
+        """Build a single UPDATE that decrements stock for every product in the sale
+
+        With conditional=True a product only matches while it is active and
+        its stock covers the quantity, so the affected row count tells
+        whether every line could be filled. With clamp=True stock is decremented at most down
+        to zero instead.
+        """
+        cases = " ".join("WHEN %s THEN %s" for _ in quantities)
+        placeholders = ", ".join(["%s"] * len(quantities))
+        decrement = f"stock - CASE id {cases} END"
+        if clamp:
+            decrement = f"GREATEST({decrement}, 0)"
+        query = f"""
+            UPDATE products
+            SET stock = {decrement}
+            WHERE id IN ({placeholders})
+        """
+        params: List[Any] = []
+        for product_id, quantity in quantities.items():
+            params.extend([product_id, quantity])
+        params.extend(sorted(quantities))
+        if conditional:
+            query += f" AND is_active = TRUE AND stock >= CASE id {cases} END"
+            for product_id, quantity in quantities.items():
+                params.extend([product_id, quantity])
+        return query, tuple(params)
+
+    def _short(self, shortfalls: List[Dict[str, Any]]) -> InsufficientStockError:
+        with self._lock:
+            self.shortfalls += 1
+        return InsufficientStockError(shortfalls)
+
+    def write(self, connection, user_id: int, items: List[Dict[str, Any]], total: float,
+              customer_id: Optional[int] = None, payment_method: str = 'cash',
+              idempotency_key: Optional[str] = None, commit: bool = True,
+              clamp_stock: bool = False) -> int:
+        """Insert the sale and its lines and commit; returns the new sale id
+
+        The caller owns the connection and is responsible for rolling back
+        if this raises. Stock is checked in the same transaction as the
+        write (see stock_check); if any line is short nothing is written
+        and InsufficientStockError is raised. With an idempotency_key,
+        writing the same sale twice fails on the unique key instead of
+        booking it again. With
+        commit=False the caller commits, e.g. once for a batch of sales.
+        clamp_stock=True books a sale whose goods have already left the
+        store (an offline sale being replayed): stock is not checked and
+        is decremented at most down to zero.
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        cursor = connection.cursor()
+        try:
+            phase_start = time.perf_counter()
+            # With commit=False the caller has already opened the transaction
+            if commit and not connection.in_transaction:
+                connection.start_transaction()
+            if self.stock_check == LOCKING and not clamp_stock:
+                shortfalls = self.reserve(cursor, items)
+                if shortfalls:
+                    raise self._short(shortfalls)
+                timings['reserve'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            if idempotency_key:
+                cursor.execute("""
+                    INSERT INTO sales (user_id, customer_id, total_amount, payment_method, idempotency_key)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (user_id, customer_id, total, payment_method, idempotency_key))
+            else:
+                cursor.execute("""
+                    INSERT INTO sales (user_id, customer_id, total_amount, payment_method)
+                    VALUES (%s, %s, %s, %s)
+                """, (user_id, customer_id, total, payment_method))
+            sale_id = cursor.lastrowid
+            timings['header'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            if items:
+                cursor.executemany("""
+                    INSERT INTO sales_details (sale_id, product_id, quantity, price)
+                    VALUES (%s, %s, %s, %s)
+                """, [
+                    (sale_id, item['product_id'], item['quantity'], item['price'])
+                    for item in items
+                ])
+            timings['details'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            quantities = self.aggregate_quantities(items)
+            if quantities:
+                conditional = self.stock_check == CONDITIONAL and not clamp_stock
+                query, params = self.build_stock_update(quantities, conditional, clamp_stock)
+                if conditional and not commit:
+                    cursor.execute("SAVEPOINT sale_stock")
+                cursor.execute(query, params)
+                if conditional and cursor.rowcount != len(quantities):
+                    # Undo the decrements that did match, then report what is left
+                    if commit:
+                        connection.rollback()
+                    else:
+                        cursor.execute("ROLLBACK TO SAVEPOINT sale_stock")
+                    raise self._short(self.reserve(cursor, items))
+            timings['stock'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            if commit:
+                connection.commit()
+            timings['commit'] = time.perf_counter() - phase_start
+        finally:
+            cursor.close()
+
+        timings['total'] = time.perf_counter() - started
+        for phase, elapsed in timings.items():
+            self._timings[phase].record(elapsed)
+        self.last_timings = {phase: elapsed * 1000 for phase, elapsed in timings.items()}
+        logger.debug(f"Sale {sale_id} written ({len(items)} lines): {self.last_timings}")
+        return sale_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-phase timing summary in milliseconds, plus the last sale's breakdown"""
+        return {
+            'stock_check': self.stock_check,
+            'shortfalls': self.shortfalls,
+            'retries': self.retries,
+            'deadlocks': self.deadlocks,
+            'last_ms': dict(self.last_timings),
+            **{phase: recorder.snapshot() for phase, recorder in self._timings.items()}
+        }
@@ -0,0 +1,372 @@
+import sys
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sales younger than this are left for the next catch-up, so a checkout
+# that is still committing cannot be skipped by the watermark
+SETTLE_SECONDS = 5
+# Sales rolled up per transaction
+BATCH_SIZE = 5000
+# Upper bound for "every sale after the watermark"
+_NO_LIMIT = 2 ** 62
+
+# Per-sale line counts, joined in so sales are not multiplied by their lines
+_SALE_LINES = """
+    LEFT JOIN (
+        SELECT sale_id, COUNT(*) AS num_lines, SUM(quantity) AS total_items
+        FROM sales_details
+        WHERE sale_id > %s AND sale_id <= %s
+        GROUP BY sale_id
+    ) d ON d.sale_id = s.id
+"""
+
+_HOURLY_SELECT = f"""
+    SELECT DATE(s.created_at) AS sale_date, HOUR(s.created_at) AS sale_hour,
+           COUNT(*) AS num_sales, SUM(s.total_amount) AS revenue,
+           COALESCE(SUM(d.num_lines), 0) AS num_lines, COALESCE(SUM(d.total_items), 0) AS total_items
+    FROM sales s
+    {_SALE_LINES}
+    WHERE s.id > %s AND s.id <= %s
+    GROUP BY DATE(s.created_at), HOUR(s.created_at)
+"""
+
+_DAILY_SELECT = f"""
+    SELECT DATE(s.created_at) AS sale_date,
+           COUNT(*) AS num_sales, SUM(s.total_amount) AS revenue,
+           COALESCE(SUM(d.num_lines), 0) AS num_lines, COALESCE(SUM(d.total_items), 0) AS total_items
+    FROM sales s
+    {_SALE_LINES}
+    WHERE s.id > %s AND s.id <= %s
+    GROUP BY DATE(s.created_at)
+"""
+
+_PRODUCT_SELECT = """
+    SELECT DATE(s.created_at) AS sale_date, sd.product_id,
+           SUM(sd.quantity) AS quantity, SUM(sd.quantity * sd.price) AS revenue,
+           COUNT(DISTINCT s.id) AS num_transactions
+    FROM sales s
+    JOIN sales_details sd ON sd.sale_id = s.id
+    WHERE s.id > %s AND s.id <= %s
+    GROUP BY DATE(s.created_at), sd.product_id
+"""
+
+_ROLLUPS = [
+    # (table, select, key columns, summed columns, number of (low, high) pairs)
+    ('sales_rollup_hourly', _HOURLY_SELECT, ('sale_date', 'sale_hour'),
+     ('num_sales', 'revenue', 'num_lines', 'total_items'), 2),
+    ('sales_rollup_daily', _DAILY_SELECT, ('sale_date',),
+     ('num_sales', 'revenue', 'num_lines', 'total_items'), 2),
+    ('product_rollup_daily', _PRODUCT_SELECT, ('sale_date', 'product_id'),
+     ('quantity', 'revenue', 'num_transactions'), 1)
+]
+
+
+def _accumulate_clause(backend: str, keys: Tuple[str, ...], columns: Tuple[str, ...]) -> str:
+    """Add the new totals onto an existing rollup row instead of replacing it"""
+    if backend == 'sqlite':
+        assignments = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns)
+        return f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {assignments}"
+    assignments = ", ".join(f"{column} = {column} + VALUES({column})" for column in columns)
+    return f"ON DUPLICATE KEY UPDATE {assignments}"
+
+
+def _merge(rows: List[Dict[str, Any]], keys: Tuple[str, ...],
+           columns: Tuple[str, ...]) -> Dict[tuple, Dict[str, Any]]:
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        key = tuple(row[k] for k in keys)
+        target = merged.get(key)
+        if target is None:
+            merged[key] = {k: row[k] for k in keys + columns}
+        else:
+            for column in columns:
+                target[column] += row[column]
+    return merged
+
+
+class SalesRollup:
+    """Hourly, daily and per-product-daily sales totals kept in rollup tables
+
+    A catch-up pass folds every sale after the ``rollup_state`` watermark
+    into the three rollup tables with INSERT ... SELECT ... ON DUPLICATE
+    KEY UPDATE and advances the watermark in the same transaction, so a
+    sale is counted exactly once no matter how many lanes run catch-ups.
+    Readers run a catch-up at most every ``min_interval`` seconds and add
+    the few sales after the watermark from the sales table itself, so
+    reports stay current without re-aggregating history.
+    """
+
+    def __init__(self, db, settle_seconds: int = SETTLE_SECONDS, batch_size: int = BATCH_SIZE,
+                 min_interval: float = 2.0):
+        self.db = db
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_catch_up = 0.0
+        self.rolled_up = 0
+        self.catch_ups = 0
+
+    def _roll_batch(self, connection) -> int:
+        """Fold the next batch of settled sales into the rollups; returns sales rolled up"""
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            cursor.execute("SELECT last_sale_id FROM rollup_state WHERE name = 'sales' FOR UPDATE")
+            low = cursor.fetchone()[0]
+
+            # Stop at the first sale that is too recent, even if later ones are older
+            cursor.execute(
+                "SELECT id, created_at >= DATE_SUB(NOW(), INTERVAL %s SECOND) FROM sales "
+                "WHERE id > %s ORDER BY id LIMIT %s",
+                (self.settle_seconds, low, self.batch_size)
+            )
+            high = low
+            for sale_id, recent in cursor.fetchall():
+                if recent:
+                    break
+                high = sale_id
+            if high == low:
+                connection.rollback()
+                return 0
+
+            for table, select, keys, columns, pairs in _ROLLUPS:
+                names = ", ".join(keys + columns)
+                cursor.execute(
+                    f"INSERT INTO {table} ({names}) {select} "
+                    f"{_accumulate_clause(self.db.backend, keys, columns)}",
+                    (low, high) * pairs
+                )
+            cursor.execute(
+                "UPDATE rollup_state SET last_sale_id = %s WHERE name = 'sales'", (high,)
+            )
+            cursor.execute("SELECT COUNT(*) FROM sales WHERE id > %s AND id <= %s", (low, high))
+            count = cursor.fetchone()[0]
+            connection.commit()
+            return count
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def catch_up(self, force: bool = False) -> int:
+        """Roll up every settled sale after the watermark; returns how many were added"""
+        if not force and time.monotonic() - self._last_catch_up < self.min_interval:
+            return 0
+        if not self._lock.acquire(blocking=force):
+            # Another thread is already catching up
+            return 0
+        try:
+            total = 0
+            with self.db.get_connection() as connection:
+                while True:
+                    rolled = self._roll_batch(connection)
+                    if not rolled:
+                        break
+                    total += rolled
+            self._last_catch_up = time.monotonic()
+            self.rolled_up += total
+            self.catch_ups += 1
+            if total:
+                logger.info(f"Rolled up {total} sale(s)")
+            return total
+        finally:
+            self._lock.release()
+
+    def rebuild(self) -> int:
+        """Recompute every rollup from the sales table, for backfills and repairs"""
+        with self._lock:
+            with self.db.get_connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    connection.start_transaction()
+                    cursor.execute("SELECT last_sale_id FROM rollup_state WHERE name = 'sales' FOR UPDATE")
+                    for table, _, _, _, _ in _ROLLUPS:
+                        cursor.execute(f"DELETE FROM {table}")
+                    cursor.execute("UPDATE rollup_state SET last_sale_id = 0 WHERE name = 'sales'")
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            logger.info("Sales rollups cleared, rebuilding")
+        self._last_catch_up = 0.0
+        return self.catch_up(force=True)
+
+    @contextmanager
+    def _snapshot(self):
+        """Cursor and watermark for reading rollups and the sales after them consistently"""
+        self.catch_up()
+        with self.db.get_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction(consistent_snapshot=True, readonly=True)
+                with self._lock:
+                    cursor.execute("SELECT last_sale_id FROM rollup_state WHERE name = 'sales'")
+                    yield cursor, cursor.fetchone()['last_sale_id']
+            finally:
+                connection.rollback()
+                cursor.close()
+
+    @staticmethod
+    def _collect(view, rollup_query: str, params: tuple, tail_select: str, pairs: int,
+                 keys: Tuple[str, ...], columns: Tuple[str, ...]) -> Dict[tuple, Dict[str, Any]]:
+        """Rollup rows plus the not yet rolled up sales, merged by key"""
+        cursor, watermark = view
+        cursor.execute(rollup_query, params)
+        rows = cursor.fetchall()
+        cursor.execute(tail_select, (watermark, _NO_LIMIT) * pairs)
+        rows += cursor.fetchall()
+        return _merge(rows, keys, columns)
+
+    def _daily(self, view, start: date, end: date) -> List[Dict[str, Any]]:
+        _, select, keys, columns, pairs = _ROLLUPS[1]
+        merged = self._collect(
+            view, "SELECT * FROM sales_rollup_daily WHERE sale_date >= %s AND sale_date <= %s",
+            (start, end), select, pairs, keys, columns
+        )
+        return [
+            {
+                'date': row['sale_date'],
+                'num_sales': int(row['num_sales']),
+                'total_revenue': float(row['revenue'] or 0),
+                'num_items': int(row['num_lines']),
+                'total_items': int(row['total_items'])
+            }
+            for key, row in sorted(merged.items()) if start <= row['sale_date'] <= end
+        ]
+
+    def _products(self, view, start: date, end: date) -> List[Dict[str, Any]]:
+        _, select, _, columns, pairs = _ROLLUPS[2]
+        merged = self._collect(
+            view,
+            "SELECT product_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue, "
+            "SUM(num_transactions) AS num_transactions, NULL AS sale_date "
+            "FROM product_rollup_daily WHERE sale_date >= %s AND sale_date <= %s GROUP BY product_id",
+            (start, end), select, pairs, ('sale_date', 'product_id'), columns
+        )
+        totals: Dict[int, Dict[str, Any]] = {}
+        for (sale_date, product_id), row in merged.items():
+            if sale_date is not None and not start <= sale_date <= end:
+                continue
+            target = totals.setdefault(product_id, {
+                'product_id': product_id, 'total_quantity': 0,
+                'total_revenue': 0.0, 'num_transactions': 0
+            })
+            target['total_quantity'] += int(row['quantity'])
+            target['total_revenue'] += float(row['revenue'] or 0)
+            target['num_transactions'] += int(row['num_transactions'])
+        return list(totals.values())
+
+    def daily(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Per-day totals for start..end inclusive, oldest first"""
+        with self._snapshot() as view:
+            return self._daily(view, start, end)
+
+    def hourly(self, day: date) -> List[Dict[str, Any]]:
+        """Per-hour totals of one day"""
+        _, select, keys, columns, pairs = _ROLLUPS[0]
+        with self._snapshot() as view:
+            merged = self._collect(
+                view, "SELECT * FROM sales_rollup_hourly WHERE sale_date = %s",
+                (day,), select, pairs, keys, columns
+            )
+        return [
+            {
+                'hour': int(row['sale_hour']),
+                'num_sales': int(row['num_sales']),
+                'total_revenue': float(row['revenue'] or 0)
+            }
+            for key, row in sorted(merged.items()) if row['sale_date'] == day
+        ]
+
+    def products(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Per-product totals for start..end inclusive, unordered"""
+        with self._snapshot() as view:
+            return self._products(view, start, end)
+
+    def snapshot(self, trend_start: date, products_start: date, end: date,
+                 settle_seconds: int = SETTLE_SECONDS) -> Dict[str, Any]:
+        """Daily and per-product totals plus which sales they include, read together
+
+        Every sale up to ``last_sale_id`` is included, as are those in
+        ``unsettled_ids``: sales after it that are too young to rule out an
+        older id still committing. Callers that keep their own running
+        totals fetch sales after ``last_sale_id`` and skip the unsettled
+        ones they already have.
+        """
+        with self._snapshot() as view:
+            daily = self._daily(view, trend_start, end)
+            products = self._products(view, products_start, end)
+            cursor = view[0]
+            cursor.execute(
+                "SELECT MIN(id) AS first_recent FROM sales "
+                "WHERE created_at >= DATE_SUB(NOW(), INTERVAL %s SECOND)",
+                (settle_seconds,)
+            )
+            first_recent = cursor.fetchone()['first_recent']
+            if first_recent is None:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) AS last_sale_id FROM sales")
+                last_sale_id = cursor.fetchone()['last_sale_id']
+                unsettled_ids: List[int] = []
+            else:
+                last_sale_id = first_recent - 1
+                cursor.execute("SELECT id FROM sales WHERE id >= %s", (first_recent,))
+                unsettled_ids = [row['id'] for row in cursor.fetchall()]
+        return {'daily': daily, 'products': products,
+                'last_sale_id': last_sale_id, 'unsettled_ids': unsettled_ids}
+
+    def top_products(self, start: date, end: date, limit: int = 5,
+                     by: str = 'quantity') -> List[Dict[str, Any]]:
+        """Best sellers for start..end inclusive, with product names"""
+        sort_key = 'total_revenue' if by == 'revenue' else 'total_quantity'
+        top = sorted(self.products(start, end), key=lambda row: row[sort_key], reverse=True)[:limit]
+        if top:
+            placeholders = ", ".join(["%s"] * len(top))
+            names = {
+                row['id']: row['name']
+                for row in self.db.execute_query(
+                    f"SELECT id, name FROM products WHERE id IN ({placeholders})",
+                    tuple(row['product_id'] for row in top)
+                ) or []
+            }
+            for row in top:
+                row['name'] = names.get(row['product_id'], f"#{row['product_id']}")
+        return top
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rolled_up': self.rolled_up,
+            'catch_ups': self.catch_ups,
+            'seconds_since_catch_up': time.monotonic() - self._last_catch_up if self._last_catch_up else None
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """python -m utils.sales_rollup [catch-up|rebuild]"""
+    from .database import Database
+
+    logging.basicConfig(level=logging.INFO)
+    command = (argv if argv is not None else sys.argv[1:] or ['catch-up'])[0]
+    rollup = Database().get_sales_rollup()
+    if command == 'rebuild':
+        count = rollup.rebuild()
+    elif command == 'catch-up':
+        count = rollup.catch_up(force=True)
+    else:
+        print(f"Unknown command {command!r}; use catch-up or rebuild")
+        return 2
+    print(f"Rolled up {count} sale(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
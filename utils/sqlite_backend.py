@@ -0,0 +1,281 @@
+import os
+import re
+import sqlite3
+import itertools
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+from mysql.connector import errors
+
+logger = logging.getLogger(__name__)
+
+_SHOW_TABLES_RE = re.compile(r"^\s*SHOW\s+TABLES\s+LIKE\s+('[^']*')\s*$", re.I)
+_DATE_MATH_RE = re.compile(
+    r"\bDATE_(SUB|ADD)\(\s*(CURDATE\(\)|NOW\(\)|[\w.]+)\s*,\s*"
+    r"INTERVAL\s+(\d+|%s)\s+(SECOND|MINUTE|HOUR|DAY|WEEK|MONTH|YEAR)\s*\)",
+    re.I
+)
+_CAST_RE = re.compile(r"\bAS\s+(CHAR|SIGNED|UNSIGNED|DECIMAL\(\s*\d+\s*,\s*\d+\s*\))\s*\)", re.I)
+_CAST_TYPES = {'CHAR': 'TEXT', 'SIGNED': 'INTEGER', 'UNSIGNED': 'INTEGER'}
+_DATE_TEXT_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME_TEXT_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+_LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+_UNREACHABLE_MESSAGES = ('unable to open database file', 'disk I/O error')
+# MySQL errnos the SQLite failures are reported under
+ER_LOCK_WAIT_TIMEOUT = 1205
+CR_CONNECTION_ERROR = 2002
+
+_connection_ids = itertools.count(1)
+
+
+def _date_math(match) -> str:
+    direction, base, amount, unit = match.groups()
+    unit = unit.lower()
+    if unit == 'week':
+        unit = 'day'
+        amount = amount if amount == '%s' else str(int(amount) * 7)
+    sign = '-' if direction.upper() == 'SUB' else '+'
+    modifier = f"'{sign}' || %s || ' {unit}'" if amount == '%s' else f"'{sign}{amount} {unit}'"
+    # Whole-day offsets from CURDATE() stay dates, like in MySQL
+    function = 'DATE' if base.upper() == 'CURDATE()' and unit in ('day', 'month', 'year') else 'DATETIME'
+    return f"{function}({base}, {modifier})"
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(query: str) -> Optional[str]:
+    """Rewrite the MySQL dialect used by the application into SQLite
+
+    Returns None for statements that have no SQLite equivalent and can be
+    skipped, such as session SET statements.
+    """
+    stripped = query.strip()
+    if re.match(r"^SET\s", stripped, re.I):
+        return None
+
+    show_tables = _SHOW_TABLES_RE.match(stripped)
+    if show_tables:
+        return f"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE {show_tables.group(1)}"
+
+    text = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", query, flags=re.I)
+    text = _DATE_MATH_RE.sub(_date_math, text)
+    text = re.sub(r"\bCURRENT_TIMESTAMP\b(?!\s*\()", "NOW()", text, flags=re.I)
+    text = _CAST_RE.sub(lambda m: f"AS {_CAST_TYPES.get(m.group(1).upper(), 'REAL')})", text)
+    # Rows are not locked individually; the write transaction serialises writers
+    text = re.sub(r"\bFOR\s+UPDATE\b", "", text, flags=re.I)
+    return text.replace("%s", "?")
+
+
+def _to_python(value: Any) -> Any:
+    """Return temporal text as date/datetime objects, as mysql.connector does"""
+    if isinstance(value, str) and 10 <= len(value) <= 26 and value[4:5] == '-':
+        if _DATETIME_TEXT_RE.match(value):
+            return datetime.fromisoformat(value)
+        if _DATE_TEXT_RE.match(value):
+            return date.fromisoformat(value)
+    return value
+
+
+def _to_sqlite(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _adapt_params(params) -> Sequence[Any]:
+    if not params:
+        return ()
+    return [_to_sqlite(value) for value in params]
+
+
+def _mysql_error(e: sqlite3.Error) -> errors.Error:
+    """Re-raise SQLite failures as the mysql.connector errors callers already catch
+
+    sqlite3 raises OperationalError for nearly everything, from "no such
+    column" to a busy lock. Only a database file that cannot be opened or
+    read stays an OperationalError, with the errno of a refused MySQL
+    connection, so is_connection_error() does not take a bad statement for
+    a lost server. A lock still busy after busy_timeout gets the errno of
+    MySQL's lock wait timeout, everything else is a ProgrammingError.
+    """
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=message)
+    if isinstance(e, sqlite3.OperationalError):
+        if message.startswith(_LOCKED_MESSAGES):
+            return errors.DatabaseError(msg=message, errno=ER_LOCK_WAIT_TIMEOUT)
+        if message.startswith(_UNREACHABLE_MESSAGES):
+            return errors.OperationalError(msg=message, errno=CR_CONNECTION_ERROR)
+        return errors.ProgrammingError(msg=message)
+    if isinstance(e, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+class SQLiteCursor:
+    """mysql.connector style cursor over sqlite3, with dictionary rows on request"""
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._columns: Optional[List[str]] = None
+        self._skipped = False
+
+    def _row(self, row):
+        values = tuple(_to_python(value) for value in row)
+        if self._dictionary:
+            return dict(zip(self._columns, values))
+        return values
+
+    def execute(self, query: str, params=None):
+        sql = translate_sql(query)
+        self._skipped = sql is None
+        if self._skipped:
+            return
+        try:
+            self._cursor.execute(sql, _adapt_params(params))
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self._columns = [column[0] for column in self._cursor.description or ()]
+
+    def executemany(self, query: str, seq_params):
+        sql = translate_sql(query)
+        if sql is None:
+            return
+        try:
+            self._cursor.executemany(sql, [_adapt_params(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def fetchone(self):
+        if self._skipped:
+            return None
+        row = self._cursor.fetchone()
+        return self._row(row) if row is not None else None
+
+    def fetchmany(self, size: int = 1):
+        if self._skipped:
+            return []
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        if self._skipped:
+            return []
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return 0 if self._skipped else self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """The subset of the mysql.connector connection API the application uses"""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self.connection_id = None
+        self.reconnect()
+
+    def reconnect(self, attempts: int = 1, delay: int = 0):
+        if self._conn is not None:
+            self.close()
+        try:
+            # Pooled connections move between worker threads, one borrower at a time
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        conn.create_function("GREATEST", -1, max, deterministic=True)
+        conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+        conn.create_function("NOW", 0, lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        conn.create_function("HOUR", 1, lambda value: int(str(value)[11:13]) if value else None,
+                             deterministic=True)
+        self._conn = conn
+        self.connection_id = next(_connection_ids)
+
+    def cursor(self, dictionary: bool = False, buffered: Optional[bool] = None, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def start_transaction(self, readonly: bool = False, **kwargs):
+        """Begin a write transaction up front so concurrent writers queue on the lock
+
+        Read-only transactions take no lock and read from one snapshot.
+        """
+        if not self._conn.in_transaction:
+            try:
+                self._conn.execute("BEGIN" if readonly else "BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                raise _mysql_error(e) from e
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn is not None and self._conn.in_transaction
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self) -> bool:
+        return self._conn is not None
+
+    def reset_session(self, *args, **kwargs):
+        """Discard any transaction the previous borrower left open"""
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class SQLiteBackend:
+    """Single-file SQLite database standing in for the MySQL server
+
+    Used for lane PCs without a server and for profiling and tests on a
+    laptop. The schema is created by the migrations in database/migrations,
+    like on MySQL.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path, self.busy_timeout)
+
+    def ensure_directory(self):
+        """Create the folder the database file lives in; the file itself is created on connect"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
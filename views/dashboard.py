@@ -1,5 +1,7 @@
 import customtkinter as ctk
 from utils.database import Database
+from utils.async_db import deliver_to_tk
+from utils.dashboard_state import DashboardAggregates
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
@@ -16,6 +18,9 @@ from utils.font_config import configure_fonts
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Dashboard refresh interval; refreshes only fetch sales since the last one
+AUTO_REFRESH_MS = 30000
+
 # Define color scheme with gradients and hover states
 COLORS = {
     'primary': '#2B60DE',      # Royal Blue
@@ -61,6 +66,7 @@ class DashboardView:
     def __init__(self, parent, db: Database):
         self.parent = parent
         self.db = db
+        self.aggregates = DashboardAggregates(db)
         
         # Configure color theme
         ctk.set_appearance_mode("light")
@@ -74,8 +80,14 @@ class DashboardView:
         
         self.create_widgets()
         self.load_data()
-        # Start auto-refresh timer (every 5 minutes)
-        self.parent.after(300000, self.load_data)
+        # Refreshes only fetch new sales, so they can run often
+        self.parent.after(AUTO_REFRESH_MS, self._auto_refresh)
+
+    def _auto_refresh(self):
+        if not self.parent.winfo_exists():
+            return
+        self.load_data(quiet=True)
+        self.parent.after(AUTO_REFRESH_MS, self._auto_refresh)
 
     def load_icons(self):
         # Define icon paths - you'll need to create an 'assets' folder with these icons
@@ -362,7 +374,20 @@ class DashboardView:
             logger.error(f"Failed to create charts: {e}")
             self.show_error_message("Failed to create charts")
 
-    def load_data(self):
+    def load_data(self, quiet: bool = False):
+        """Fetch dashboard data on a worker thread and render it when it arrives"""
+        future = self.db.get_async().submit(self._fetch_data)
+        on_error = (lambda e: logger.error(f"Dashboard refresh failed: {e}")) if quiet else self._on_load_error
+        deliver_to_tk(self.parent, future, self._render_data, on_error)
+
+    def _fetch_data(self) -> Dict[str, Any]:
+        """Advance the in-memory dashboard totals; called off the Tk thread"""
+        return self.aggregates.refresh()
+
+    def _on_load_error(self, error: Exception):
+        messagebox.showerror("Error", f"Failed to load dashboard data: {str(error)}")
+
+    def _render_data(self, data: Dict[str, Any]):
         try:
             # Update timestamp with animation
             if hasattr(self, 'timestamp_label') and self.timestamp_label.winfo_exists():
@@ -378,9 +403,9 @@ class DashboardView:
                         
                 self.parent.after(1000, reset_timestamp_color)
             
-            # Get today's sales summary
-            summary = self.db.get_daily_sales_summary()
-            if summary:
+            # Today's sales summary
+            summary = data['summary']
+            if summary and data['sales_changed']:
                 # Animate value changes
                 self._animate_value_change(
                     self.sales_box,
@@ -391,8 +416,15 @@ class DashboardView:
                     f"${summary['total_revenue'] or 0:,.2f}"
                 )
             
-            # Get low stock items
-            low_stock = self.db.get_low_stock_products()
+            # Update charts with animation
+            if data['sales_changed']:
+                self.update_charts(data['sales_data'], data['product_data'])
+            
+            if not data['low_stock_changed']:
+                return
+            
+            # Low stock items
+            low_stock = data['low_stock']
             self._animate_value_change(
                 self.stock_box,
                 str(len(low_stock))
@@ -435,9 +467,6 @@ class DashboardView:
             self.low_stock_tree.tag_configure('warning', background='#FFF3E5')
             self.low_stock_tree.tag_configure('low', background='#F5F5F5')
             
-            # Update charts with animation
-            self.update_charts()
-            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load dashboard data: {str(e)}")
 
@@ -461,33 +490,12 @@ class DashboardView:
         except Exception as e:
             logger.error(f"Failed to animate value change: {e}")
 
-    def update_charts(self):
+    def update_charts(self, sales_data, product_data):
         try:
             # Clear previous plots
             self.ax1.clear()
             self.ax2.clear()
             
-            # Sales trend for last 7 days
-            query = """
-                SELECT 
-                    DATE(created_at) as date,
-                    COUNT(*) as num_sales,
-                    SUM(total_amount) as total_revenue
-                FROM sales
-                WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                GROUP BY DATE(created_at)
-                ORDER BY date
-            """
-            
-            try:
-                sales_data = self.db.execute_query(query)
-                if not sales_data:
-                    logger.warning("No sales data available for the last 7 days")
-                    sales_data = []
-            except Exception as e:
-                logger.error(f"Failed to fetch sales data: {e}")
-                sales_data = []
-            
             dates = [row['date'].strftime('%Y-%m-%d') for row in sales_data]
             revenues = [float(row['total_revenue'] or 0) for row in sales_data]
             
@@ -569,31 +577,6 @@ class DashboardView:
             plt.setp(self.ax1.xaxis.get_majorticklabels(),
                     rotation=45, ha='right')
             
-            # Top 5 selling products with improved visualization
-            query = """
-                SELECT 
-                    p.name,
-                    SUM(sd.quantity) as total_quantity,
-                    SUM(sd.quantity * p.price) as total_revenue,
-                    COUNT(DISTINCT s.id) as num_transactions
-                FROM sales s
-                JOIN sales_details sd ON s.id = sd.sale_id
-                JOIN products p ON sd.product_id = p.id
-                WHERE s.created_at >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-                GROUP BY p.id, p.name
-                ORDER BY total_quantity DESC
-                LIMIT 5
-            """
-            
-            try:
-                product_data = self.db.execute_query(query)
-                if not product_data:
-                    logger.warning("No product sales data available for the last 30 days")
-                    product_data = []
-            except Exception as e:
-                logger.error(f"Failed to fetch product data: {e}")
-                product_data = []
-            
             if product_data:
                 products = [row['name'] for row in product_data]
                 quantities = [int(row['total_quantity']) for row in product_data]
@@ -2,9 +2,6 @@ import customtkinter as ctk
 from tkinter import messagebox
 from utils.database import Database
 import bcrypt
-import socket
-import platform
-import uuid
 
 class LoginView:
     def __init__(self, parent, db: Database, on_login_success=None):
@@ -94,28 +91,10 @@ class LoginView:
         self.username_entry.bind("<Return>", lambda e: self.login())
         self.password_entry.bind("<Return>", lambda e: self.login())
     
-    def get_device_info(self):
-        """Get device information for login tracking"""
-        return {
-            "os": f"{platform.system()} {platform.release()}",
-            "machine": platform.machine(),
-            "hostname": socket.gethostname(),
-            "device_id": str(uuid.getnode())
-        }
-    
     def record_login_attempt(self, user_id, status):
         """Record login attempt in history"""
         try:
-            device_info = str(self.get_device_info())
-            ip_address = socket.gethostbyname(socket.gethostname())
-            
-            query = """
-                INSERT INTO login_history 
-                (user_id, ip_address, device_info, status)
-                VALUES (%s, %s, %s, %s)
-            """
-            
-            self.db.execute_query(query, (user_id, ip_address, device_info, status))
+            self.db.record_login_attempt(user_id, status)
             
         except Exception as e:
             print(f"Failed to record login attempt: {e}")
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 import pandas as pd
 from tkinter import filedialog
 from utils.database import Database
+from utils.async_db import deliver_to_tk
 from utils.styles import (
     COLORS, FONTS, ICONS,
     apply_frame_style, apply_button_style,
@@ -21,6 +22,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per page as the product list is scrolled
+PRODUCTS_PAGE_SIZE = 100
+
 class ProductsView(ctk.CTkFrame):
     def __init__(self, parent, db: Database):
         super().__init__(parent)
@@ -134,7 +138,9 @@ class ProductsView(ctk.CTkFrame):
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.configure(
+            yscrollcommand=lambda first, last: self._on_tree_scroll(scrollbar, first, last)
+        )
         
         # Pack widgets
         self.tree.pack(side="left", fill="both", expand=True)
@@ -144,13 +150,51 @@ class ProductsView(ctk.CTkFrame):
         self.tree.bind("<Double-1>", self.on_double_click)
 
     def load_products(self):
+        """Start the product list over from its first page"""
         # Clear existing items
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Get products from database
+        # Searches fire on every keystroke; only the latest one gets rendered
+        self._products_request = getattr(self, '_products_request', 0) + 1
         search_term = self.search_var.get()
-        products = self.db.get_products(search_term if search_term else None)
+        self._products_search = search_term if search_term else None
+        self._products_cursor = None
+        self._products_exhausted = False
+        self._products_loading = False
+        
+        self.load_more_products()
+
+    def load_more_products(self):
+        """Fetch the next page of products on a worker thread"""
+        if self._products_loading or self._products_exhausted:
+            return
+        self._products_loading = True
+        request = self._products_request
+        
+        future = self.db.get_async().get_products_page(
+            self._products_search, self._products_cursor, PRODUCTS_PAGE_SIZE
+        )
+        deliver_to_tk(
+            self.tree, future,
+            lambda page: self._append_products(request, page),
+            lambda e: self._on_products_error(request, e)
+        )
+
+    def _on_tree_scroll(self, scrollbar, first, last):
+        """Keep the scrollbar in sync and load the next page near the bottom"""
+        scrollbar.set(first, last)
+        if float(last) >= 0.9:
+            self.load_more_products()
+
+    def _append_products(self, request, page):
+        if request != self._products_request:
+            return
+        
+        products, cursor = page
+        self._products_loading = False
+        self._products_cursor = cursor
+        self._products_exhausted = cursor is None
         
         # Insert products into tree
         for product in products:
@@ -163,6 +207,11 @@ class ProductsView(ctk.CTkFrame):
                 product['min_stock']
             ))
 
+    def _on_products_error(self, request, error):
+        if request == self._products_request:
+            self._products_loading = False
+        self.update_status(f"Failed to load products: {str(error)}", "error")
+
     def show_product_dialog(self, product=None):
         dialog = ProductDialog(self.parent, self.db, product)
         self.parent.wait_window(dialog)
@@ -587,26 +636,37 @@ class ProductsView(ctk.CTkFrame):
         if not filename:
             return
         
-        try:
-            df = pd.read_csv(filename)
-            required_columns = ['name', 'price', 'stock', 'category_id']
-            
-            if not all(col in df.columns for col in required_columns):
-                messagebox.showerror("Error", 
-                    "CSV must contain columns: name, price, stock, category_id")
-                return
-            
-            success_count = 0
-            for _, row in df.iterrows():
-                if self.db.add_product(row.to_dict()):
-                    success_count += 1
-            
-            messagebox.showinfo("Success", 
-                f"Successfully imported {success_count} products")
-            self.load_products()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to import CSV: {str(e)}")
+        if getattr(self, '_importing', False):
+            messagebox.showinfo("Import", "An import is already running")
+            return
+        
+        # Large supplier lists take a while; import on a worker thread
+        self._importing = True
+        future = self.db.get_async().import_products(filename)
+        deliver_to_tk(self.tree, future, self._on_import_done, self._on_import_error)
+
+    def _on_import_done(self, report):
+        self._importing = False
+        message = (
+            f"Imported {report['imported']} of {report['rows_read']} products "
+            f"in {report['elapsed_s']:.1f}s ({report['rows_per_s']:.0f} rows/s)"
+        )
+        rejected = report['rejected']
+        if rejected:
+            message += f"\n\n{len(rejected)} row(s) rejected:"
+            for row in rejected[:10]:
+                line = f"line {row['line']}" if row['line'] else row['name']
+                message += f"\n  {line}: {row['reason']}"
+            if len(rejected) > 10:
+                message += f"\n  ... and {len(rejected) - 10} more"
+            messagebox.showwarning("Import finished", message)
+        else:
+            messagebox.showinfo("Success", message)
+        self.load_products()
+
+    def _on_import_error(self, error):
+        self._importing = False
+        messagebox.showerror("Error", f"Failed to import CSV: {str(error)}")
 
     def export_csv(self):
         filename = filedialog.asksaveasfilename(
@@ -616,9 +676,12 @@ class ProductsView(ctk.CTkFrame):
             return
         
         try:
-            products = self.db.get_products()
-            df = pd.DataFrame(products)
-            df.to_csv(filename, index=False)
+            # Stream in chunks so large catalogs never sit in memory at once
+            header = True
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
+                for chunk in self.db.iter_products():
+                    pd.DataFrame(chunk).to_csv(file, header=header, index=False)
+                    header = False
             messagebox.showinfo("Success", "Products exported successfully")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export CSV: {str(e)}")
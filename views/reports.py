@@ -1,16 +1,20 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox, filedialog
 from utils.database import Database
+from utils.async_db import deliver_to_tk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkcalendar import DateEntry
 from datetime import datetime, timedelta
-import pandas as pd
+from openpyxl import Workbook
 import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per worksheet Excel can open, including the header row
+EXCEL_MAX_ROWS = 1048576
+
 class ReportsView:
     def __init__(self, parent, db: Database):
         self.parent = parent
@@ -116,25 +120,23 @@ class ReportsView:
         return value_label
 
     def load_data(self):
+        """Fetch report data on a worker thread and render it when it arrives"""
+        start_date = self.start_date.get_date()
+        end_date = self.end_date.get_date()
+        
+        future = self.db.get_async().submit(self._fetch_data, start_date, end_date)
+        deliver_to_tk(
+            self.parent, future, self._render_data,
+            lambda e: messagebox.showerror("Error", f"Failed to load data: {str(e)}")
+        )
+
+    def _fetch_data(self, start_date, end_date):
+        """Get the report totals from the sales rollups; called off the Tk thread"""
+        return self.db.get_sales_report(start_date, end_date)
+
+    def _render_data(self, data):
         try:
-            start_date = self.start_date.get_date()
-            end_date = self.end_date.get_date()
-            
-            # Get sales data
-            query = """
-                SELECT 
-                    DATE(s.created_at) as date,
-                    COUNT(DISTINCT s.id) as num_sales,
-                    SUM(s.total_amount) as total_revenue,
-                    COUNT(sd.id) as num_items
-                FROM sales s
-                LEFT JOIN sales_details sd ON s.id = sd.sale_id
-                WHERE DATE(s.created_at) BETWEEN %s AND %s
-                GROUP BY DATE(s.created_at)
-                ORDER BY date
-            """
-            
-            sales_data = self.db.execute_query(query, (start_date, end_date))
+            sales_data, product_data = data
             
             # Update summary
             total_sales = sum(row['num_sales'] for row in sales_data)
@@ -157,12 +159,12 @@ class ReportsView:
                 ))
             
             # Update charts
-            self.update_charts(sales_data)
+            self.update_charts(sales_data, product_data)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load data: {str(e)}")
 
-    def update_charts(self, sales_data):
+    def update_charts(self, sales_data, product_data):
         # Clear previous plots
         self.ax1.clear()
         self.ax2.clear()
@@ -177,25 +179,6 @@ class ReportsView:
         plt.setp(self.ax1.xaxis.get_majorticklabels(), rotation=45)
         
         # Product sales chart
-        query = """
-            SELECT 
-                p.name,
-                SUM(sd.quantity) as total_quantity,
-                SUM(sd.quantity * sd.price) as total_revenue
-            FROM sales s
-            JOIN sales_details sd ON s.id = sd.sale_id
-            JOIN products p ON sd.product_id = p.id
-            WHERE DATE(s.created_at) BETWEEN %s AND %s
-            GROUP BY p.id, p.name
-            ORDER BY total_revenue DESC
-            LIMIT 5
-        """
-        
-        product_data = self.db.execute_query(
-            query, 
-            (self.start_date.get_date(), self.end_date.get_date())
-        )
-        
         products = [row['name'] for row in product_data]
         quantities = [row['total_quantity'] for row in product_data]
         
@@ -209,7 +192,7 @@ class ReportsView:
         self.canvas.draw()
 
     def export_to_excel(self):
-        """Export sales data to Excel with enhanced formatting"""
+        """Export sales data to Excel, streaming rows so memory stays flat"""
         try:
             filename = filedialog.asksaveasfilename(
                 defaultextension=".xlsx",
@@ -219,101 +202,70 @@ class ReportsView:
             if not filename:
                 return
             
-            # Get detailed sales data
-            query = """
-                SELECT 
-                    s.id as sale_id,
-                    s.created_at,
-                    p.name as product_name,
-                    sd.quantity,
-                    sd.price,
-                    (sd.quantity * sd.price) as total,
-                    u.username as sold_by
-                FROM sales s
-                JOIN sales_details sd ON s.id = sd.sale_id
-                JOIN products p ON sd.product_id = p.id
-                JOIN users u ON s.user_id = u.id
-                WHERE DATE(s.created_at) BETWEEN %s AND %s
-                ORDER BY s.created_at
-            """
-            
-            sales_data = self.db.execute_query(
-                query, 
-                (self.start_date.get_date(), self.end_date.get_date())
-            )
-            
-            # Create Excel writer with xlsxwriter engine
-            writer = pd.ExcelWriter(filename, engine='openpyxl')
-            
-            # Sales details sheet
-            df_sales = pd.DataFrame(sales_data)
-            df_sales.to_excel(writer, sheet_name='Sales Details', index=False)
-            
-            # Get workbook and worksheet objects
-            workbook = writer.book
-            worksheet = writer.sheets['Sales Details']
-            
-            # Format datetime columns
-            df_sales['created_at'] = pd.to_datetime(df_sales['created_at'])
-            df_sales['created_at'] = df_sales['created_at'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Format currency columns
-            df_sales['price'] = df_sales['price'].map('${:,.2f}'.format)
-            df_sales['total'] = df_sales['total'].map('${:,.2f}'.format)
+            columns = ['sale_id', 'created_at', 'product_name', 'quantity', 'price', 'total', 'sold_by']
             
-            # Summary sheet
-            summary_data = {
-                'Metric': ['Total Sales', 'Total Revenue', 'Average Sale'],
-                'Value': [
-                    len(set(row['sale_id'] for row in sales_data)),
-                    sum(row['total'] for row in sales_data),
-                    sum(row['total'] for row in sales_data) / 
-                    len(set(row['sale_id'] for row in sales_data))
-                    if sales_data else 0
-                ]
-            }
-            
-            df_summary = pd.DataFrame(summary_data)
-            df_summary.to_excel(writer, sheet_name='Summary', index=False)
-            
-            # Format summary sheet
-            worksheet = writer.sheets['Summary']
-            df_summary.loc[df_summary['Metric'].isin(['Total Revenue', 'Average Sale']), 'Value'] = \
-                df_summary.loc[df_summary['Metric'].isin(['Total Revenue', 'Average Sale']), 'Value'].map('${:,.2f}'.format)
+            # Write-only workbooks flush rows to disk instead of keeping cells in memory
+            workbook = Workbook(write_only=True)
+            details_sheet = None
+            sheet_rows = EXCEL_MAX_ROWS
+            sheet_count = 0
             
-            # Product summary sheet
+            # Lines arrive grouped by sale, so a new sale_id starts a new sale
+            sale_count = 0
+            last_sale_id = None
+            total_revenue = 0
             product_summary = {}
-            for row in sales_data:
-                if row['product_name'] not in product_summary:
-                    product_summary[row['product_name']] = {
-                        'quantity': 0,
-                        'revenue': 0
-                    }
-                product_summary[row['product_name']]['quantity'] += row['quantity']
-                product_summary[row['product_name']]['revenue'] += row['total']
             
-            df_products = pd.DataFrame([
-                {
-                    'Product': product,
-                    'Quantity Sold': data['quantity'],
-                    'Revenue': data['revenue']
-                }
-                for product, data in product_summary.items()
-            ])
+            # Get detailed sales data
+            for chunk in self.db.iter_sales_details(
+                self.start_date.get_date(), self.end_date.get_date()
+            ):
+                for row in chunk:
+                    # Roll over to a new sheet when Excel's row limit is reached
+                    if sheet_rows >= EXCEL_MAX_ROWS:
+                        sheet_count += 1
+                        title = 'Sales Details' if sheet_count == 1 else f'Sales Details ({sheet_count})'
+                        details_sheet = workbook.create_sheet(title)
+                        details_sheet.append(columns)
+                        sheet_rows = 1
+                    
+                    details_sheet.append([row[col] for col in columns])
+                    sheet_rows += 1
+                    
+                    # Fold the row into the summaries as we go
+                    if row['sale_id'] != last_sale_id:
+                        sale_count += 1
+                        last_sale_id = row['sale_id']
+                    total_revenue += row['total']
+                    summary = product_summary.setdefault(
+                        row['product_name'], {'quantity': 0, 'revenue': 0}
+                    )
+                    summary['quantity'] += row['quantity']
+                    summary['revenue'] += row['total']
             
-            # Sort by revenue descending
-            df_products = df_products.sort_values('Revenue', ascending=False)
+            if details_sheet is None:
+                workbook.create_sheet('Sales Details').append(columns)
             
-            # Format revenue column
-            df_products['Revenue'] = df_products['Revenue'].map('${:,.2f}'.format)
+            # Summary sheet
+            summary_sheet = workbook.create_sheet('Summary')
+            summary_sheet.append(['Metric', 'Value'])
+            summary_sheet.append(['Total Sales', sale_count])
+            summary_sheet.append(['Total Revenue', f"${total_revenue:,.2f}"])
+            average_sale = total_revenue / sale_count if sale_count else 0
+            summary_sheet.append(['Average Sale', f"${average_sale:,.2f}"])
             
-            df_products.to_excel(writer, sheet_name='Product Summary', index=False)
+            # Product summary sheet, sorted by revenue descending
+            products_sheet = workbook.create_sheet('Product Summary')
+            products_sheet.append(['Product', 'Quantity Sold', 'Revenue'])
+            for product, data in sorted(product_summary.items(),
+                                        key=lambda item: item[1]['revenue'], reverse=True):
+                products_sheet.append([product, data['quantity'], f"${data['revenue']:,.2f}"])
             
             # Save and close
-            writer.close()
+            workbook.save(filename)
             
             messagebox.showinfo("Success", "Report exported successfully")
             
         except Exception as e:
             logger.error(f"Failed to export report: {e}")
-            messagebox.showerror("Error", f"Failed to export report: {str(e)}") 
\ No newline at end of file
+            messagebox.showerror("Error", f"Failed to export report: {str(e)}") 
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from utils.database import Database
+from utils.database import Database, InsufficientStockError
+from utils.async_db import deliver_to_tk
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from datetime import datetime
@@ -71,6 +72,11 @@ class SalesView(ctk.CTkFrame):
         # Start animations
         self.start_animations()
         
+        # Follow stock and price changes made by other lanes
+        self._change_seq = self.db.get_product_changes().sequence
+        self._changes_after_id = self.parent.after(1000, self._poll_product_changes)
+        self._outbox_after_id = self.parent.after(2000, self._poll_outbox_status)
+        
     def __del__(self):
         """Cleanup when object is destroyed"""
         try:
@@ -82,6 +88,12 @@ class SalesView(ctk.CTkFrame):
             if hasattr(self, 'animation_after_id'):
                 self.parent.after_cancel(self.animation_after_id)
             
+            if hasattr(self, '_changes_after_id'):
+                self.parent.after_cancel(self._changes_after_id)
+            
+            if hasattr(self, '_outbox_after_id'):
+                self.parent.after_cancel(self._outbox_after_id)
+            
             # Stop loading animation
             self.loading_animation = False
             if hasattr(self, 'loading_label') and self.loading_label.winfo_exists():
@@ -225,6 +237,18 @@ class SalesView(ctk.CTkFrame):
             )
             self.stats_label.grid(row=2, column=0, sticky="e", padx=10, pady=(0, 10))
             
+            # Offline sales still syncing or refused by the server; click to review
+            self.outbox_label = ctk.CTkLabel(
+                self.header_frame,
+                text="",
+                font=("Segoe UI", 12, "bold"),
+                text_color=COLORS['warning'],
+                cursor="hand2"
+            )
+            self.outbox_label.grid(row=3, column=0, sticky="e", padx=10, pady=(0, 10))
+            self.outbox_label.bind("<Button-1>", lambda e: self.show_rejected_sales())
+            self.outbox_label.grid_remove()
+            
             # Start datetime update
             self.update_datetime()
             
@@ -805,37 +829,50 @@ class SalesView(ctk.CTkFrame):
             self.show_error("Failed to filter products by category")
             
     def load_products(self):
-        """Load and display products with enhanced error handling and empty state handling"""
+        """Load products on a worker thread and display them when they arrive"""
+        # Show loading animation
+        self.loading_animation = True
+        self.loading_label.configure(text="Loading products...")
+        
+        search_term = self.search_var.get().strip() if self.search_var.get() else None
+        category = self.category_var.get()
+        
+        # Only the most recent request gets to render
+        self._products_request = getattr(self, '_products_request', 0) + 1
+        request = self._products_request
+        
+        future = self.db.get_async().submit(self._fetch_products, search_term)
+        deliver_to_tk(
+            self, future,
+            lambda products: self._show_products(request, products, search_term, category),
+            lambda e: self._show_products(request, None, search_term, category, error=e)
+        )
+
+    def _fetch_products(self, search_term):
+        """Get products from the database with retries; called off the Tk thread"""
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                return self.db.get_products_with_optional_search(search_term)
+            except Exception as e:
+                logger.error(f"Product loading attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(0.5)  # Wait before retry
+                    continue
+                raise
+
+    def _show_products(self, request, products, search_term, category, error=None):
+        """Display loaded products with enhanced error handling and empty state handling"""
+        if request != self._products_request:
+            return
+        
         try:
-            # Show loading animation
-            self.loading_animation = True
-            self.loading_label.configure(text="Loading products...")
-            
             # Clear existing items
             for item in self.products_tree.get_children():
                 self.products_tree.delete(item)
             
-            # Get products from database with retry mechanism
-            max_retries = 3
-            products = None
-            last_error = None
-            
-            for attempt in range(max_retries):
-                try:
-                    search_term = self.search_var.get().strip() if self.search_var.get() else None
-                    category = self.category_var.get()
-                    
-                    # Get products with proper error handling
-                    products = self.db.get_products_with_optional_search(search_term)
-                    break  # If we get here, the query was successful
-                        
-                except Exception as e:
-                    last_error = e
-                    logger.error(f"Product loading attempt {attempt + 1} failed: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(0.5)  # Wait before retry
-                        continue
-                    raise
+            if error is not None:
+                raise error
             
             # Initialize empty products list if None
             if products is None:
@@ -867,7 +904,7 @@ class SalesView(ctk.CTkFrame):
                     if "Name" in sort_option:
                         products.sort(key=lambda x: str(x.get('name', '')).lower(), reverse=reverse)
                     elif "Price" in sort_option:
-                        products.sort(key=lambda x: float(x.get('price', 0)), reverse=reverse)
+                        products.sort(key=lambda x: x.get('price') or 0.0, reverse=reverse)
             except Exception as e:
                 logger.error(f"Error sorting products: {e}")
             
@@ -875,39 +912,9 @@ class SalesView(ctk.CTkFrame):
             if products:
                 for product in products:
                     try:
-                        # Ensure all required fields have default values
-                        product_id = product.get('id', 'N/A')
-                        name = product.get('name', 'Unknown Product')
-                        category = product.get('category_name', 'Uncategorized')
-                        
-                        # Handle potential invalid price/stock values
-                        try:
-                            price = float(product.get('price', 0))
-                        except (ValueError, TypeError):
-                            price = 0.0
-                            
-                        try:
-                            stock = int(product.get('stock', 0))
-                        except (ValueError, TypeError):
-                            stock = 0
-                        
-                        # Enhanced stock status indicators with tooltips
-                        if stock > 20:
-                            stock_status = "✅ In Stock"
-                        elif stock > 10:
-                            stock_status = "✅ Limited"
-                        elif stock > 0:
-                            stock_status = "⚠️ Low Stock"
-                        else:
-                            stock_status = "❌ Out of Stock"
-                        
-                        self.products_tree.insert("", "end", values=(
-                            product_id,
-                            f"{name} ({stock_status})",
-                            category,
-                            f"${price:.2f}",
-                            stock
-                        ))
+                        # The product id doubles as the row id so change feed updates can find it
+                        self.products_tree.insert("", "end", iid=str(product.get('id')),
+                                                  values=self._product_row(product))
                     except Exception as e:
                         logger.error(f"Error inserting product {product.get('id', 'unknown')}: {e}")
                         continue
@@ -961,6 +968,69 @@ class SalesView(ctk.CTkFrame):
             self.loading_animation = False
             self.loading_label.configure(text="")
 
+    def _product_row(self, product):
+        """Tree values for one product, with a stock status indicator"""
+        # Ensure all required fields have default values
+        product_id = product.get('id', 'N/A')
+        name = product.get('name', 'Unknown Product')
+        category = product.get('category_name', 'Uncategorized')
+        
+        # Product rows arrive typed (price float, stock int)
+        price = product.get('price') or 0.0
+        stock = product.get('stock') or 0
+        
+        # Enhanced stock status indicators with tooltips
+        if stock > 20:
+            stock_status = "✅ In Stock"
+        elif stock > 10:
+            stock_status = "✅ Limited"
+        elif stock > 0:
+            stock_status = "⚠️ Low Stock"
+        else:
+            stock_status = "❌ Out of Stock"
+        
+        return (
+            product_id,
+            f"{name} ({stock_status})",
+            category,
+            f"${price:.2f}",
+            stock
+        )
+
+    def _poll_product_changes(self):
+        """Apply products changed by any lane to the visible list without reloading it"""
+        try:
+            self._change_seq, changed = self.db.get_product_changes().since(self._change_seq)
+            if changed is None:
+                # Fell behind the change journal
+                self.load_products()
+            elif changed:
+                self._apply_product_changes(changed)
+        except Exception as e:
+            logger.error(f"Failed to apply product changes: {e}")
+        self._changes_after_id = self.parent.after(1000, self._poll_product_changes)
+
+    def _apply_product_changes(self, changed):
+        """Update, drop or add the rows of changed products"""
+        category = self.category_var.get()
+        searching = bool(self.search_var.get().strip())
+        added = False
+        for product_id, product in changed.items():
+            iid = str(product_id)
+            visible = product is not None and (
+                not category or category == "All Categories" or product.get('category_name') == category
+            )
+            if self.products_tree.exists(iid):
+                if visible:
+                    self.products_tree.item(iid, values=self._product_row(product))
+                else:
+                    self.products_tree.delete(iid)
+            elif visible and not searching:
+                added = True
+        if added:
+            # New products have to be placed by the current sort
+            self.load_products()
+
     def update_category_menu(self, categories=None):
         """Update category menu with enhanced error handling"""
         try:
@@ -1008,9 +1078,8 @@ class SalesView(ctk.CTkFrame):
             item = self.products_tree.item(selection[0])
             product_id = item['values'][0]
             
-            # Get fresh product details from database
-            product = next((p for p in self.db.get_products_with_optional_search(None) 
-                          if p['id'] == product_id), None)
+            # Get product details from the catalog cache
+            product = self.db.get_product_by_id(product_id)
             if not product:
                 self.show_error("Product not found or no longer available")
                 return
@@ -1186,6 +1255,21 @@ class SalesView(ctk.CTkFrame):
             self.cart = []
             self.update_cart_display()
 
+    def show_stock_shortfalls(self, shortfalls):
+        """Tell the cashier which cart lines stock cannot cover"""
+        names = {item['id']: item['name'] for item in self.cart}
+        lines = []
+        for line in shortfalls:
+            name = names.get(line['product_id'], line['name'])
+            if line['name'] is None:
+                lines.append(f"{name} is no longer available")
+            else:
+                lines.append(
+                    f"Insufficient stock for {name}. "
+                    f"Requested: {line['requested']}, Available: {line['available']}"
+                )
+        self.show_error("Cannot complete checkout:\n\n" + "\n".join(lines))
+
     def checkout(self):
         """Process checkout with enhanced validation and error handling"""
         if not self.cart:
@@ -1198,23 +1282,17 @@ class SalesView(ctk.CTkFrame):
             tax = subtotal * 0.10
             total = subtotal + tax - self.discount_amount
             
-            # Validate stock availability before proceeding
-            unavailable_items = []
-            for item in self.cart:
-                product = next((p for p in self.db.get_products_with_optional_search(None) 
-                              if p['id'] == item['id']), None)
-                if not product:
-                    unavailable_items.append(f"{item['name']} is no longer available")
-                elif product['stock'] < item['quantity']:
-                    unavailable_items.append(
-                        f"Insufficient stock for {item['name']}. "
-                        f"Requested: {item['quantity']}, Available: {product['stock']}"
-                    )
-            
-            if unavailable_items:
-                self.show_error(
-                    "Cannot complete checkout:\n\n" + "\n".join(unavailable_items)
-                )
+            sale_items = [{
+                'product_id': item['id'],
+                'quantity': item['quantity'],
+                'price': item['price']
+            } for item in self.cart]
+            
+            # Catch obvious shortfalls from the cached catalog without a
+            # round trip; the sale write checks stock again in its transaction
+            shortfalls = self.db.estimate_shortfalls(sale_items)
+            if shortfalls:
+                self.show_stock_shortfalls(shortfalls)
                 return
             
             # Prepare detailed summary with enhanced formatting
@@ -1241,40 +1319,66 @@ class SalesView(ctk.CTkFrame):
             if not messagebox.askyesno("Confirm Checkout", summary):
                 return
             
-            # Process sale with retry mechanism
-            max_retries = 3
-            sale_id = None
+            # Write the sale on a worker thread: lock conflicts are retried
+            # with a backoff that must not freeze the till. If the server
+            # can't be reached the sale is queued locally and replayed later
+            self.loading_animation = True
+            self.loading_label.configure(text="Processing transaction...")
+            self.checkout_btn.configure(state="disabled")
+            future = self.db.get_async().submit(
+                self.db.submit_sale,
+                user_id=1,  # TODO: Get actual user ID
+                items=sale_items,
+                total=total  # already net of the discount
+            )
+            deliver_to_tk(self, future,
+                          lambda result: self._finish_checkout(result, total),
+                          self._checkout_failed)
             
-            for attempt in range(max_retries):
-                try:
-                    # Show processing animation
-                    self.loading_animation = True
-                    self.loading_label.configure(text="Processing transaction...")
-                    
-                    # Process sale
-                    sale_id = self.db.add_sale(
-                        user_id=1,  # TODO: Get actual user ID
-                        items=[{
-                            'product_id': item['id'],
-                            'quantity': item['quantity'],
-                            'price': item['price']
-                        } for item in self.cart],
-                        total=total,
-                        discount=self.discount_amount
-                    )
-                    
-                    if sale_id:
-                        break
-                    
-                except Exception as e:
-                    logger.error(f"Checkout attempt {attempt + 1} failed: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(1)  # Wait before retry
-                    else:
-                        raise
+        except ValueError as e:
+            # Handle validation errors
+            logger.error(f"Checkout validation error: {e}")
+            self.show_error(f"Validation Error: {str(e)}")
+            self._end_checkout()
             
-            if not sale_id:
-                raise ValueError("Failed to process sale after multiple attempts")
+        except Exception as e:
+            # Handle other errors
+            logger.error(f"Checkout failed: {e}")
+            self.show_error(
+                "❌ Checkout failed. Please try again.\n\n"
+                f"Error: {str(e)}"
+            )
+            self._end_checkout()
+
+    def _end_checkout(self):
+        """Stop the loading animation and let the cashier check out again"""
+        self.loading_animation = False
+        self.loading_label.configure(text="")
+        self.checkout_btn.configure(state="normal")
+
+    def _checkout_failed(self, error):
+        """Report a sale write that did not go through; called on the Tk thread"""
+        self._end_checkout()
+        if isinstance(error, InsufficientStockError):
+            # Another lane sold the stock since the catalog last refreshed
+            self.show_stock_shortfalls(error.shortfalls)
+            return
+        logger.error(f"Checkout failed: {error}")
+        self.show_error(
+            "❌ Checkout failed. Please try again.\n\n"
+            f"Error: {str(error)}"
+        )
+
+    def _finish_checkout(self, result, total):
+        """Receipt, recent sales and cart reset once the sale is written; called on the Tk thread"""
+        self._end_checkout()
+        try:
+            if result['status'] == 'queued':
+                sale_id = f"OFFLINE-{result['idempotency_key'][:8].upper()}"
+                logger.warning(f"Sale queued offline as {sale_id}")
+                self.refresh_outbox_status()
+            else:
+                sale_id = result['sale_id']
             
             # Generate receipt
             receipt_path = self.generate_receipt(sale_id)
@@ -1301,7 +1405,7 @@ class SalesView(ctk.CTkFrame):
             self.update_recent_sales()
             self.cart = []
             self.update_cart_display()
-            self.load_products()  # Refresh product list
+            # The product list picks up the new stock from the change feed
             self.update_statistics()
             
             # Clean up saved cart
@@ -1312,29 +1416,21 @@ class SalesView(ctk.CTkFrame):
                     logger.warning(f"Failed to remove saved cart: {e}")
             
             # Show final success message with animation
-            self.show_success(
+            message = (
                 "✨ Transaction completed successfully!\n"
                 f"Sale ID: {sale_id}\n"
                 f"Total Amount: ${total:.2f}"
             )
-            
-        except ValueError as e:
-            # Handle validation errors
-            logger.error(f"Checkout validation error: {e}")
-            self.show_error(f"Validation Error: {str(e)}")
+            if result['status'] == 'queued':
+                message += "\n\n📡 Server offline - the sale will sync automatically"
+            self.show_success(message)
             
         except Exception as e:
-            # Handle other errors
-            logger.error(f"Checkout failed: {e}")
+            logger.error(f"Failed to finish checkout after sale {result.get('sale_id')}: {e}")
             self.show_error(
-                "❌ Checkout failed. Please try again.\n\n"
+                "⚠️ The sale was recorded, but the receipt could not be completed.\n\n"
                 f"Error: {str(e)}"
             )
-            
-        finally:
-            # Always stop loading animation
-            self.loading_animation = False
-            self.loading_label.configure(text="")
 
     def generate_receipt(self, sale_id):
         """Generate a beautiful receipt with custom styling"""
@@ -1535,9 +1631,16 @@ class SalesView(ctk.CTkFrame):
 
     def update_statistics(self):
         """Update daily sales statistics"""
+        # Get today's sales from database without blocking the UI
+        future = self.db.get_async().get_daily_sales()
+        deliver_to_tk(self, future, self._show_statistics, self._show_statistics_error)
+
+    def _show_statistics_error(self, error):
+        logger.error(f"Failed to update statistics: {error}")
+        self.stats_label.configure(text="Today: $0.00 (0 items)")
+
+    def _show_statistics(self, stats):
         try:
-            # Get today's sales from database
-            stats = self.db.get_daily_sales()
             if stats:
                 total_revenue = float(stats['total_revenue'] or 0)
                 total_items = int(stats['total_items'] or 0)
@@ -1552,6 +1655,61 @@ class SalesView(ctk.CTkFrame):
             logger.error(f"Failed to update statistics: {e}")
             self.stats_label.configure(text="Today: $0.00 (0 items)")
 
+    def _poll_outbox_status(self):
+        self.refresh_outbox_status()
+        self._outbox_after_id = self.parent.after(5000, self._poll_outbox_status)
+
+    def refresh_outbox_status(self):
+        """Show offline sales waiting to sync or refused by the server in the header"""
+        future = self.db.get_async().get_sale_outbox_stats()
+        deliver_to_tk(self, future, self._show_outbox_status,
+                      lambda error: logger.error(f"Failed to get offline sale status: {error}"))
+
+    def _show_outbox_status(self, stats):
+        parts = []
+        if stats['pending']:
+            parts.append(f"📡 {stats['pending']} offline sale(s) waiting to sync")
+        if stats['rejected']:
+            parts.append(f"⚠️ {stats['rejected']} offline sale(s) refused - click to review")
+        if not parts:
+            self.outbox_label.grid_remove()
+            return
+        self.outbox_label.configure(
+            text="   ".join(parts),
+            text_color=COLORS['error'] if stats['rejected'] else COLORS['warning']
+        )
+        self.outbox_label.grid()
+
+    def show_rejected_sales(self):
+        """List offline sales the server refused so they can be re-entered, then clear the flag"""
+        try:
+            rejected = self.db.get_rejected_sales()
+        except Exception as e:
+            logger.error(f"Failed to load refused offline sales: {e}")
+            self.show_error("Failed to load refused offline sales")
+            return
+        if not rejected:
+            return
+        
+        lines = []
+        for entry in rejected:
+            sale = entry['sale']
+            when = datetime.fromtimestamp(entry['created_at']).strftime("%Y-%m-%d %H:%M")
+            items = sum(int(item['quantity']) for item in sale['items'])
+            lines.append(
+                f"• {when}  OFFLINE-{entry['idempotency_key'][:8].upper()}  "
+                f"{items} item(s), ${float(sale['total']):.2f}\n   {entry['error']}"
+            )
+        if messagebox.askyesno(
+            "Refused Offline Sales",
+            "These sales were made while the server was offline and could not be "
+            "booked. Re-enter them or correct stock by hand.\n\n"
+            + "\n".join(lines)
+            + "\n\nMark them as reviewed?"
+        ):
+            self.db.dismiss_rejected_sales([entry['idempotency_key'] for entry in rejected])
+            self.refresh_outbox_status()
+
     def setup_hotkeys(self):
         """Setup keyboard shortcuts"""
         if not self.hotkeys_enabled:
@@ -1876,9 +2034,8 @@ class SalesView(ctk.CTkFrame):
             self.barcode_var.set("")
             self.barcode_entry.focus_set()
             
-            # Search for product
-            products = self.db.get_products_with_optional_search(barcode)
-            product = next((p for p in products if p.get('barcode') == barcode), None)
+            # Exact-match barcode lookup
+            product = self.db.get_product_by_barcode(barcode)
             
             if not product:
                 self.show_error(f"Product not found for barcode: {barcode}")
@@ -1895,13 +2052,7 @@ class SalesView(ctk.CTkFrame):
         """Add product to cart by ID with quantity 1"""
         try:
             # Get product details
-            product = self.db.get_products_with_optional_search(None)
-            if not product:
-                self.show_error("Product not found")
-                return
-                
-            # Find the specific product
-            product = next((p for p in product if p['id'] == product_id), None)
+            product = self.db.get_product_by_id(product_id)
             if not product:
                 self.show_error("Product not found")
                 return
@@ -1925,7 +2076,7 @@ class SalesView(ctk.CTkFrame):
                 self.cart.append({
                     'id': product_id,
                     'name': product['name'],
-                    'price': float(product['price']),
+                    'price': product['price'],
                     'quantity': 1,
                     'stock': product['stock']
                 })
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox, filedialog, ttk
 from utils.database import Database
+from utils.async_db import deliver_to_tk
 import bcrypt
 import os
 import subprocess
@@ -11,6 +12,9 @@ import json
 import uuid
 import csv
 
+# Rows fetched per page as the login history table is scrolled
+HISTORY_PAGE_SIZE = 100
+
 class SettingsView:
     def __init__(self, parent, db: Database):
         self.parent = parent
@@ -240,7 +244,10 @@ class SettingsView:
         # Add scrollbars
         y_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.activity_tree.yview)
         x_scrollbar = ttk.Scrollbar(table_frame, orient="horizontal", command=self.activity_tree.xview)
-        self.activity_tree.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        self.activity_tree.configure(
+            yscrollcommand=lambda first, last: self._on_history_scroll(y_scrollbar, first, last),
+            xscrollcommand=x_scrollbar.set
+        )
         
         # Pack scrollbars and tree
         self.activity_tree.pack(side="left", fill="both", expand=True)
@@ -330,61 +337,82 @@ class SettingsView:
         self.load_login_history(search_term)
 
     def load_login_history(self, search_term=""):
-        """Load and display login history with enhanced details"""
+        """Start the login history over from its first page"""
+        # Searches fire on every keystroke; only the latest one gets rendered
+        self._history_request = getattr(self, '_history_request', 0) + 1
+        self._history_search = search_term
+        self._history_cursor = None
+        self._history_exhausted = False
+        self._history_loading = False
+        
+        for item in self.activity_tree.get_children():
+            self.activity_tree.delete(item)
+        
+        self.load_more_history()
+
+    def load_more_history(self):
+        """Fetch the next page of login history on a worker thread"""
+        if self._history_loading or self._history_exhausted:
+            return
+        self._history_loading = True
+        request = self._history_request
+        
+        future = self.db.get_async().get_login_history_page(
+            self._history_search, self._history_cursor, HISTORY_PAGE_SIZE
+        )
+        deliver_to_tk(
+            self.activity_tree, future,
+            lambda page: self._show_login_history(request, page),
+            lambda e: self._on_history_error(request, e)
+        )
+
+    def _on_history_scroll(self, scrollbar, first, last):
+        """Keep the scrollbar in sync and load the next page near the bottom"""
+        scrollbar.set(first, last)
+        if float(last) >= 0.9:
+            self.load_more_history()
+
+    @staticmethod
+    def _format_history_row(entry):
+        """Turn a login_history row into the values shown in the table"""
+        # Parse device info
+        device_info = json.loads(entry['device_info']) if entry['device_info'] else {}
+        browser_info = entry['browser_info'] or "Unknown"
+        location = entry['location'] or "Unknown"
+        
+        return (
+            entry['created_at'].strftime('%Y-%m-%d'),
+            entry['created_at'].strftime('%H:%M:%S'),
+            entry['username'] or "Unknown",
+            entry['ip_address'],
+            location,
+            device_info.get('device', 'Unknown'),
+            browser_info,
+            "✅ Success" if entry['status'] else "❌ Failed"
+        )
+
+    def _show_login_history(self, request, page):
+        """Append a page of login history to the table"""
+        if request != self._history_request:
+            return
+        
+        history, cursor = page
+        self._history_loading = False
+        self._history_cursor = cursor
+        self._history_exhausted = cursor is None
+        
         try:
-            # Clear existing items
-            for item in self.activity_tree.get_children():
-                self.activity_tree.delete(item)
-            
-            # Get login history from database with user info
-            query = """
-                SELECT 
-                    lh.created_at,
-                    u.username,
-                    lh.ip_address,
-                    lh.device_info,
-                    lh.status,
-                    lh.browser_info,
-                    lh.location
-                FROM login_history lh
-                LEFT JOIN users u ON lh.user_id = u.id
-                WHERE 
-                    u.username LIKE %s OR
-                    lh.ip_address LIKE %s OR
-                    lh.device_info LIKE %s
-                ORDER BY lh.created_at DESC
-                LIMIT 100
-            """
-            
-            search_pattern = f"%{search_term}%"
-            history = self.db.execute_query(query, 
-                                         (search_pattern, search_pattern, search_pattern))
-            
             for entry in history:
-                # Parse device info
-                device_info = json.loads(entry['device_info']) if entry['device_info'] else {}
-                browser_info = entry['browser_info'] or "Unknown"
-                location = entry['location'] or "Unknown"
-                
-                # Format date and time
-                date = entry['created_at'].strftime('%Y-%m-%d')
-                time = entry['created_at'].strftime('%H:%M:%S')
-                
-                # Insert with all details
-                self.activity_tree.insert("", "end", values=(
-                    date,
-                    time,
-                    entry['username'] or "Unknown",
-                    entry['ip_address'],
-                    location,
-                    device_info.get('device', 'Unknown'),
-                    browser_info,
-                    "✅ Success" if entry['status'] else "❌ Failed"
-                ))
+                self.activity_tree.insert("", "end", values=self._format_history_row(entry))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load login history: {str(e)}")
 
+    def _on_history_error(self, request, error):
+        if request == self._history_request:
+            self._history_loading = False
+        messagebox.showerror("Error", f"Failed to load login history: {str(error)}")
+
     def export_history(self):
         """Export login history to CSV"""
         try:
@@ -397,16 +425,17 @@ class SettingsView:
             if not filename:
                 return
                 
-            with open(filename, 'w', newline='') as file:
+            # Export the full filtered history, not just the rows on screen,
+            # streaming it so memory use does not grow with the table
+            search_term = self.search_var.get().lower()
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
                 # Write headers
-                headers = [col for col in self.activity_tree["columns"]]
-                writer.writerow(headers)
+                writer.writerow(self.activity_tree["columns"])
                 
                 # Write data
-                for item in self.activity_tree.get_children():
-                    values = [self.activity_tree.set(item, col) for col in headers]
-                    writer.writerow(values)
+                for chunk in self.db.iter_login_history(search_term):
+                    writer.writerows(self._format_history_row(entry) for entry in chunk)
                     
             messagebox.showinfo("Success", "Login history exported successfully!")
             